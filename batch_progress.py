@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+"""batch_progress.py - Byte weighted progress and ETA of a download batch
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import time
+from collections import deque
+from typing import Any, Optional
+from constants import AppConst
+from job_store import JobStore
+from utils import estimate_info_bytes
+
+
+class BatchProgress:
+    """Sums downloaded, known and estimated bytes of all jobs of a batch.
+    Sizes come from the progress dicts of the active job, from validation
+    or metadata estimates, and jobs of unknown size count as the average
+    size so far. Estimates are replaced by real sizes as they become known.
+    """
+    # Queue of the batch, for the number of queued and processed URLs
+    jobs: JobStore
+    # Estimated bytes of queued URLs from validation
+    estimates: dict[str, int]
+    # Sum of estimates, kept so rendering does not iterate them
+    estimates_bytes: int
+    # Bytes downloaded by finished jobs and the number of those jobs
+    done_bytes: int
+    done_count: int
+    # Estimated bytes of the active job or None if unknown
+    active_estimate: Optional[int]
+    # (downloaded bytes, total bytes) of each file of the active job
+    active_files: dict[str, tuple[int, int]]
+    # True while a job is downloading
+    active: bool
+    # (time.monotonic(), downloaded bytes) samples for the rolling rate
+    samples: deque[tuple[float, int]]
+
+    def __init__(self, jobs: JobStore) -> None:
+        """Initializer for BatchProgress
+
+        Args:
+            jobs (JobStore): Queue of the batch
+        """
+        self.jobs = jobs
+        self.estimates = {}
+        self.estimates_bytes = 0
+        self.samples = deque()
+        self.start_batch()
+
+    def start_batch(self) -> None:
+        """Clears the progress of the previous batch
+        """
+        self.estimates = {}
+        self.estimates_bytes = 0
+        self.done_bytes = 0
+        self.done_count = 0
+        self.active_estimate = None
+        self.active_files = {}
+        self.active = False
+        self.samples.clear()
+
+    def add_estimate(self, url: str, estimated_bytes: Optional[int]) -> None:
+        """Records the estimated size of a queued URL
+
+        Args:
+            url (str): Queued URL
+            estimated_bytes (Optional[int]): Estimated bytes or None if
+                unknown
+        """
+        if estimated_bytes and url not in self.estimates:
+            self.estimates[url] = estimated_bytes
+            self.estimates_bytes += estimated_bytes
+
+    def start_job(self, url: str) -> None:
+        """Makes a URL the active job
+
+        Args:
+            url (str): URL taken from the queue
+        """
+        self.active_estimate = self.skip_job(url)
+        self.active_files = {}
+        self.active = True
+
+    def skip_job(self, url: str) -> Optional[int]:
+        """Forgets the estimate of a URL taken from the queue
+
+        Args:
+            url (str): URL taken from the queue
+
+        Returns:
+            Optional[int]: Estimated bytes of the URL or None if unknown
+        """
+        estimated_bytes = self.estimates.pop(url, None)
+        if estimated_bytes is not None:
+            self.estimates_bytes -= estimated_bytes
+        return estimated_bytes
+
+    def finish_job(self) -> int:
+        """Adds the bytes of the active job to the finished bytes
+
+        Returns:
+            int: Bytes downloaded by the job
+        """
+        if not self.active:
+            return 0
+        downloaded = sum(size for size, _ in self.active_files.values())
+        self.done_bytes += downloaded
+        if downloaded:
+            self.done_count += 1
+        self.active_files = {}
+        self.active_estimate = None
+        self.active = False
+        return downloaded
+
+    def update(self, progress_dict: dict[str, Any]) -> None:
+        """Records the progress of a file of the active job
+
+        Args:
+            progress_dict (dict[str, Any]): Progress dict from yt_dlp
+        """
+        filename = progress_dict.get("filename", None)
+        if not self.active or filename is None:
+            return
+        downloaded = progress_dict.get("downloaded_bytes", None) or 0
+        total = progress_dict.get("total_bytes", None) \
+            or progress_dict.get("total_bytes_estimate", None) or 0
+        if not downloaded and progress_dict.get("status", None) == "finished":
+            # Files already downloaded are reported without it
+            downloaded = total or file_size(filename)
+        self.active_files[filename] = (int(downloaded), int(total))
+        if self.active_estimate is None:
+            info_dict = progress_dict.get("info_dict", None)
+            if isinstance(info_dict, dict):
+                self.active_estimate = estimate_info_bytes(info_dict)
+
+    def downloaded_bytes(self) -> int:
+        """Returns the bytes downloaded in the batch
+
+        Returns:
+            int: Downloaded bytes
+        """
+        return self.done_bytes + sum(size for size, _
+                                     in self.active_files.values())
+
+    def active_bytes(self) -> int:
+        """Returns the best known size of the active job
+
+        Returns:
+            int: Size of the active job, 0 if none or unknown
+        """
+        if not self.active:
+            return 0
+        downloaded = 0
+        total = 0
+        for file_downloaded, file_total in self.active_files.values():
+            downloaded += file_downloaded
+            total += max(file_downloaded, file_total)
+        # Merged formats download one file after the other so the
+        # estimate covers files that did not start yet
+        return max(total, self.active_estimate or 0, downloaded)
+
+    def average_bytes(self) -> Optional[float]:
+        """Returns the size assumed for URLs of unknown size
+
+        Returns:
+            Optional[float]: Average size of finished jobs or of the
+                estimates, None if nothing is known
+        """
+        if self.done_count:
+            return self.done_bytes / self.done_count
+        active_bytes = self.active_bytes()
+        count = len(self.estimates) + (1 if active_bytes else 0)
+        if count:
+            return (self.estimates_bytes + active_bytes) / count
+        return None
+
+    def total_bytes(self) -> Optional[int]:
+        """Returns the estimated size of the whole batch
+
+        Returns:
+            Optional[int]: Estimated bytes or None if no size is known
+        """
+        unknown_count = self.jobs.pending_count() - len(self.estimates)
+        if self.active and not self.active_bytes():
+            unknown_count += 1
+        total = self.done_bytes + self.active_bytes() \
+            + self.estimates_bytes
+        if unknown_count > 0:
+            average = self.average_bytes()
+            if average is None:
+                return None
+            total += int(average * unknown_count)
+        return total
+
+    def is_estimate(self) -> bool:
+        """Returns True if the batch size is not exactly known yet
+
+        Returns:
+            bool: True if any size is estimated
+        """
+        if self.jobs.pending_count() > 0:
+            return True
+        if not self.active:
+            return False
+        return not self.active_files or any(
+            total <= 0 for _, total in self.active_files.values())
+
+    def fraction(self) -> float:
+        """Returns the completed fraction of the batch
+
+        Returns:
+            float: Fraction from 0 to 1
+        """
+        total = self.total_bytes()
+        if total:
+            return min(self.downloaded_bytes() / total, 1.0)
+        # Nothing known about sizes, count URLs instead
+        job_count = self.jobs.processed_count() + self.jobs.pending_count()
+        if not job_count:
+            return 0.0
+        finished_count = self.jobs.processed_count() \
+            - (1 if self.active else 0)
+        return min(finished_count / job_count, 1.0)
+
+    def sample(self) -> None:
+        """Records the downloaded bytes for the rolling rate, called when
+        progress is rendered
+        """
+        now = time.monotonic()
+        self.samples.append((now, self.downloaded_bytes()))
+        while self.samples[0][0] < now - AppConst.BATCH_RATE_WINDOW:
+            self.samples.popleft()
+
+    def rate(self) -> Optional[float]:
+        """Returns the download rate over the last BATCH_RATE_WINDOW
+        seconds
+
+        Returns:
+            Optional[float]: Bytes per second or None if not measured yet
+        """
+        if len(self.samples) < 2:
+            return None
+        start_time, start_bytes = self.samples[0]
+        end_time, end_bytes = self.samples[-1]
+        if end_time - start_time < AppConst.BATCH_RATE_MIN_SECONDS:
+            return None
+        return (end_bytes - start_bytes) / (end_time - start_time)
+
+    def eta(self) -> Optional[float]:
+        """Returns the estimated seconds until the batch is downloaded
+
+        Returns:
+            Optional[float]: Seconds or None if unknown
+        """
+        rate = self.rate()
+        total = self.total_bytes()
+        if not rate or total is None:
+            return None
+        return max(total - self.downloaded_bytes(), 0) / rate
+
+
+def file_size(path: str) -> int:
+    """Returns the size of a file
+
+    Args:
+        path (str): File path
+
+    Returns:
+        int: Bytes, 0 if the file cannot be read
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
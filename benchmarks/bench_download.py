@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+"""bench_download.py - Measures end to end download throughput of the main
+window against a local media server, without network access
+
+Each case downloads a batch of distinct synthetic media from
+media_server.py through MainWindow.start_download(), the same path as the
+Download button, and runs in its own process so peak RSS is per case.
+Results can be saved with --json and compared to an earlier run with
+--baseline, which exits with 1 if a case got slower.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Optional
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Run without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# pylint: disable=wrong-import-position
+from PySide6.QtWidgets import QApplication  # noqa: E402
+from main_window import MainWindow  # noqa: E402
+from negative_cache import NegativeCache  # noqa: E402
+from partial_store import PartialStore  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    # Windows, peak RSS is not reported
+    resource = None  # type: ignore[assignment]
+
+KIB = 1024
+MIB = 1024 * 1024
+# Cases run by default, kind is a media_server.py media type, fragments
+# only apply to HLS and DASH and workers enables validation with that many
+# concurrent validations
+CASES: list[dict[str, Any]] = [
+    {"name": "progressive-8MiB", "kind": "progressive", "urls": 16,
+     "size": 8 * MIB},
+    {"name": "progressive-256KiB", "kind": "progressive", "urls": 64,
+     "size": 256 * KIB},
+    {"name": "page-1MiB", "kind": "page", "urls": 32, "size": MIB},
+    {"name": "page-1MiB-validate-w1", "kind": "page", "urls": 32,
+     "size": MIB, "workers": 1},
+    {"name": "page-1MiB-validate-w16", "kind": "page", "urls": 32,
+     "size": MIB, "workers": 16},
+    {"name": "hls-16x512KiB", "kind": "hls", "urls": 8, "fragments": 16,
+     "size": 512 * KIB},
+    {"name": "hls-128x64KiB", "kind": "hls", "urls": 8, "fragments": 128,
+     "size": 64 * KIB},
+    {"name": "dash-16x512KiB", "kind": "dash", "urls": 8, "fragments": 16,
+     "size": 512 * KIB},
+    {"name": "dash-128x64KiB", "kind": "dash", "urls": 8, "fragments": 128,
+     "size": 64 * KIB},
+]
+# Metrics compared with --baseline, True if higher is better
+COMPARED_METRICS = {"urls_per_second": True, "mib_per_second": True,
+                    "peak_rss_mib": False}
+
+
+def case_urls(case: dict[str, Any], base_url: str) -> list[str]:
+    """Returns the distinct media URLs of a case
+
+    Args:
+        case (dict[str, Any]): Case from CASES
+        base_url (str): Media server URL such as "http://127.0.0.1:8000"
+
+    Returns:
+        list[str]: URLs
+    """
+    kind = case["kind"]
+    urls = []
+    for index in range(case["urls"]):
+        name = f"{case['name']}.{index}"
+        if kind == "progressive":
+            urls.append(f"{base_url}/progressive/{name}-{case['size']}.mp4")
+        elif kind == "page":
+            urls.append(f"{base_url}/page/{name}-{case['size']}.html")
+        elif kind == "hls":
+            urls.append(f"{base_url}/hls/{name}-{case['fragments']}x"
+                        f"{case['size']}.m3u8")
+        else:
+            urls.append(f"{base_url}/dash/{name}-{case['fragments']}x"
+                        f"{case['size']}.mpd")
+    return urls
+
+
+def peak_rss_mib() -> Optional[float]:
+    """Returns the peak resident set size of this process
+
+    Returns:
+        Optional[float]: MiB or None if unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / MIB if sys.platform == "darwin" else peak / KIB
+
+
+def run_case(case: dict[str, Any], base_url: str) -> dict[str, Any]:
+    """Downloads the URLs of a case, called in a process of its own
+
+    Args:
+        case (dict[str, Any]): Case from CASES
+        base_url (str): Media server URL
+
+    Returns:
+        dict[str, Any]: Measurements
+    """
+    download_dir = tempfile.mkdtemp(prefix="bench_download_")
+    app = QApplication([])
+    window = MainWindow(False, False)
+    if "workers" in case:
+        window.set_validate_workers(case["workers"])
+    window.download_path_text.setText(download_dir)
+    window.overwrite_check.setChecked(True)
+    window.skipfailed_check.setChecked(False)
+    # Keep failures out of the cache of the installed application
+    window.negative_cache = NegativeCache("")
+    window.partial_store = PartialStore("")
+    window.validate_check.setChecked("workers" in case)
+    window.set_report_dir(os.path.join(download_dir, "reports"))
+    window.exit_on_completion = True
+    window.show()
+    app.processEvents()
+    url_list = case_urls(case, base_url)
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    window.start_download(url_list)
+    seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    downloaded_count = len(window.jobs.filenames)
+    downloaded_bytes = sum(entry.stat().st_size
+                           for entry in os.scandir(download_dir)
+                           if entry.is_file())
+    shutil.rmtree(download_dir, ignore_errors=True)
+    return {"name": case["name"],
+            "urls": len(url_list),
+            "downloaded": downloaded_count,
+            "bytes": downloaded_bytes,
+            "seconds": seconds,
+            "urls_per_second": len(url_list) / seconds,
+            "mib_per_second": downloaded_bytes / MIB / seconds,
+            "cpu_percent": cpu_seconds / seconds * 100,
+            "peak_rss_mib": peak_rss_mib()}
+
+
+def start_media_server() -> tuple[subprocess.Popen[str], str]:
+    """Starts media_server.py in a process of its own so serving does not
+    compete with the downloads for the GIL
+
+    Returns:
+        tuple[subprocess.Popen[str], str]: Server process and base URL
+    """
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "media_server.py")
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, server_path, "--port", "0"],
+        stdout=subprocess.PIPE, text=True)
+    assert process.stdout is not None
+    port = process.stdout.readline().split()[-1]
+    return process, f"http://127.0.0.1:{port}"
+
+
+def spawn_case(case: dict[str, Any], base_url: str,
+               scale: float) -> dict[str, Any]:
+    """Runs a case in a new process of this script
+
+    Args:
+        case (dict[str, Any]): Case from CASES
+        base_url (str): Media server URL
+        scale (float): Multiplier of the number of URLs
+
+    Returns:
+        dict[str, Any]: Measurements
+    """
+    case = dict(case, urls=max(1, int(case["urls"] * scale)))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        result_path = os.path.join(temp_dir, "result.json")
+        subprocess.run([sys.executable, os.path.abspath(__file__),
+                        "--run-case", json.dumps(case),
+                        "--server", base_url, "--json", result_path],
+                       check=True, stdout=subprocess.DEVNULL)
+        with open(result_path, 'r', encoding="utf-8") as f:
+            return json.load(f)
+
+
+def compare(results: list[dict[str, Any]], baseline_path: str,
+            tolerance: float) -> bool:
+    """Prints the ratio of each metric to the same case of a baseline run
+
+    Args:
+        results (list[dict[str, Any]]): Measurements of this run
+        baseline_path (str): JSON file written by --json
+        tolerance (float): Fraction a metric may get worse
+
+    Returns:
+        bool: True if no metric got worse by more than tolerance
+    """
+    with open(baseline_path, 'r', encoding="utf-8") as f:
+        baseline = {case["name"]: case for case in json.load(f)["cases"]}
+    passed = True
+    print(f"\nCompared to {baseline_path}:")
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is None:
+            print(f"{result['name']}: not in baseline")
+            continue
+        ratios = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not result.get(metric) or not base.get(metric):
+                continue
+            ratio = result[metric] / base[metric]
+            worse = ratio < 1 - tolerance if higher_is_better \
+                else ratio > 1 + tolerance
+            passed = passed and not worse
+            ratios.append(f"{metric} x{ratio:.2f}"
+                          + (" REGRESSION" if worse else ""))
+        print(f"{result['name']}: " + ", ".join(ratios))
+    return passed
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Benchmark offline "
+                                     "downloads from a local media server.")
+    parser.add_argument("--cases", nargs="+", metavar="NAME",
+                        choices=[case["name"] for case in CASES],
+                        help="Cases to run, default=all.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplier of the URLs per case, default=1.")
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    parser.add_argument("--baseline",
+                        help="Compare to results written by --json.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Fraction a metric may get worse than "
+                        "the baseline, default=0.1.")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--server", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv[1:])
+
+    if args.run_case:
+        result = run_case(json.loads(args.run_case), args.server)
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump(result, f)
+        return 0
+
+    server, base_url = start_media_server()
+    results = []
+    try:
+        for case in CASES:
+            if args.cases and case["name"] not in args.cases:
+                continue
+            result = spawn_case(case, base_url, args.scale)
+            results.append(result)
+            rss = result["peak_rss_mib"]
+            print(f"{result['name']}: {result['downloaded']}/"
+                  f"{result['urls']} URLs in {result['seconds']:.2f} s, "
+                  f"{result['urls_per_second']:.1f} URLs/s, "
+                  f"{result['mib_per_second']:.1f} MiB/s, "
+                  f"CPU {result['cpu_percent']:.0f}%, peak RSS "
+                  + (f"{rss:.0f} MiB" if rss is not None else "unknown"))
+    finally:
+        server.terminate()
+        server.wait()
+    if args.json:
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0],
+                       "platform": sys.platform,
+                       "cases": results}, f, indent=2)
+    if args.baseline and not compare(results, args.baseline,
+                                     args.tolerance):
+        return 1
+    return 0
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""bench_job_store.py - Measures memory per queued URL and the cost of
+downloaded filename membership checks of JobStore
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Any, Callable
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=wrong-import-position
+from job_store import JobStore, JobStatus  # noqa: E402
+
+
+def make_urls(count: int) -> list[str]:
+    """Creates a list of realistic looking unique URLs
+
+    Args:
+        count (int): Number of URLs
+
+    Returns:
+        list[str]: URLs
+    """
+    return [f"https://www.youtube.com/watch?v={i:011d}" for i in range(count)]
+
+
+def measure_bytes(build: Callable[[], Any]) -> int:
+    """Returns the bytes allocated by build() that are still alive
+
+    Args:
+        build (Callable[[], Any]): Function building the structure
+
+    Returns:
+        int: Bytes allocated
+    """
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = build()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return end - start
+
+
+def bench_memory(url_list: list[str], fail_ratio: float) -> dict[str, float]:
+    """Measures memory per URL not counting the URL strings, which both
+    representations share, once queued and once processed
+
+    Args:
+        url_list (list[str]): URLs to queue
+        fail_ratio (float): Fraction of URLs that fail with an error
+
+    Returns:
+        dict[str, float]: Bytes per URL for each representation
+    """
+    fail_every = int(1 / fail_ratio) if fail_ratio > 0 else 0
+    error_message = "ERROR: [generic] Unable to download webpage: " \
+        "HTTP Error 404: Not Found"
+
+    def queue_lists() -> list[str]:
+        # Representation used before JobStore: a copy of the URL list
+        return list(url_list)
+
+    def queue_store() -> JobStore:
+        store = JobStore()
+        store.extend(url_list, "")
+        return store
+
+    def process_lists() -> tuple[list[str], list[str], list[str]]:
+        # Errors strings and downloaded filenames in lists
+        urls = list(url_list)
+        errors = []
+        filenames = []
+        for i, url in enumerate(urls):
+            if fail_every and i % fail_every == 0:
+                errors.append(f"{error_message} {i}")
+            else:
+                filenames.append(f"{url[-11:]}.mp4")
+        return urls, errors, filenames
+
+    def process_store() -> JobStore:
+        store = JobStore()
+        store.extend(url_list, "")
+        while (job := store.next_job()) is not None:
+            if fail_every and store.position % fail_every == 1:
+                store.set_status(job, JobStatus.FAILED,
+                                 f"{error_message} {store.position}")
+            else:
+                store.set_status(job, JobStatus.DONE)
+                store.add_filename(f"{job.url[-11:]}.mp4")
+        return store
+
+    count = len(url_list)
+    return {"lists_queued_bytes_per_url": measure_bytes(queue_lists) / count,
+            "jobstore_queued_bytes_per_url":
+                measure_bytes(queue_store) / count,
+            "lists_processed_bytes_per_url":
+                measure_bytes(process_lists) / count,
+            "jobstore_processed_bytes_per_url":
+                measure_bytes(process_store) / count}
+
+
+def bench_membership(filename_count: int,
+                     lookups: int) -> dict[str, float]:
+    """Measures the cost of one downloaded filename check as done by each
+    progress callback
+
+    Args:
+        filename_count (int): Number of filenames already downloaded
+        lookups (int): Number of lookups to time
+
+    Returns:
+        dict[str, float]: Nanoseconds per lookup for each representation
+    """
+    filenames = [f"/videos/video {i} [{i:011d}].mp4"
+                 for i in range(filename_count)]
+    missing = "/videos/not downloaded.mp4"
+    store = JobStore()
+    for filename in filenames:
+        store.add_filename(filename)
+    # The old progress hook searched the list for every callback
+    start = time.perf_counter()
+    for _ in range(lookups):
+        _ = missing in filenames
+    list_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(lookups):
+        store.add_filename(filenames[0])
+    store_time = time.perf_counter() - start
+    return {"list_ns_per_lookup": list_time / lookups * 1e9,
+            "jobstore_ns_per_lookup": store_time / lookups * 1e9}
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Benchmark JobStore memory "
+                                     "and filename membership checks.")
+    parser.add_argument("--urls", type=int, default=1_000_000,
+                        help="Number of URLs to queue, default=1000000.")
+    parser.add_argument("--failratio", type=float, default=0.1,
+                        help="Fraction of URLs that fail, default=0.1.")
+    parser.add_argument("--filenames", type=int, default=10_000,
+                        help="Downloaded filenames for membership checks, "
+                        "default=10000.")
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    args = parser.parse_args(argv[1:])
+
+    url_list = make_urls(args.urls)
+    results: dict[str, Any] = {"urls": args.urls,
+                               "fail_ratio": args.failratio,
+                               "filenames": args.filenames}
+    results.update(bench_memory(url_list, args.failratio))
+    results.update(bench_membership(args.filenames, 1000))
+    for key, value in results.items():
+        print(f"{key}: {value:,.1f}" if isinstance(value, float)
+              else f"{key}: {value}")
+    if args.json:
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+"""bench_progress_hook.py - Measures the cost of one yt_dlp progress
+callback into the main window and checks that progress published by
+changing the same dict in place is rendered, like yt_dlp does for
+fragmented downloads. The exit code is 1 if it is not.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Run without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# pylint: disable=wrong-import-position
+from PySide6.QtWidgets import QApplication  # noqa: E402
+from main_window import MainWindow  # noqa: E402
+
+
+def check_same_dict(window: MainWindow) -> bool:
+    """Publishes one progress dict, changes it in place and publishes it
+    again like yt_dlp's fragment downloader, then checks that the change
+    is taken for rendering
+
+    Args:
+        window (MainWindow): Window owning the progress slot
+
+    Returns:
+        bool: True if the changed dict was taken
+    """
+    progress_dict = {"status": "downloading",
+                     "filename": "video [0123456789a].mp4",
+                     "downloaded_bytes": 0, "total_bytes": 2048,
+                     "fragment_index": 1, "fragment_count": 2}
+    slot = window.progress_slot
+    slot.publish(progress_dict)
+    if slot.take() is not progress_dict:
+        return False
+    progress_dict["downloaded_bytes"] = 1024
+    progress_dict["fragment_index"] = 2
+    slot.publish(progress_dict)
+    taken = slot.take()
+    return taken is progress_dict and taken["downloaded_bytes"] == 1024 \
+        and slot.take() is None
+
+
+def bench_hook(window: MainWindow, calls: int) -> float:
+    """Calls the progress hook like yt_dlp does for a progressive download,
+    with a new dict for each call
+
+    Args:
+        window (MainWindow): Window owning the hook
+        calls (int): Number of callbacks
+
+    Returns:
+        float: Nanoseconds per callback
+    """
+    total_bytes = calls * 1024
+    progress_dicts = [{"status": "downloading",
+                       "filename": "video [0123456789a].mp4",
+                       "downloaded_bytes": i * 1024,
+                       "total_bytes": total_bytes}
+                      for i in range(calls)]
+    window.ydl_download_progress_hook(progress_dicts[0])
+    start = time.perf_counter()
+    for progress_dict in progress_dicts:
+        window.ydl_download_progress_hook(progress_dict)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the yt_dlp "
+                                     "progress callback.")
+    parser.add_argument("--calls", type=int, default=200_000,
+                        help="Number of callbacks, default=200000.")
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    args = parser.parse_args(argv[1:])
+
+    app = QApplication([])
+    window = MainWindow(False, False)
+    window.show()
+    app.processEvents()
+    results = {"calls": args.calls,
+               "hook_ns_per_call": bench_hook(window, args.calls),
+               "same_dict_rendered": check_same_dict(window)}
+    window.close()
+    for key, value in results.items():
+        print(f"{key}: {value:,.1f}" if isinstance(value, float)
+              else f"{key}: {value}")
+    if args.json:
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if results["same_dict_rendered"] else 1
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
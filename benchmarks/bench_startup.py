@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+
+"""bench_startup.py - Measures startup time and memory of video_download.py
+
+Launches the program with --startupreport under the offscreen Qt platform
+in two modes: gui shows the window and waits, headless downloads a file
+from a local media_server.py with --download --exitoncompletion. Each mode
+runs cold, with no Python bytecode caches for any module, and warm, with
+the caches written by an earlier run. Per module import times come from an
+extra warm run with -X importtime. The exit code is 1 if the time to
+window of a warm run is over AppConst.STARTUP_BUDGET_MS. Results are
+appended to a JSON history with --history and compared to the previous run
+there, the exit code is also 1 if a metric got worse.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from typing import Any, Optional
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=wrong-import-position
+from constants import AppConst  # noqa: E402
+from media_server import start_server  # noqa: E402
+
+KIB = 1024
+MIB = 1024 * 1024
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "video_download.py")
+MODE_GUI = "gui"
+MODE_HEADLESS = "headless"
+MODES = [MODE_GUI, MODE_HEADLESS]
+# Size of the file downloaded in headless mode
+DOWNLOAD_SIZE = 64 * KIB
+# Lines printed by --startupreport
+WINDOW_REGEX = re.compile(r"^Time to window ([\d,]+) ms")
+READY_REGEX = re.compile(r"^yt_dlp imported in the background in [\d,]+ "
+                         r"ms, ready ([\d,]+) ms")
+DOWNLOAD_REGEX = re.compile(r"^First download started ([\d,]+) ms")
+# -X importtime line: self and cumulative microseconds, indented name
+IMPORTTIME_REGEX = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|"
+                              r"(\s*)(\S+)")
+# Metrics compared with the previous run of the history, all lower is
+# better
+COMPARED_METRICS = ["time_to_window_ms", "ready_ms",
+                    "time_to_first_download_ms", "baseline_rss_mib"]
+
+
+def rss_mib(pid: int) -> Optional[float]:
+    """Returns the resident set size of a process
+
+    Args:
+        pid (int): Process ID
+
+    Returns:
+        Optional[float]: MiB or None if unavailable, only Linux is
+            supported
+    """
+    try:
+        with open(f"/proc/{pid}/status", 'r', encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / KIB
+    except OSError:
+        pass
+    return None
+
+
+def to_ms(match: re.Match[str]) -> float:
+    """Converts the milliseconds matched in a report line
+
+    Args:
+        match (re.Match[str]): Match of one of the report regexes
+
+    Returns:
+        float: Milliseconds
+    """
+    return float(match.group(1).replace(",", ""))
+
+
+def launch(mode: str, root: str, cache_dir: str, download_url: str,
+           timeout: float, import_log: str = "") -> dict[str, Any]:
+    """Runs video_download.py once and parses its startup report
+
+    Args:
+        mode (str): One of MODES
+        root (str): Directory for the home, data and download directories
+            of the run
+        cache_dir (str): Bytecode cache directory, empty for a cold run
+        download_url (str): URL downloaded in headless mode
+        timeout (float): Seconds before the run is killed
+        import_log (str, optional): File for -X importtime output, empty to
+            not measure import times. Defaults to "".
+
+    Returns:
+        dict[str, Any]: Measurements, milliseconds are since the first
+            import of video_download.py, wall_ms since starting the process
+    """
+    home = os.path.join(root, "home")
+    os.makedirs(os.path.join(home, "Videos"), exist_ok=True)
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", HOME=home,
+               XDG_CONFIG_HOME=os.path.join(root, "config"),
+               XDG_DATA_HOME=os.path.join(root, "data"),
+               PYTHONPYCACHEPREFIX=cache_dir)
+    # Warm runs need the caches written by earlier runs
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    command = [sys.executable]
+    if import_log:
+        command += ["-X", "importtime"]
+    command += [SCRIPT_PATH, "--startupreport", "--noloadsettings",
+                "--nosavesettings"]
+    if mode == MODE_HEADLESS:
+        command += ["--url", download_url, "--download",
+                    "--exitoncompletion", "--overwrite", "--noskipfailed",
+                    "--reportdir", os.path.join(root, "reports")]
+    result: dict[str, Any] = {}
+    with open(import_log or os.devnull, 'w', encoding="utf-8") as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            command, env=env, stdout=subprocess.PIPE, stderr=stderr,
+            text=True)
+        watchdog = threading.Timer(timeout, process.kill)
+        watchdog.start()
+        assert process.stdout is not None
+        for line in process.stdout:
+            match = WINDOW_REGEX.match(line)
+            if match:
+                result["time_to_window_ms"] = to_ms(match)
+            match = DOWNLOAD_REGEX.match(line)
+            if match:
+                result["time_to_first_download_ms"] = to_ms(match)
+            match = READY_REGEX.match(line)
+            if match:
+                result["ready_ms"] = to_ms(match)
+                result["wall_ms"] = (time.perf_counter() - start) * 1000
+                result["baseline_rss_mib"] = rss_mib(process.pid)
+                if mode == MODE_GUI:
+                    # Idle with the window shown, nothing more to measure
+                    process.terminate()
+        process.wait()
+        watchdog.cancel()
+    if mode == MODE_HEADLESS:
+        result["exit_code"] = process.returncode
+    return result
+
+
+def parse_import_log(path: str, top: int) -> dict[str, Any]:
+    """Parses -X importtime output
+
+    Args:
+        path (str): File written by launch()
+        top (int): Number of modules with the longest import listed
+
+    Returns:
+        dict[str, Any]: Total milliseconds, yt_dlp milliseconds and the
+            self and cumulative milliseconds of the slowest modules
+    """
+    modules: dict[str, tuple[float, float]] = {}
+    total = 0.0
+    with open(path, 'r', encoding="utf-8") as f:
+        for line in f:
+            match = IMPORTTIME_REGEX.match(line)
+            if match:
+                self_ms = int(match.group(1)) / 1000
+                total += self_ms
+                modules[match.group(4)] = (self_ms,
+                                           int(match.group(2)) / 1000)
+    slowest = sorted(modules.items(), key=lambda item: item[1][0],
+                     reverse=True)[:top]
+    return {"import_total_ms": total,
+            "yt_dlp_import_ms": modules.get("yt_dlp", (0.0, 0.0))[1],
+            "slowest_modules": {name: {"self_ms": self_ms,
+                                       "cumulative_ms": cumulative_ms}
+                                for name, (self_ms, cumulative_ms)
+                                in slowest}}
+
+
+def run_case(mode: str, warm: bool, repeat: int, download_url: str,
+             timeout: float) -> dict[str, Any]:
+    """Launches a mode several times and takes the median of each metric
+
+    Args:
+        mode (str): One of MODES
+        warm (bool): True to run with bytecode caches written by an
+            earlier run
+        repeat (int): Number of runs
+        download_url (str): URL downloaded in headless mode
+        timeout (float): Seconds before a run is killed
+
+    Returns:
+        dict[str, Any]: Measurements
+    """
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as root:
+        cache_dir = os.path.join(root, "pycache")
+        if warm:
+            launch(mode, root, cache_dir, download_url, timeout)
+        for _ in range(repeat):
+            if not warm:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            runs.append(launch(mode, root, cache_dir, download_url,
+                               timeout))
+    result: dict[str, Any] = {"name": f"{mode}-{'warm' if warm else 'cold'}",
+                              "runs": len(runs)}
+    for key in {key for run in runs for key in run}:
+        values = [run[key] for run in runs if run.get(key) is not None]
+        if key == "exit_code":
+            result[key] = max(values, default=None)
+        else:
+            result[key] = statistics.median(values) if values else None
+    return result
+
+
+def compare(results: list[dict[str, Any]], previous: dict[str, Any],
+            tolerance: float) -> bool:
+    """Prints the ratio of each metric to the same case of a previous run
+
+    Args:
+        results (list[dict[str, Any]]): Measurements of this run
+        previous (dict[str, Any]): Previous run of the history
+        tolerance (float): Fraction a metric may get worse
+
+    Returns:
+        bool: True if no metric got worse by more than tolerance
+    """
+    baseline = {case["name"]: case for case in previous["cases"]}
+    passed = True
+    print(f"\nCompared to the run of {previous['date']} at commit "
+          f"{previous.get('commit') or 'unknown'}:")
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is None:
+            print(f"{result['name']}: not in previous run")
+            continue
+        ratios = []
+        for metric in COMPARED_METRICS:
+            if not result.get(metric) or not base.get(metric):
+                continue
+            ratio = result[metric] / base[metric]
+            worse = ratio > 1 + tolerance
+            passed = passed and not worse
+            ratios.append(f"{metric} x{ratio:.2f}"
+                          + (" REGRESSION" if worse else ""))
+        print(f"{result['name']}: " + ", ".join(ratios))
+    return passed
+
+
+def check_budget(results: list[dict[str, Any]], budget_ms: float) -> bool:
+    """Prints whether the time to window of each warm run is within the
+    startup budget. Cold runs also compile bytecode so are not checked.
+
+    Args:
+        results (list[dict[str, Any]]): Measurements of this run
+        budget_ms (float): Target time to window in milliseconds
+
+    Returns:
+        bool: True if all warm runs showed the window within budget
+    """
+    passed = True
+    print(f"\nTime to window budget {budget_ms:,.0f} ms:")
+    for result in results:
+        if not result["name"].endswith("-warm"):
+            continue
+        elapsed = result.get("time_to_window_ms")
+        within = elapsed is not None and elapsed <= budget_ms
+        passed = passed and within
+        print(f"{result['name']}: {format_ms(elapsed)} "
+              + ("within budget" if within else "OVER BUDGET"))
+    return passed
+
+
+def git_commit() -> Optional[str]:
+    """Returns the commit of the measured tree
+
+    Returns:
+        Optional[str]: Short commit hash or None if not a git checkout
+    """
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True, cwd=os.path.dirname(SCRIPT_PATH))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def format_ms(value: Optional[float]) -> str:
+    """Formats milliseconds for printing
+
+    Args:
+        value (Optional[float]): Milliseconds or None
+
+    Returns:
+        str: Text such as "1,234 ms"
+    """
+    return "unknown" if value is None else f"{value:,.0f} ms"
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Benchmark startup time "
+                                     "and memory of video_download.py.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES,
+                        help="Modes to run, default=all.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per case, the median counts, "
+                        "default=3.")
+    parser.add_argument("--importtop", type=int, default=25,
+                        help="Slowest imported modules listed, "
+                        "default=25.")
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="Seconds before a run is killed, "
+                        "default=120.")
+    parser.add_argument("--history",
+                        help="Append results to this JSON file and "
+                        "compare to the previous run in it.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Fraction a metric may get worse than "
+                        "the previous run, default=0.1.")
+    parser.add_argument("--budget", type=float,
+                        default=AppConst.STARTUP_BUDGET_MS,
+                        help="Time to window of warm runs in milliseconds "
+                        "above which the exit code is 1, "
+                        f"default={AppConst.STARTUP_BUDGET_MS}.")
+    args = parser.parse_args(argv[1:])
+
+    server = start_server()
+    download_url = f"http://127.0.0.1:{server.server_address[1]}" \
+        f"/progressive/startup-{DOWNLOAD_SIZE}.mp4"
+    results = []
+    try:
+        for mode in args.modes:
+            for warm in (False, True):
+                result = run_case(mode, warm, args.repeat, download_url,
+                                  args.timeout)
+                results.append(result)
+                line = f"{result['name']}: window " \
+                    f"{format_ms(result.get('time_to_window_ms'))}, " \
+                    f"yt_dlp ready {format_ms(result.get('ready_ms'))}"
+                if mode == MODE_HEADLESS:
+                    line += ", first download " + format_ms(
+                        result.get("time_to_first_download_ms")) \
+                        + f", exit code {result.get('exit_code')}"
+                rss = result.get("baseline_rss_mib")
+                line += ", RSS " + (f"{rss:.0f} MiB" if rss is not None
+                                    else "unknown")
+                print(line)
+        with tempfile.TemporaryDirectory(prefix="bench_startup_") as root:
+            import_log = os.path.join(root, "importtime.txt")
+            cache_dir = os.path.join(root, "pycache")
+            launch(MODE_GUI, root, cache_dir, download_url, args.timeout)
+            launch(MODE_GUI, root, cache_dir, download_url, args.timeout,
+                   import_log)
+            imports = parse_import_log(import_log, args.importtop)
+    finally:
+        server.shutdown()
+    print(f"\nImports {imports['import_total_ms']:,.0f} ms, yt_dlp "
+          f"{imports['yt_dlp_import_ms']:,.0f} ms, slowest modules:")
+    for name, times in imports["slowest_modules"].items():
+        print(f"{times['self_ms']:8.1f} ms {times['cumulative_ms']:8.1f} ms "
+              f"{name}")
+    within_budget = check_budget(results, args.budget)
+
+    if not args.history:
+        return 0 if within_budget else 1
+    history: dict[str, Any] = {"runs": []}
+    if os.path.exists(args.history):
+        with open(args.history, 'r', encoding="utf-8") as f:
+            history = json.load(f)
+    passed = not history["runs"] or compare(results, history["runs"][-1],
+                                            args.tolerance)
+    history["runs"].append({"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                            "commit": git_commit(),
+                            "python": sys.version.split()[0],
+                            "platform": sys.platform,
+                            "cases": results,
+                            "imports": imports})
+    with open(args.history, 'w', encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    return 0 if passed and within_budget else 1
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
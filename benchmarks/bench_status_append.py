@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+"""bench_status_append.py - Measures how many messages per second the status
+window takes through each way of appending, including rendering
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Callable
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Run without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# pylint: disable=wrong-import-position
+from PySide6.QtWidgets import QApplication  # noqa: E402
+from main_window import MainWindow  # noqa: E402
+from doc_table import DocTable  # noqa: E402
+from constants import LinkIds  # noqa: E402
+
+# Messages between runs of the message loop when appending directly, the
+# status window is repainted when the loop runs
+EVENTS_EVERY = 100
+
+
+def make_messages(count: int) -> list[str]:
+    """Creates messages like yt_dlp output of varying length
+
+    Args:
+        count (int): Number of messages
+
+    Returns:
+        list[str]: Messages
+    """
+    return [f"[download] {index % 100:5.1f}% of  {index % 977:7.2f}MiB at "
+            f"{index % 31:6.2f}MiB/s ETA 00:{index % 60:02d} "
+            f"(frag {index % 300}/300)" + " extra" * (index % 7)
+            for index in range(count)]
+
+
+def bench(app: QApplication, count: int,
+          append: Callable[[int], None]) -> float:
+    """Appends messages and runs the message loop like downloads do
+
+    Args:
+        app (QApplication): Application, to run the message loop
+        count (int): Number of messages
+        append (Callable[[int], None]): Appends message number n
+
+    Returns:
+        float: Messages per second
+    """
+    app.processEvents()
+    start = time.perf_counter()
+    for index in range(count):
+        append(index)
+    app.processEvents()
+    return count / (time.perf_counter() - start)
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Benchmark appending to "
+                                     "the status window.")
+    parser.add_argument("--messages", type=int, default=2000,
+                        help="Number of messages per case, default=2000.")
+    parser.add_argument("--tablerows", type=int, default=200,
+                        help="Rows per DocTable, default=200.")
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    args = parser.parse_args(argv[1:])
+
+    app = QApplication([])
+    window = MainWindow(False, False)
+    window.show()
+    app.processEvents()
+    status_text = window.status_text
+    messages = make_messages(args.messages)
+    results: dict[str, float | int] = {"messages": args.messages}
+
+    def add_status_message(index: int) -> None:
+        window.add_status_message(messages[index])
+
+    def append_text(index: int) -> None:
+        status_text.append_text(messages[index])
+        if index % EVENTS_EVERY == 0:
+            app.processEvents()
+
+    results["add_status_message_per_second"] = bench(
+        app, args.messages, add_status_message)
+    status_text.log_model.clear()
+    results["append_text_per_second"] = bench(app, args.messages,
+                                              append_text)
+    # Lines hidden by a filter still go through the proxy model
+    status_text.log_model.clear()
+    status_text.set_filter(logging.WARNING, -1)
+    results["append_text_filtered_per_second"] = bench(
+        app, args.messages, append_text)
+    status_text.set_filter(logging.NOTSET, -1)
+    status_text.log_model.clear()
+
+    # Tables like the subtitle lists, rendered to lines when appended
+    table_count = max(1, args.messages // args.tablerows)
+    tables = []
+    for table_index in range(table_count):
+        table = DocTable(f"Subtitles {table_index}",
+                         ["Code", "Name", "Format"])
+        for row in range(args.tablerows):
+            code = f"l{row}"
+            table.add_row([(code, LinkIds.LINKID_SUBLANGUAGE
+                            + LinkIds.LINKID_SEP + code),
+                           (f"Language {row}", ""),
+                           (["vtt", "ttml", "srv3", "json3"],
+                            LinkIds.LINKID_SUBEXTENSION)])
+        tables.append(table)
+
+    def append_table(index: int) -> None:
+        status_text.append_table(tables[index])
+        app.processEvents()
+
+    tables_per_second = bench(app, table_count, append_table)
+    results["append_table_lines_per_second"] = tables_per_second \
+        * len(tables[0].to_lines())
+    window.close()
+    for key, value in results.items():
+        print(f"{key}: {value:,.0f}")
+    if args.json:
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
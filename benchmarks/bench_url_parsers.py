@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""bench_url_parsers.py - Measures parse time, peak memory and URLs per
+second of the URL list parsers on synthetic lists and bookmark exports
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from typing import Any, Callable
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Run without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# pylint: disable=wrong-import-position
+from PySide6.QtWidgets import QApplication  # noqa: E402
+from main_window import MainWindow  # noqa: E402
+from bookmark_html_parser import BookmarkHTMLParser  # noqa: E402
+from url_list_generator import FORMATS, FORMAT_TXT  # noqa: E402
+from url_list_generator import write_url_list  # noqa: E402
+
+# Parsers taking the file text, measured without reading the file
+TEXT_PARSERS = {"BookmarkHTMLParser"}
+# Metrics compared with --baseline, True if higher is better
+COMPARED_METRICS = {"urls_per_second": True, "peak_mib": False}
+
+
+def parsers_of(window: MainWindow, file_format: str) -> dict[
+        str, Callable[[str], list[str]]]:
+    """Returns the parsers of a file format
+
+    Args:
+        window (MainWindow): Window owning the file parsers
+        file_format (str): A url_list_generator.FORMATS value
+
+    Returns:
+        dict[str, Callable[[str], list[str]]]: Parser name to function
+            taking the file path, or the file text for names in
+            TEXT_PARSERS, and returning the URLs
+    """
+    if file_format == FORMAT_TXT:
+        return {"parse_txt_file": window.parse_txt_file}
+
+    def parse_html_file(file_path: str) -> list[str]:
+        return window.parse_html_file(file_path, False)
+
+    def bookmark_html_parser(text: str) -> list[str]:
+        parser = BookmarkHTMLParser()
+        parser.feed(text)
+        return parser.get_url_list(False)
+
+    return {"parse_html_file": parse_html_file,
+            "BookmarkHTMLParser": bookmark_html_parser}
+
+
+def measure(parse: Callable[[str], list[str]], argument: str,
+            repeat: int) -> dict[str, Any]:
+    """Measures a parser, timing and peak memory are measured in separate
+    runs because tracing allocations slows parsing down
+
+    Args:
+        parse (Callable[[str], list[str]]): Parser
+        argument (str): File path or text passed to the parser
+        repeat (int): Number of timed runs, the fastest counts
+
+    Returns:
+        dict[str, Any]: Measurements
+    """
+    best = float("inf")
+    url_count = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        url_count = len(parse(argument))
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    parse(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"urls": url_count,
+            "seconds": best,
+            "urls_per_second": url_count / best if best else 0.0,
+            "peak_mib": peak / (1024 * 1024)}
+
+
+def compare(results: list[dict[str, Any]], baseline_path: str,
+            tolerance: float) -> bool:
+    """Prints the ratio of each metric to the same case of a baseline run
+
+    Args:
+        results (list[dict[str, Any]]): Measurements of this run
+        baseline_path (str): JSON file written by --json
+        tolerance (float): Fraction a metric may get worse
+
+    Returns:
+        bool: True if no metric got worse by more than tolerance
+    """
+    with open(baseline_path, 'r', encoding="utf-8") as f:
+        baseline = {(case["format"], case["count"], case["parser"]): case
+                    for case in json.load(f)["cases"]}
+    passed = True
+    print(f"\nCompared to {baseline_path}:")
+    for result in results:
+        key = (result["format"], result["count"], result["parser"])
+        name = f"{key[0]} {key[1]:,} {key[2]}"
+        base = baseline.get(key)
+        if base is None:
+            print(f"{name}: not in baseline")
+            continue
+        ratios = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not result[metric] or not base[metric]:
+                continue
+            ratio = result[metric] / base[metric]
+            worse = ratio < 1 - tolerance if higher_is_better \
+                else ratio > 1 + tolerance
+            passed = passed and not worse
+            ratios.append(f"{metric} x{ratio:.2f}"
+                          + (" REGRESSION" if worse else ""))
+        print(f"{name}: " + ", ".join(ratios))
+    return passed
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the URL list "
+                                     "parsers.")
+    parser.add_argument("--counts", type=int, nargs="+",
+                        default=[1000, 10_000, 100_000],
+                        help="URLs per file, default=1000 10000 100000. "
+                        "Exports of up to 5000000 URLs are realistic but "
+                        "measuring their peak memory takes minutes.")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS,
+                        default=FORMATS, help="File formats, default=all.")
+    parser.add_argument("--depth", type=int, default=8,
+                        help="Deepest bookmark folder nesting, default=8.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timed runs per parser, default=3.")
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    parser.add_argument("--baseline",
+                        help="Compare to results written by --json.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Fraction a metric may get worse than "
+                        "the baseline, default=0.1.")
+    args = parser.parse_args(argv[1:])
+
+    app = QApplication([])
+    window = MainWindow(False, False)
+    app.processEvents()
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for file_format in args.formats:
+            extension = "txt" if file_format == FORMAT_TXT else "html"
+            for count in args.counts:
+                file_path = os.path.join(temp_dir, f"{file_format}-{count}."
+                                         f"{extension}")
+                write_url_list(file_path, file_format, count, args.depth)
+                file_mib = os.path.getsize(file_path) / (1024 * 1024)
+                for name, parse in parsers_of(window, file_format).items():
+                    result = {"format": file_format, "count": count,
+                              "parser": name, "file_mib": file_mib}
+                    argument = file_path
+                    if name in TEXT_PARSERS:
+                        with open(file_path, 'r', encoding="utf-8") as f:
+                            argument = f.read()
+                    result.update(measure(parse, argument, args.repeat))
+                    del argument
+                    results.append(result)
+                    print(f"{file_format} {count:,} URLs ({file_mib:.1f} "
+                          f"MiB) {name}: {result['seconds']:.3f} s, "
+                          f"{result['urls_per_second']:,.0f} URLs/s, peak "
+                          f"{result['peak_mib']:.1f} MiB"
+                          + ("" if result["urls"] == count else
+                             f", found {result['urls']:,} URLs"))
+                os.remove(file_path)
+    window.close()
+    if args.json:
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0],
+                       "platform": sys.platform,
+                       "cases": results}, f, indent=2)
+    if args.baseline and not compare(results, args.baseline,
+                                     args.tolerance):
+        return 1
+    return 0
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+"""media_server.py - Local HTTP server of synthetic media for offline
+download benchmarks
+
+URLs encode what is served so any number of distinct media can be
+requested without generating files:
+
+    /progressive/<name>-<size>.mp4      Single file of size bytes
+    /page/<name>-<size>.html            HTML page with a <video> of the
+                                        progressive file above
+    /hls/<name>-<count>x<size>.m3u8     HLS media playlist of count
+                                        fragments of size bytes
+    /dash/<name>-<count>x<size>.mpd     DASH manifest with a SegmentList of
+                                        count fragments of size bytes
+
+The media name is the title yt_dlp gives downloads, so distinct names
+download to distinct files.
+
+Run directly to serve until killed, the bound port is printed as
+"PORT <n>".
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds of media each fragment claims to hold
+FRAGMENT_SECONDS = 4
+# Block repeated to build response bodies, random so it does not compress
+BLOCK = os.urandom(1024 * 1024)
+# Validators of media files, which differ between server processes like
+# their content so partial downloads are not resumed from another process
+ETAG_PREFIX = hashlib.sha1(BLOCK).hexdigest()[:16]
+LAST_MODIFIED = formatdate(time.time(), usegmt=True)
+
+PROGRESSIVE_REGEX = re.compile(r"^/progressive/[\w.-]+-(\d+)\.mp4$")
+PAGE_REGEX = re.compile(r"^/page/([\w.-]+-\d+)\.html$")
+HLS_REGEX = re.compile(
+    r"^/hls/([\w.-]+-(\d+)x(\d+))(\.m3u8|/seg\d+\.ts)$")
+DASH_REGEX = re.compile(
+    r"^/dash/([\w.-]+-(\d+)x(\d+))(\.mpd|/init\.mp4|/seg\d+\.m4s)$")
+
+
+def hls_playlist(stem: str, count: int) -> str:
+    """Returns an HLS media playlist
+
+    Args:
+        stem (str): Playlist file name without extension
+        count (int): Number of fragments
+
+    Returns:
+        str: Playlist text
+    """
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3",
+             f"#EXT-X-TARGETDURATION:{FRAGMENT_SECONDS}",
+             "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD"]
+    for index in range(count):
+        lines.append(f"#EXTINF:{FRAGMENT_SECONDS}.0,")
+        lines.append(f"{stem}/seg{index}.ts")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def dash_manifest(stem: str, count: int, size: int) -> str:
+    """Returns a static DASH manifest with one muxed representation
+
+    Args:
+        stem (str): Manifest file name without extension
+        count (int): Number of fragments
+        size (int): Bytes per fragment
+
+    Returns:
+        str: Manifest XML
+    """
+    duration = count * FRAGMENT_SECONDS
+    bandwidth = size * 8 // FRAGMENT_SECONDS
+    segments = "".join(f'<SegmentURL media="{stem}/seg{index}.m4s"/>'
+                       for index in range(count))
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+            f'mediaPresentationDuration="PT{duration}S" '
+            'minBufferTime="PT2S" '
+            'profiles="urn:mpeg:dash:profile:isoff-main:2011">'
+            f'<Period duration="PT{duration}S">'
+            '<AdaptationSet mimeType="video/mp4" '
+            'codecs="avc1.4d401f,mp4a.40.2">'
+            f'<Representation id="muxed" bandwidth="{bandwidth}" '
+            'width="1280" height="720">'
+            f'<SegmentList duration="{FRAGMENT_SECONDS}" timescale="1">'
+            f'<Initialization sourceURL="{stem}/init.mp4"/>{segments}'
+            '</SegmentList></Representation></AdaptationSet>'
+            '</Period></MPD>\n')
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    """Serves the synthetic media described by the request path
+    """
+    protocol_version = "HTTP/1.1"
+
+    def handle(self) -> None:
+        """Handles the requests of a connection, ignoring clients that hang
+        up early such as extractors probing the start of a file
+        """
+        try:
+            super().handle()
+        except ConnectionError:
+            pass
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Handles GET requests
+        """
+        self.respond(True)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Handles HEAD requests
+        """
+        self.respond(False)
+
+    def respond(self, send_body: bool) -> None:
+        """Sends the response for the request path
+
+        Args:
+            send_body (bool): False for HEAD requests
+        """
+        path = self.path.split("?", 1)[0]
+        match = PROGRESSIVE_REGEX.match(path)
+        if match:
+            self.send_media(int(match.group(1)), "video/mp4", send_body)
+            return
+        match = PAGE_REGEX.match(path)
+        if match:
+            self.send_text(
+                "<!DOCTYPE html><html><head><title>"
+                f"{match.group(1)}</title></head><body><video controls "
+                f'src="/progressive/{match.group(1)}.mp4"></video>'
+                "</body></html>\n", "text/html", send_body)
+            return
+        match = HLS_REGEX.match(path)
+        if match:
+            if match.group(4) == ".m3u8":
+                self.send_text(hls_playlist(match.group(1),
+                                            int(match.group(2))),
+                               "application/vnd.apple.mpegurl", send_body)
+            else:
+                self.send_media(int(match.group(3)), "video/mp2t",
+                                send_body)
+            return
+        match = DASH_REGEX.match(path)
+        if match:
+            if match.group(4) == ".mpd":
+                self.send_text(dash_manifest(match.group(1),
+                                             int(match.group(2)),
+                                             int(match.group(3))),
+                               "application/dash+xml", send_body)
+            elif match.group(4) == "/init.mp4":
+                self.send_media(1024, "video/mp4", send_body)
+            else:
+                self.send_media(int(match.group(3)), "video/iso.segment",
+                                send_body)
+            return
+        self.send_error(404)
+
+    def send_text(self, text: str, content_type: str,
+                  send_body: bool) -> None:
+        """Sends a text response
+
+        Args:
+            text (str): Body
+            content_type (str): MIME type
+            send_body (bool): False for HEAD requests
+        """
+        body = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_media(self, size: int, content_type: str,
+                   send_body: bool) -> None:
+        """Sends size bytes of synthetic media, honoring a Range header
+
+        Args:
+            size (int): Size of the media
+            content_type (str): MIME type
+            send_body (bool): False for HEAD requests
+        """
+        start, end = 0, size - 1
+        range_match = re.match(r"bytes=(\d*)-(\d*)$",
+                               self.headers.get("Range", ""))
+        if range_match and range_match.group(1):
+            start = int(range_match.group(1))
+            if range_match.group(2):
+                end = min(int(range_match.group(2)), size - 1)
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{ETAG_PREFIX}-{size:x}"')
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        if not send_body:
+            return
+        position = start
+        while position <= end:
+            offset = position % len(BLOCK)
+            chunk = BLOCK[offset:offset + min(len(BLOCK) - offset,
+                                              end - position + 1)]
+            self.wfile.write(chunk)
+            position += len(chunk)
+
+    def log_message(self, format: str,  # pylint: disable=redefined-builtin
+                    *args: object) -> None:
+        """Silences request logging
+        """
+
+
+def start_server(port: int = 0) -> ThreadingHTTPServer:
+    """Starts serving on a background thread
+
+    Args:
+        port (int, optional): Port or 0 for any free port. Defaults to 0.
+
+    Returns:
+        ThreadingHTTPServer: Server, server_address holds the bound port
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MediaRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mediaserver",
+                     daemon=True).start()
+    return server
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Serve synthetic media "
+                                     "for offline benchmarks.")
+    parser.add_argument("--port", type=int, default=0,
+                        help="Port to listen on, default=any free port.")
+    args = parser.parse_args(argv[1:])
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 MediaRequestHandler)
+    server.daemon_threads = True
+    print(f"PORT {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
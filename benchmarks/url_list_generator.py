@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+"""url_list_generator.py - Writes synthetic URL lists for parser benchmarks
+
+Text lists have comment and blank lines mixed in. Bookmark files follow
+the Netscape bookmark format exported by Chrome and Firefox, with folders
+nested up to a depth, folder names repeated across the tree, and the icon
+and date attributes that make real exports large. Files are written as they
+are generated so millions of entries need little memory.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import sys
+import base64
+import random
+import argparse
+from typing import TextIO
+
+# Formats that can be generated
+FORMAT_TXT = "txt"
+FORMAT_CHROME = "chrome"
+FORMAT_FIREFOX = "firefox"
+FORMATS = [FORMAT_TXT, FORMAT_CHROME, FORMAT_FIREFOX]
+# Folder names are taken from this pool so names repeat across the tree
+FOLDER_NAMES = ["Videos", "Music", "Watch later", "New folder", "Misc",
+                "Tutorials", "Imported", "Other bookmarks"]
+# Sites URLs are made for
+SITES = ["https://www.youtube.com/watch?v={id}",
+         "https://vimeo.com/{number}",
+         "https://www.dailymotion.com/video/x{id}",
+         "https://example.com/videos/{number}/{id}.html"]
+# One in ICON_EVERY bookmarks has an embedded icon like real exports
+ICON_EVERY = 10
+ICON_DATA = "data:image/png;base64," \
+    + base64.b64encode(bytes(range(256)) * 2).decode("ascii")
+# Seconds since the epoch used for ADD_DATE attributes
+BASE_DATE = 1700000000
+
+
+def make_url(rng: random.Random, index: int) -> str:
+    """Returns a unique realistic looking URL
+
+    Args:
+        rng (random.Random): Random generator
+        index (int): Index making the URL unique
+
+    Returns:
+        str: URL
+    """
+    site = SITES[rng.randrange(len(SITES))]
+    return site.format(id=f"{index:011x}", number=index)
+
+
+def write_txt(f: TextIO, count: int, seed: int = 0) -> None:
+    """Writes a text URL list with comment and blank lines
+
+    Args:
+        f (TextIO): File to write
+        count (int): Number of URLs
+        seed (int, optional): Random seed. Defaults to 0.
+    """
+    rng = random.Random(seed)
+    f.write("# Synthetic URL list\n")
+    for index in range(count):
+        if index % 100 == 0:
+            f.write(f"\n# Section {index // 100}\n")
+        f.write(make_url(rng, index) + "\n")
+
+
+def write_bookmarks(f: TextIO, count: int, browser: str,
+                    max_depth: int = 8, folder_size: int = 50,
+                    seed: int = 0) -> None:
+    """Writes a bookmark export in the Netscape bookmark format
+
+    Args:
+        f (TextIO): File to write
+        count (int): Number of bookmarks
+        browser (str): FORMAT_CHROME or FORMAT_FIREFOX
+        max_depth (int, optional): Deepest folder nesting. Defaults to 8.
+        folder_size (int, optional): Bookmarks per folder. Defaults to 50.
+        seed (int, optional): Random seed. Defaults to 0.
+    """
+    rng = random.Random(seed)
+    firefox = browser == FORMAT_FIREFOX
+    f.write("<!DOCTYPE NETSCAPE-Bookmark-file-1>\n"
+            "<!-- This is an automatically generated file.\n"
+            "     It will be read and overwritten.\n"
+            "     DO NOT EDIT! -->\n"
+            '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; '
+            'charset=UTF-8">\n'
+            "<TITLE>Bookmarks</TITLE>\n"
+            + ("<H1>Bookmarks Menu</H1>\n" if firefox
+               else "<H1>Bookmarks</H1>\n")
+            + "<DL><p>\n")
+    depth = 0
+    folder_count = 0
+    for index in range(count):
+        if index % folder_size == 0:
+            # Close folders down to a random level, then open a new one
+            target = rng.randint(0, min(depth, max_depth - 1))
+            while depth > target:
+                f.write("    " * depth + "</DL><p>\n")
+                depth -= 1
+            date = BASE_DATE + folder_count
+            name = FOLDER_NAMES[rng.randrange(len(FOLDER_NAMES))]
+            toolbar = ' PERSONAL_TOOLBAR_FOLDER="true"' \
+                if folder_count == 0 else ""
+            f.write("    " * (depth + 1) + f'<DT><H3 ADD_DATE="{date}" '
+                    f'LAST_MODIFIED="{date}"{toolbar}>{name}</H3>\n')
+            f.write("    " * (depth + 1) + "<DL><p>\n")
+            depth += 1
+            folder_count += 1
+        date = BASE_DATE + index
+        icon = f' ICON="{ICON_DATA}"' if index % ICON_EVERY == 0 else ""
+        if firefox:
+            attributes = f' ADD_DATE="{date}" LAST_MODIFIED="{date}"{icon}'
+        else:
+            attributes = f' ADD_DATE="{date}"{icon}'
+        f.write("    " * (depth + 1) + f'<DT><A HREF="{make_url(rng, index)}"'
+                f"{attributes}>Video {index} &amp; more</A>\n")
+        if firefox and index % 7 == 0:
+            f.write("    " * (depth + 1) + f"<DD>Description {index}\n")
+    while depth > 0:
+        f.write("    " * depth + "</DL><p>\n")
+        depth -= 1
+    f.write("</DL>\n")
+
+
+def write_url_list(file_path: str, file_format: str, count: int,
+                   max_depth: int = 8, seed: int = 0) -> None:
+    """Writes a URL list file
+
+    Args:
+        file_path (str): Path of the file
+        file_format (str): A FORMATS value
+        count (int): Number of URLs
+        max_depth (int, optional): Deepest folder nesting of bookmarks.
+            Defaults to 8.
+        seed (int, optional): Random seed. Defaults to 0.
+    """
+    with open(file_path, 'w', encoding="utf-8") as f:
+        if file_format == FORMAT_TXT:
+            write_txt(f, count, seed)
+        else:
+            write_bookmarks(f, count, file_format, max_depth, seed=seed)
+
+
+def main(argv: list[str]) -> int:
+    """Main function entry point
+
+    Args:
+        argv (list[str]): Command line arguments
+
+    Returns:
+        int: exit() value
+    """
+    parser = argparse.ArgumentParser(description="Write a synthetic URL "
+                                     "list or bookmark export.")
+    parser.add_argument("file", help="File to write.")
+    parser.add_argument("--format", choices=FORMATS, default=FORMAT_TXT,
+                        help="File format, default=txt.")
+    parser.add_argument("--urls", type=int, default=1000,
+                        help="Number of URLs, default=1000.")
+    parser.add_argument("--depth", type=int, default=8,
+                        help="Deepest bookmark folder nesting, default=8.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed, default=0.")
+    args = parser.parse_args(argv[1:])
+    write_url_list(args.file, args.format, args.urls, args.depth, args.seed)
+    return 0
+
+
+# Entry point
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -83,7 +83,7 @@ class BookmarkHTMLParser(HTMLParser):
         # Store parent widget for folder dialog
         self.parent_widget = parent
         # Handle case of URLs before a folder name
-        self.url_dict[""] = []
+        self.url_dict = {"": []}
         self.current_tag = ""
         self.in_folder_title = False
         self.current_folder = ""
@@ -135,11 +135,17 @@ class BookmarkHTMLParser(HTMLParser):
         # Folder names are stored in data of H3 tags
         if self.in_folder_title:
             self.current_folder = data
-            self.url_dict[self.current_folder] = []
+            # Folders with the same name share a list, keep earlier URLs
+            self.url_dict.setdefault(self.current_folder, [])
 
-    def get_url_list(self) -> list[str]:
+    def get_url_list(self, select_folder: bool = True) -> list[str]:
         """Returns list of URL strings
 
+        Args:
+            select_folder (bool, optional): Let the user select a folder if
+                there is more than one, otherwise URLs from all folders are
+                returned. Defaults to True.
+
         Returns:
             list[str]: Extracted URLs or empty list
         """
@@ -149,17 +155,20 @@ class BookmarkHTMLParser(HTMLParser):
             # Only one folder, just return all the values
             return list(self.url_dict[folders[0]])
         if len(folders) > 1:
-            dialog = FolderSelectDialog(self.parent_widget)
-            dialog.set_list(folders)
-            if dialog.exec():
+            folder = ""
+            if select_folder:
+                dialog = FolderSelectDialog(self.parent_widget)
+                dialog.set_list(folders)
+                if not dialog.exec():
+                    return []
                 folder = dialog.get_selected()
-                if folder:
-                    # Just return the list in the dictionary
-                    return self.url_dict[folder]
-                # No folder selected, combine all the folder lists into one
-                url_list: list[str] = []
-                for urls in list(self.url_dict.values()):
-                    url_list.extend(urls)
-                return url_list
+            if folder:
+                # Just return the list in the dictionary
+                return self.url_dict[folder]
+            # No folder selected, combine all the folder lists into one
+            url_list: list[str] = []
+            for urls in list(self.url_dict.values()):
+                url_list.extend(urls)
+            return url_list
         # Return empty URL list of no folders were found
         return []
@@ -20,6 +20,11 @@ class ComboBoxExt(QComboBox):
     changed: bool
     line_edit: QLineEdit
     mdl: QStandardItemModel
+    # Text and data of items from add_deferred_check_items() that are not
+    # yet in the list
+    deferred_items: list[tuple[str, Any]]
+    # Text of the deferred items that are checked
+    deferred_checked: set[str]
 
     def __init__(self, checkboxes: bool = False) -> None:
         """Initializer for ComboBoxExt
@@ -31,6 +36,8 @@ class ComboBoxExt(QComboBox):
         super().__init__()
         self.checkboxes = checkboxes
         self.changed = False
+        self.deferred_items = []
+        self.deferred_checked = set()
         if checkboxes:
             self.view().pressed.connect(self.item_pressed)
             self.mdl = QStandardItemModel(self)
@@ -64,6 +71,59 @@ class ComboBoxExt(QComboBox):
             # Uncheck item to make checkbox appear
             item.setCheckState(Qt.CheckState.Unchecked)
 
+    def add_deferred_check_items(self, items: list[tuple[str, Any]]) -> None:
+        """Like add_check_item() for many items, but the items are only
+           added to the list when it is first shown or accessed by index so
+           long lists do not slow down startup. Items can be checked and the
+           checked items read without adding them.
+
+        Args:
+            items (list[tuple[str, Any]]): Text and data of each item
+        """
+        self.deferred_items.extend(items)
+
+    def add_deferred_items(self) -> None:
+        """Adds the deferred items to the list, keeping their check state
+        """
+        if not self.deferred_items:
+            return
+        items = self.deferred_items
+        self.deferred_items = []
+        for text, user_data in items:
+            self.add_check_item(text, user_data)
+            if text in self.deferred_checked:
+                self.mdl.item(self.count() - 1, 0).setCheckState(
+                    Qt.CheckState.Checked)
+        self.deferred_checked = set()
+        self.update_edit_text()
+
+    def check_deferred_item(self, text: str, checked: bool) -> bool:
+        """Checks an item that is not yet added to the list
+
+        Args:
+            text (str): Text of item to check
+            checked (bool): True if item is to be checked
+
+        Returns:
+            bool: True if item is found
+        """
+        if not any(text == item_text for item_text, _ in self.deferred_items):
+            return False
+        if checked:
+            self.deferred_checked.add(text)
+        else:
+            self.deferred_checked.discard(text)
+        self.update_edit_text()
+        return True
+
+    @override
+    def showPopup(self) -> None:
+        """Override of showPopup() to add deferred items before they are
+           shown
+        """
+        self.add_deferred_items()
+        super().showPopup()
+
     @override
     def hidePopup(self) -> None:
         """Override of hidePopup() to allow combobox staying expanded
@@ -82,6 +142,7 @@ class ComboBoxExt(QComboBox):
         Returns:
             bool: True if item is found
         """
+        self.add_deferred_items()
         index = self.findText(text)
         if index != -1:
             self.setCurrentIndex(index)
@@ -112,6 +173,7 @@ class ComboBoxExt(QComboBox):
         Returns:
             bool: True if data is found
         """
+        self.add_deferred_items()
         index = self.findData(data)
         if index != -1:
             self.setCurrentIndex(index)
@@ -128,6 +190,7 @@ class ComboBoxExt(QComboBox):
         Returns:
             bool: True if item is found
         """
+        self.add_deferred_items()
         datalist = [(index, self.itemData(index))
                     for index in range(self.count())]
         closest = (-1, 0)
@@ -146,6 +209,7 @@ class ComboBoxExt(QComboBox):
         Returns:
             list[str]: List of all items' text
         """
+        self.add_deferred_items()
         return [self.itemText(i) for i in range(self.count())]
 
     def items_data(self) -> list[Any]:
@@ -154,6 +218,7 @@ class ComboBoxExt(QComboBox):
         Returns:
             list[Any]: List of all items' data
         """
+        self.add_deferred_items()
         return [self.itemData(i) for i in range(self.count())]
 
     def checked_items_text(self) -> list[str]:
@@ -165,7 +230,9 @@ class ComboBoxExt(QComboBox):
         if self.checkboxes:
             return [self.itemText(i) for i in range(self.count())
                     if self.mdl.item(i, 0).checkState() ==
-                    Qt.CheckState.Checked]
+                    Qt.CheckState.Checked] + \
+                [text for text, _ in self.deferred_items
+                 if text in self.deferred_checked]
         else:
             return []
 
@@ -178,7 +245,9 @@ class ComboBoxExt(QComboBox):
         if self.checkboxes:
             return [self.itemData(i) for i in range(self.count())
                     if self.mdl.item(i, 0).checkState() ==
-                    Qt.CheckState.Checked]
+                    Qt.CheckState.Checked] + \
+                [data for text, data in self.deferred_items
+                 if text in self.deferred_checked]
         else:
             return []
 
@@ -193,6 +262,7 @@ class ComboBoxExt(QComboBox):
             bool: True if item is found
         """
         if self.checkboxes:
+            self.add_deferred_items()
             item = self.mdl.item(index, 0)
             if item:
                 state = Qt.CheckState.Unchecked
@@ -219,6 +289,7 @@ class ComboBoxExt(QComboBox):
                 self.check_item_by_index(item_index, checked)
                 self.update_edit_text()
                 return True
+            return self.check_deferred_item(text, checked)
         return False
 
     def check_item_by_data(self, data: Any, checked: bool) -> bool:
@@ -237,6 +308,9 @@ class ComboBoxExt(QComboBox):
                 self.check_item_by_index(item_index, checked)
                 self.update_edit_text()
                 return True
+            for text, item_data in self.deferred_items:
+                if item_data == data:
+                    return self.check_deferred_item(text, checked)
         return False
 
     def check_items_by_text(self, text_list: list[str], checked: bool) -> None:
@@ -269,6 +343,7 @@ class ComboBoxExt(QComboBox):
             checked (bool): True if items are to be checked
         """
         if self.checkboxes:
+            self.add_deferred_items()
             for i in range(0, self.count()):
                 self.check_item_by_index(i, checked)
 
@@ -294,7 +369,8 @@ class ComboBoxExt(QComboBox):
             int: The count of checked items
         """
         if self.checkboxes:
-            return sum(self.is_item_checked(i) for i in range(self.count()))
+            return sum(self.is_item_checked(i) for i in range(self.count())) \
+                + len(self.deferred_checked)
         return 0
 
     def update_edit_text(self) -> None:
@@ -8,6 +8,7 @@ Author: Josh Buchbinder
 __author__ = "Josh Buchbinder"
 __copyright__ = "Copyright 2024, Josh Buchbinder"
 
+import logging
 from typing import Any, TYPE_CHECKING
 from PySide6.QtWidgets import QWidget
 if TYPE_CHECKING:
@@ -26,15 +27,191 @@ class AppConst:
     REGEX_COLORSTRIP = r'(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]'
     # Regex for escape sequences
     REGEX_ESCAPESEQ = r"(\x1B\[([\d;]+)m)"
+    # Regex for yt_dlp messages announcing a retry
+    REGEX_YDL_RETRY = r"Retrying.* \(\d+/\d+\)\.\.\."
     # URL list file extensions
     EXTENSIONS_URLLIST = ["html", "txt"]
-    # Format string for file progress bar
-    FORMATSTR_FILEPROGRESS = "%vMb/%mMb %p%"
-    # Format string for total progress bar
+    # Format string for file progress bar, {downloaded} and {total} are
+    # replaced by sizes before it is set
+    FORMATSTR_FILEPROGRESS = "{downloaded} / {total}  %p%"
+    # Format string for total progress bar while validating
     FORMATSTR_TOTALPROGRESS = "%v/%m"
+    # Format string for total progress bar while downloading
+    FORMATSTR_BATCHPROGRESS = "{processed}/{count} URLs  {downloaded} / " \
+        "{total}  %p%  {rate}/s  ETA {eta}"
+    # Range of the byte weighted progress bars
+    PROGRESS_BAR_SCALE = 1000
     # Help description
     HELP_DESCRIPTION = "Download video from URLs. Copyright 2024, " \
         "Josh Buchbinder."
+    # Query parameter prefixes and exact names removed when canonicalizing
+    # URLs. Short names such as "si" must not be prefixes as they would
+    # also remove parameters like "size" and "sig".
+    URL_TRACKING_PREFIXES = ("utm_",)
+    URL_TRACKING_PARAMS = frozenset(("fbclid", "gclid", "igshid", "si"))
+    # File name of the failed URL cache in the app data directory
+    FILENAME_NEGATIVECACHE = "failed_urls.json"
+    # Subdirectory of the app data directory run reports are written to by
+    # default, the number of reports kept there and report file prefix
+    REPORT_DIR = "reports"
+    REPORT_MAX_BATCHES = 50
+    REPORT_FILE_PREFIX = "report-"
+    # Columns of run reports
+    REPORT_FIELDS = ["url", "status", "extractor", "format_id", "bytes",
+                     "extract_seconds", "download_seconds",
+                     "postprocess_seconds", "total_seconds",
+                     "bytes_per_second", "retries", "error"]
+    # Run report status of URLs that failed validation
+    REPORT_STATUS_INVALID = "invalid"
+    # Seconds permanent and transient failures stay in the failed URL cache
+    NEGATIVECACHE_TTL_PERMANENT = 30 * 24 * 60 * 60
+    NEGATIVECACHE_TTL_TRANSIENT = 60 * 60
+    # Failed URL error classes (class name, is permanent, regex of message)
+    NEGATIVECACHE_ERROR_CLASSES: list[tuple[str, bool, str]] = [
+        ("unsupported", True, r"Unsupported URL|is not a valid URL"),
+        ("notfound", True, r"HTTP Error (404|410)"),
+        ("unavailable", True, r"Video unavailable|This video has been "
+         r"removed|This video is no longer available|Private video|"
+         r"account (associated with this video )?has been terminated"),
+        ("ratelimited", False, r"HTTP Error 429"),
+        ("servererror", False, r"HTTP Error 5\d\d"),
+        ("network", False, r"timed out|Connection reset|Connection refused|"
+         r"Temporary failure in name resolution|Name or service not known")]
+    # Number of concurrent URL validations
+    PREFLIGHT_WORKERS = 16
+    # Seconds validated metadata may be reused for downloading, stream
+    # URLs returned by many sites expire after a few hours
+    PREFLIGHT_INFO_TTL = 60 * 60
+    # Maximum number of validated metadata dicts kept for downloading
+    PREFLIGHT_MAX_INFOS = 5000
+    # Validation result classes
+    PREFLIGHT_AVAILABLE = "available"
+    PREFLIGHT_LOGIN = "login required"
+    PREFLIGHT_GEO = "geo-blocked"
+    PREFLIGHT_UNSUPPORTED = "unsupported"
+    PREFLIGHT_DEAD = "dead"
+    # Validation error classes (result class, regex of message)
+    PREFLIGHT_ERROR_CLASSES: list[tuple[str, str]] = [
+        (PREFLIGHT_UNSUPPORTED, r"Unsupported URL|is not a valid URL"),
+        (PREFLIGHT_GEO, r"not available (from|in) your (country|location)|"
+         r"geo.?restrict|blocked it in your country"),
+        (PREFLIGHT_LOGIN, r"[Ss]ign in|log ?in|logged.in|--cookies|"
+         r"[Pp]rivate video|members.only|[Aa]uthentication")]
+    # Subdirectories of a watched directory for claimed, finished and
+    # failed URL list files
+    WATCHFOLDER_PROCESSING_DIR = "processing"
+    WATCHFOLDER_DONE_DIR = "done"
+    WATCHFOLDER_FAILED_DIR = "failed"
+    # Milliseconds between scans of a watched directory in case file system
+    # change notifications are not available
+    WATCHFOLDER_POLL_INTERVAL = 5000
+    # Seconds a file must be unmodified before it is claimed
+    WATCHFOLDER_SETTLE_SECONDS = 2
+    # Milliseconds between renders of download progress (15 Hz)
+    PROGRESS_RENDER_INTERVAL = 66
+    # Seconds between message loop runs from the download progress hook
+    PROGRESS_EVENTS_INTERVAL = 0.05
+    # Maximum number of lines kept in the status window, the oldest
+    # 1/STATUS_LOG_TRIM_DIVISOR of the lines are removed when full
+    STATUS_LOG_MAX_LINES = 200000
+    STATUS_LOG_TRIM_DIVISOR = 10
+    # Size at which the --logfile file is rotated, number of rotated files
+    # kept and maximum number of messages written at once
+    LOGFILE_MAX_BYTES = 10 * 1024 * 1024
+    LOGFILE_BACKUP_COUNT = 5
+    LOGFILE_BATCH_SIZE = 1000
+    # Staging directories queued for the file mover before downloads wait,
+    # size of copy reads and writes, suffix of files being copied and
+    # names of intermediate files of yt_dlp that are not moved
+    MOVER_QUEUE_SIZE = 16
+    MOVER_CHUNK_BYTES = 4 * 1024 * 1024
+    MOVER_TEMP_SUFFIX = ".moving"
+    MOVER_PARTIAL_SUFFIXES = (".part", ".ytdl", MOVER_TEMP_SUFFIX)
+    MOVER_PARTIAL_MARKERS = (".part-Frag", ".temp.")
+    # Seconds between message loop runs while waiting for the file mover
+    MOVER_WAIT_INTERVAL = 0.05
+    # Default free space kept on download file systems, seconds between
+    # checks of the free space while downloads are paused and between
+    # message loop runs while paused
+    DISK_MARGIN_BYTES = 1024 * 1024 * 1024
+    DISK_CHECK_INTERVAL = 5.0
+    DISK_WAIT_INTERVAL = 0.05
+    # --dedup modes, file name of the content hash index in the app data
+    # directory, hash algorithm, files hashed at once, size of reads,
+    # suffix of links before they replace the file and the Linux ioctl
+    # that creates reflinks
+    DEDUP_MODE_HARDLINK = "hardlink"
+    DEDUP_MODE_REFLINK = "reflink"
+    FILENAME_DEDUP_INDEX = "content_hashes.json"
+    DEDUP_HASH = "sha256"
+    DEDUP_WORKERS = 4
+    DEDUP_CHUNK_BYTES = 16 * 1024 * 1024
+    DEDUP_TEMP_SUFFIX = ".dedup"
+    DEDUP_FICLONE = 0x40049409
+    # File name of the partial download records in the app data directory,
+    # smallest partial download worth recording, protocols downloaded as
+    # one file, suffixes of partial files and of the state file of
+    # fragmented downloads, seconds
+    # to wait for a server asked whether a file changed and number of
+    # servers asked at once in the background
+    FILENAME_PARTIALS = "partial_downloads.json"
+    RESUME_MIN_BYTES = 1024 * 1024
+    RESUME_PLAIN_PROTOCOLS = ("http", "https")
+    RESUME_PART_SUFFIX = ".part"
+    RESUME_STATE_SUFFIX = ".ytdl"
+    RESUME_PROBE_TIMEOUT = 10.0
+    RESUME_PROBE_WORKERS = 2
+    # Output template of yt_dlp, files are named like its default
+    OUTTMPL_FILENAME = "%(title)s [%(id)s].%(ext)s"
+    # --subdirs choices and the output template of their subdirectory.
+    # Missing fields go to an "unknown" subdirectory.
+    SUBDIRS_NONE = "none"
+    SUBDIRS_EXTRACTOR = "extractor"
+    SUBDIRS_UPLOADER = "uploader"
+    SUBDIRS_YEAR = "year"
+    SUBDIRS_MONTH = "month"
+    SUBDIRS_OUTTMPL: dict[str, str] = {
+        SUBDIRS_NONE: "",
+        SUBDIRS_EXTRACTOR: "%(extractor_key|unknown)s",
+        SUBDIRS_UPLOADER: "%(uploader,channel,uploader_id|unknown)s",
+        SUBDIRS_YEAR: "%(upload_date>%Y|unknown)s",
+        SUBDIRS_MONTH: "%(upload_date>%Y-%m|unknown)s"}
+    # --profile modes and sections
+    PROFILE_MODE_CPROFILE = "cprofile"
+    PROFILE_MODE_SAMPLE = "sample"
+    PROFILE_SECTION_ALL = "all"
+    PROFILE_SECTION_DOWNLOAD = "download"
+    PROFILE_SECTION_EXTRACT = "extract"
+    # Seconds between stack samples of the sampling profiler
+    PROFILE_SAMPLE_INTERVAL = 0.005
+    # Maximum number of --trace events kept, later events are dropped
+    TRACE_MAX_EVENTS = 2000000
+    # Milliseconds between --lagprobe timer firings, lag in milliseconds
+    # above which lags are counted together, and lag in milliseconds at
+    # which a lag is recorded in --trace
+    LAG_PROBE_INTERVAL = 20
+    LAG_PROBE_MAX_MS = 10000
+    LAG_PROBE_TRACE_MS = 100
+    # Target time from startup to the window being shown in milliseconds,
+    # --startupreport shows whether it was met and bench_startup.py fails
+    # if a warm run misses it
+    STARTUP_BUDGET_MS = 1000
+    # Milliseconds between checks whether yt_dlp is imported to print the
+    # startup report
+    STARTUP_REPORT_POLL_INTERVAL = 50
+    # Debug and info messages from yt_dlp shown per second per download job
+    # and the burst allowed at the start of a job
+    YDL_LOG_RATE = 20
+    YDL_LOG_BURST = 100
+    # Seconds of progress the batch download rate is averaged over and
+    # the minimum before a rate is shown
+    BATCH_RATE_WINDOW = 10
+    BATCH_RATE_MIN_SECONDS = 1
+    # Maximum number of rows in the downloads table, the oldest finished
+    # downloads are removed first
+    JOB_PROGRESS_MAX_ROWS = 1000
+    # Number of rows the downloads table shows without scrolling
+    JOB_PROGRESS_VISIBLE_ROWS = 4
     # Text at bottom of help
     HELP_EPILOG = "Most of these options set values in the GUI.\n" \
         "Using --noloadsettings without --nosavesettings will reset GUI " \
@@ -61,6 +238,8 @@ class SettingsConst:
     SETTINGS_VAL_KEEPFILES = "KeepFiles"
     SETTINGS_VAL_CONSOLEOUTPUT = "ConsoleOutput"
     SETTINGS_VAL_PREFERFREEFORMATS = "PreferFreeFormats"
+    SETTINGS_VAL_SKIPFAILED = "SkipFailed"
+    SETTINGS_VAL_VALIDATE = "Validate"
     SETTINGS_VAL_SUBTITLEFORMAT = "SubtitleFormat"
     SETTINGS_VAL_SUBTITLECONVERT = "SubtitleConvert"
     SETTINGS_VAL_SUBTITLEMERGE = "SubtitleMerge"
@@ -125,6 +304,10 @@ class SettingsConst:
                 SettingsConst.SETTINGS_VAL_PREFERFREEFORMATS, False),
             (mainwindow.consoleoutput_check,
                 SettingsConst.SETTINGS_VAL_CONSOLEOUTPUT, False),
+            (mainwindow.skipfailed_check,
+                SettingsConst.SETTINGS_VAL_SKIPFAILED, True),
+            (mainwindow.validate_check,
+                SettingsConst.SETTINGS_VAL_VALIDATE, False),
             (mainwindow.subsgenerated_check,
                 SettingsConst.SETTINGS_VAL_AUTOGENSUBS, False),
             (mainwindow.subs_lang_combo,
@@ -166,6 +349,12 @@ class ComboBoxConst:
     URL_TYPE_SINGLE = 0
     URL_TYPE_LIST = 1
 
+    # Status window filter labels and logging module levels
+    STATUS_LEVEL_LIST = [("All messages", logging.NOTSET),
+                         ("Information", logging.INFO),
+                         ("Warnings", logging.WARNING),
+                         ("Errors", logging.ERROR)]
+
     SUBTITLES_DOWNFMT_LIST = ["vtt", "ttml", "srv3", "srv2", "srv1", "json3"]
     SUBTITLES_CNVTFMT_LIST = [
         ("None", ""),
@@ -340,7 +529,7 @@ class ToolTips:
         "list."
     TTT_URL_TEXT = "The URL of a page with a video to download."
     TTT_LIST_FORMATS_BUTTON = "Retrieve the list of video and audio formats " \
-        "available for this URL."
+        "available for this URL\nand show them in a sortable table."
     TTT_LIST_PATH_TEXT = "The path to text file or bookmark HTML containing " \
         "the URLs to download."
     TTT_LIST_PATH_BROSE_BUTTON = "Use dialog to browse to URL list path."
@@ -373,8 +562,63 @@ class ToolTips:
     TTT_KEEPFILES_CHECK = "Keep media files after post processing."
     TTT_PREFERFREEFORMATS_CHECK = "Prefer downloading media formats with " \
         "free containers over non-free ones of same quality."
-    TTT_CONSOLEOUTPUT_CHECK = "The yt_dlp library will output to the " \
-        "console that launched this program.\nUseful for debugging."
+    TTT_CONSOLEOUTPUT_CHECK = "Show yt_dlp debug output in the status " \
+        "window and print status\nmessages to the console that launched " \
+        "this program.\nUseful for debugging."
+    TTT_SKIPFAILED_CHECK = "Skip URLs that failed recently with errors " \
+        "such as unsupported,\nnot found or unavailable instead of " \
+        "retrying them.\nPermanent errors are remembered for 30 days, " \
+        "transient errors for 1 hour."
+    TTT_WATCHDIR = "Watch a directory for new URL list files (.txt or " \
+        ".html) and download them.\nFiles are moved to the processing, " \
+        "done and failed subdirectories."
+    TTT_LOGFILE = "Write all status messages with timestamps to this log " \
+        "file.\nThe file is rotated when it exceeds 10 MiB, keeping 5 old " \
+        "files."
+    TTT_REPORTDIR = "Write a JSON and CSV report with the status, size " \
+        "and stage timings\nof each URL to this directory after every " \
+        "batch. By default reports are\nwritten to the application data " \
+        "directory."
+    TTT_STAGINGDIR = "Download into this directory, for example on fast " \
+        "local storage,\nand move finished files to the download path in " \
+        "the background.\nPartial files of failed downloads stay there " \
+        "and are resumed."
+    TTT_DISKMARGIN = "Free space in MiB to keep on the download and " \
+        "staging file systems.\nDownloads whose estimated size does not " \
+        "fit pause until space\nis freed, default=1024."
+    TTT_NODISKCHECK = "Do not check the free disk space before " \
+        "downloading."
+    TTT_DEDUP = "After each batch replace downloaded files identical to " \
+        "a file downloaded\nbefore with a hardlink or reflink to it, " \
+        "keeping an index of file hashes\nin the application data " \
+        "directory. Reflinks need Btrfs, XFS or similar."
+    TTT_SUBDIRS = "Download into subdirectories of the download path " \
+        "named by extractor,\nuploader, upload year or upload month " \
+        "(YYYY-MM) to keep directories small,\ndefault=none."
+    TTT_TRACE = "Write spans of download stages, hooks and status " \
+        "updates to this file\nin Chrome trace event format on exit, for " \
+        "viewing in chrome://tracing or Perfetto."
+    TTT_LAGPROBE = "Measure how long the window is unresponsive during " \
+        "downloads\nand show the median, 99th percentile and longest " \
+        "freeze after each batch."
+    TTT_STARTUPREPORT = "Print how long each phase of startup takes, the " \
+        "time until\nthe window is shown compared to its budget and how " \
+        "long yt_dlp\ntakes to import in the background."
+    TTT_PROFILE = "Profile the session and write <prefix>.pstats and a " \
+        "<prefix>.folded file\nof collapsed stacks for flame graphs on exit."
+    TTT_PROFILEMODE = "cprofile measures every function call of the " \
+        "profiled threads,\nsample records the stacks of all threads 200 " \
+        "times per second\nwith much lower overhead, default=cprofile."
+    TTT_PROFILESECTION = "Only profile download jobs or metadata " \
+        "extraction\n(validation, list formats and subtitles), " \
+        "default=all."
+    TTT_SHARD = "Only download URLs of shard i of n, for example 2/5, to " \
+        "split URL lists\nacross processes or machines. URLs are assigned " \
+        "by a stable hash."
+    TTT_VALIDATE_CHECK = "Check all URLs concurrently before downloading " \
+        "and report\nwhich are available, need a login, are geo-blocked, " \
+        "unsupported or dead,\nalong with the estimated total download " \
+        "size.\nOnly available URLs are downloaded."
     TTT_SUBSGENERATED_CHECK = "Download automatically generated caption " \
         "text.\nIf not selected, user supplied subtitles will be downloaded " \
         "if available."
@@ -421,10 +665,18 @@ class ToolTips:
     TTT_FORMAT_STRING_HELP_BUTTON = "Launches a browser directed to " \
         "detailed information about creating yt-dlp format strings."
     TTT_STATUSWINDOW_TEXT = "This window shows status text.\nYou can " \
-        "pinch and zoom the text in this window or\nhold ctrl and use the " \
-        "mouse wheel to change the zoom factor,\nand copy text by dragging " \
-        "and then pressing CTRL-C.\nClicking on a blue link will change " \
-        "download options."
+        "hold ctrl and use the mouse wheel to change the zoom factor,\nand " \
+        "copy lines by selecting them and then pressing CTRL-C.\n" \
+        "Double-click a line to only show lines of its download.\n" \
+        "Clicking on a blue link will change download options."
+    TTT_STATUS_LEVEL_COMBO = "Only show status lines of this level or " \
+        "higher."
+    TTT_STATUS_ALLJOBS_BUTTON = "Show status lines of all downloads."
+    TTT_JOB_TABLE = "Progress, speed and estimated time left of each " \
+        "download."
+    TTT_FORMATS_EXT_COMBO = "Only show formats with this file extension."
+    TTT_FORMATS_ACODEC_COMBO = "Only show formats with this audio codec."
+    TTT_FORMATS_VCODEC_COMBO = "Only show formats with this video codec."
     TTT_CLOSE_BUTTON = "Close this window."
     TTT_DOWNLOAD_BUTTON = "Begin downloading and processing " \
         "files with the current settings."
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+
+"""dedup.py - Replaces downloaded files that are identical to files
+downloaded before with links to them
+
+The same video often arrives under different URLs or as a re-upload. A
+persistent index maps content hashes to the first file seen with that
+content, and later identical files are replaced with a hardlink or reflink
+to it so the data is only stored once.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import sys
+import json
+import mmap
+import errno
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from constants import AppConst
+from tracer import TRACER
+
+
+class DedupResult:
+    """Outcome of deduplicating one file
+    """
+    __slots__ = ("path", "original", "size", "linked", "error")
+    # Path of the downloaded file
+    path: str
+    # File it is identical to, empty if it is the first with its content
+    original: str
+    # Bytes of the file
+    size: int
+    # True if the file was replaced with a link to the original
+    linked: bool
+    # Error message, empty if none
+    error: str
+
+    def __init__(self, path: str) -> None:
+        """Initializer for DedupResult
+
+        Args:
+            path (str): Path of the downloaded file
+        """
+        self.path = path
+        self.original = ""
+        self.size = 0
+        self.linked = False
+        self.error = ""
+
+
+def hash_file(path: str) -> str:
+    """Returns the content hash of a file, read through a memory map in
+    large sequential chunks. The hash releases the GIL so several files
+    are hashed in parallel.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: Hex digest
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    hasher = hashlib.new(AppConst.DEDUP_HASH)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        try:
+            # Empty files cannot be mapped
+            if not size:
+                return hasher.hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    for offset in range(0, size, AppConst.DEDUP_CHUNK_BYTES):
+                        hasher.update(
+                            view[offset:offset + AppConst.DEDUP_CHUNK_BYTES])
+        except (OSError, ValueError):
+            # Some network file systems cannot be mapped
+            hasher = hashlib.new(AppConst.DEDUP_HASH)
+            f.seek(0)
+            while True:
+                chunk = f.read(AppConst.DEDUP_CHUNK_BYTES)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def same_contents(path1: str, path2: str) -> bool:
+    """Compares two files byte for byte
+
+    Args:
+        path1 (str): First file
+        path2 (str): Second file
+
+    Returns:
+        bool: True if the files are identical
+
+    Raises:
+        OSError: If a file cannot be read
+    """
+    if os.path.getsize(path1) != os.path.getsize(path2):
+        return False
+    with open(path1, 'rb') as file1, open(path2, 'rb') as file2:
+        while True:
+            chunk = file1.read(AppConst.DEDUP_CHUNK_BYTES)
+            if chunk != file2.read(AppConst.DEDUP_CHUNK_BYTES):
+                return False
+            if not chunk:
+                return True
+
+
+def reflink_file(source: str, destination: str) -> None:
+    """Creates a copy of a file that shares its data until either is
+    modified, on file systems that support it such as Btrfs and XFS
+
+    Args:
+        source (str): File to copy
+        destination (str): Path of the new file
+
+    Raises:
+        OSError: If the platform or file system does not support reflinks
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are only supported on "
+                      "Linux")
+    # pylint: disable-next=import-outside-toplevel
+    import fcntl
+    with open(source, 'rb') as source_file, \
+            open(destination, 'wb') as destination_file:
+        fcntl.ioctl(destination_file.fileno(), AppConst.DEDUP_FICLONE,
+                    source_file.fileno())
+
+
+class Deduplicator:
+    """Hashes downloaded files in a worker pool and replaces files with the
+    same content as an indexed file with links to it. Files are compared
+    byte for byte before linking, and replaced atomically so a file is
+    never missing.
+    """
+    # Path of JSON file the index is stored in
+    file_path: str
+    # One of the AppConst.DEDUP_MODE_ values
+    mode: str
+    # Content hash to the path of the first file with that content
+    hashes: dict[str, str]
+    # Path to (size, modification time in ns, content hash) of indexed
+    # files, so unchanged files are not hashed again
+    files: dict[str, tuple[int, int, str]]
+    # Protects hashes, files and dirty from worker threads
+    lock: threading.Lock
+    # True if the index changed since loading
+    dirty: bool
+    executor: ThreadPoolExecutor
+
+    def __init__(self, file_path: str,
+                 mode: str = AppConst.DEDUP_MODE_HARDLINK,
+                 max_workers: int = AppConst.DEDUP_WORKERS) -> None:
+        """Initializer for Deduplicator
+
+        Args:
+            file_path (str): Path of JSON file to store the index in. If
+                empty the index is not persisted.
+            mode (str, optional): One of the AppConst.DEDUP_MODE_ values.
+                Defaults to AppConst.DEDUP_MODE_HARDLINK.
+            max_workers (int, optional): Number of files hashed at once.
+                Defaults to AppConst.DEDUP_WORKERS.
+        """
+        self.file_path = file_path
+        self.mode = mode
+        self.hashes = {}
+        self.files = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="dedup")
+
+    def load(self) -> None:
+        """Loads the index from file
+        """
+        self.hashes = {}
+        self.files = {}
+        self.dirty = False
+        if not self.file_path or not os.path.isfile(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for path, (size, mtime_ns, digest) in data.get("files",
+                                                       {}).items():
+            self.files[path] = (size, mtime_ns, digest)
+            self.hashes.setdefault(digest, path)
+
+    def save(self) -> None:
+        """Saves the index to file if it has changed
+        """
+        if not self.file_path or not self.dirty:
+            return
+        temp_path = self.file_path + ".tmp"
+        try:
+            with self.lock:
+                with open(temp_path, 'w', encoding="utf-8") as f:
+                    json.dump({"version": 1, "files": self.files}, f)
+                self.dirty = False
+            # Replace atomically so a crash never leaves a partial file
+            os.replace(temp_path, self.file_path)
+        except OSError:
+            pass
+
+    def submit(self, path: str) -> Future[DedupResult]:
+        """Queues a downloaded file for deduplication
+
+        Args:
+            path (str): Path of the file
+
+        Returns:
+            Future[DedupResult]: Future for the result
+        """
+        return self.executor.submit(self.dedup_file, path)
+
+    def shutdown(self) -> None:
+        """Waits for queued files and shuts down the worker threads
+        """
+        self.executor.shutdown(wait=True)
+
+    def add_file(self, path: str, size: int, mtime_ns: int,
+                 digest: str) -> None:
+        """Adds a file to the index, it becomes the original of its content
+        if there is none. Call with lock held.
+
+        Args:
+            path (str): File path
+            size (int): Bytes of the file
+            mtime_ns (int): Modification time in nanoseconds
+            digest (str): Content hash
+        """
+        self.files[path] = (size, mtime_ns, digest)
+        self.hashes.setdefault(digest, path)
+        self.dirty = True
+
+    def dedup_file(self, path: str) -> DedupResult:
+        """Worker function, hashes a file and replaces it with a link if
+        an identical file is indexed
+
+        Args:
+            path (str): Path of the file
+
+        Returns:
+            DedupResult: Outcome for the file
+        """
+        result = DedupResult(path)
+        with TRACER.span("dedup_file", "dedup", {"path": path}):
+            try:
+                self.deduplicate(path, result)
+            except OSError as e:
+                result.linked = False
+                result.error = str(e)
+        return result
+
+    def deduplicate(self, path: str, result: DedupResult) -> None:
+        """Hashes a file and replaces it with a link if an identical file
+        is indexed
+
+        Args:
+            path (str): Path of the file
+            result (DedupResult): Result to fill in
+
+        Raises:
+            OSError: If a file cannot be read or linked
+        """
+        stat = os.stat(path)
+        result.size = stat.st_size
+        with self.lock:
+            entry = self.files.get(path)
+        if entry is not None and entry[:2] == (stat.st_size,
+                                               stat.st_mtime_ns):
+            digest = entry[2]
+        else:
+            digest = hash_file(path)
+        with self.lock:
+            original = self.hashes.get(digest, path)
+            if original == path:
+                self.add_file(path, stat.st_size, stat.st_mtime_ns, digest)
+                return
+        try:
+            original_stat = os.stat(original)
+        except FileNotFoundError:
+            original_stat = None
+        if original_stat is None \
+                or original_stat.st_size != stat.st_size \
+                or not same_contents(original, path):
+            # The original was removed or changed, this file replaces it
+            with self.lock:
+                self.hashes[digest] = path
+                self.add_file(path, stat.st_size, stat.st_mtime_ns, digest)
+            return
+        result.original = original
+        if original_stat.st_ino == stat.st_ino \
+                and original_stat.st_dev == stat.st_dev:
+            # Already the same file
+            return
+        if original_stat.st_dev != stat.st_dev:
+            # Links cannot cross file systems, keep both copies
+            with self.lock:
+                self.add_file(path, stat.st_size, stat.st_mtime_ns, digest)
+            return
+        self.link_file(original, path)
+        result.linked = True
+        stat = os.stat(path)
+        with self.lock:
+            self.add_file(path, stat.st_size, stat.st_mtime_ns, digest)
+
+    def link_file(self, original: str, path: str) -> None:
+        """Replaces a file with a link to an identical file. The link is
+        created under a temporary name and renamed over the file.
+
+        Args:
+            original (str): File to link to
+            path (str): File to replace
+
+        Raises:
+            OSError: If the link cannot be created
+        """
+        temp_path = path + AppConst.DEDUP_TEMP_SUFFIX
+        try:
+            if self.mode == AppConst.DEDUP_MODE_REFLINK:
+                reflink_file(original, temp_path)
+            else:
+                os.link(original, temp_path)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            raise
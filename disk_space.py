@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+"""disk_space.py - Admission of downloads by the free disk space
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import shutil
+from typing import Any, Optional
+from constants import AppConst
+from utils import estimate_info_bytes, format_bytes
+
+
+def needed_info_bytes(info: dict[str, Any]) -> Optional[int]:
+    """Estimates the disk space a download needs at its peak from the
+    sizes of the selected formats. Merging writes the output file while the
+    downloaded formats still exist, so merged downloads need twice their
+    size.
+
+    Args:
+        info (dict[str, Any]): Metadata after format selection
+
+    Returns:
+        Optional[int]: Estimated bytes or None if unknown
+    """
+    estimated_bytes = estimate_info_bytes(info)
+    if estimated_bytes is not None \
+            and len(info.get("requested_formats") or []) > 1:
+        estimated_bytes *= 2
+    return estimated_bytes
+
+
+class DiskSpaceGuard:
+    """Decides whether a download fits on the file systems it is written
+    to. A download is admitted when its estimated size, the bytes reserved
+    for finished downloads still waiting to be moved there and a safety
+    margin fit in the free space, so long runs pause instead of failing
+    with a full disk halfway through a file.
+    """
+    # Bytes kept free on every file system
+    margin: int
+
+    def __init__(self, margin: int = AppConst.DISK_MARGIN_BYTES) -> None:
+        """Initializer for DiskSpaceGuard
+
+        Args:
+            margin (int, optional): Bytes kept free. Defaults to
+                AppConst.DISK_MARGIN_BYTES.
+        """
+        self.margin = margin
+
+    @staticmethod
+    def free_bytes(directory: str) -> Optional[int]:
+        """Returns the free space of the file system of a directory
+
+        Args:
+            directory (str): Directory path
+
+        Returns:
+            Optional[int]: Bytes available or None if unknown
+        """
+        try:
+            return shutil.disk_usage(directory).free
+        except OSError:
+            return None
+
+    def required_space(self, needed: int, download_dir: str,
+                       staging_dir: str = "",
+                       reserved: int = 0) -> list[tuple[str, int]]:
+        """Returns the bytes a download needs free on each file system
+
+        Args:
+            needed (int): Estimated bytes of the download
+            download_dir (str): Directory files end up in
+            staging_dir (str, optional): Directory files are downloaded to
+                before being moved. Defaults to "".
+            reserved (int, optional): Bytes in the staging directory still
+                to be moved to the download directory. Defaults to 0.
+
+        Returns:
+            list[tuple[str, int]]: Directory and required bytes for each
+                file system, including the margin
+        """
+        required = [(staging_dir or download_dir, needed + self.margin)]
+        if staging_dir:
+            try:
+                same_device = os.stat(staging_dir).st_dev \
+                    == os.stat(download_dir).st_dev
+            except OSError:
+                same_device = False
+            if not same_device:
+                # Moved files are copied, renames need no space
+                required.append((download_dir,
+                                 needed + reserved + self.margin))
+        return required
+
+    def shortfall(self, needed: int, download_dir: str,
+                  staging_dir: str = "", reserved: int = 0) -> str:
+        """Checks whether a download fits
+
+        Args:
+            needed (int): Estimated bytes of the download
+            download_dir (str): Directory files end up in
+            staging_dir (str, optional): Directory files are downloaded to
+                before being moved. Defaults to "".
+            reserved (int, optional): Bytes in the staging directory still
+                to be moved to the download directory. Defaults to 0.
+
+        Returns:
+            str: Description of the missing space, empty if it fits or the
+                free space is unknown
+        """
+        for directory, required in self.required_space(
+                needed, download_dir, staging_dir, reserved):
+            free = self.free_bytes(directory)
+            if free is not None and free < required:
+                return f"{format_bytes(required)} needed including a " \
+                    f"{format_bytes(self.margin)} margin, " \
+                    f"{format_bytes(free)} free in {directory}"
+        return ""
+
+    def exceeds_capacity(self, needed: int, download_dir: str,
+                         staging_dir: str = "") -> str:
+        """Checks whether a download can never fit, even on empty file
+        systems
+
+        Args:
+            needed (int): Estimated bytes of the download
+            download_dir (str): Directory files end up in
+            staging_dir (str, optional): Directory files are downloaded to
+                before being moved. Defaults to "".
+
+        Returns:
+            str: Description of the file system that is too small, empty if
+                the download can fit
+        """
+        for directory, required in self.required_space(
+                needed, download_dir, staging_dir):
+            try:
+                total = shutil.disk_usage(directory).total
+            except OSError:
+                continue
+            if total < required:
+                return f"{format_bytes(required)} needed including a " \
+                    f"{format_bytes(self.margin)} margin, the file " \
+                    f"system of {directory} holds {format_bytes(total)}"
+        return ""
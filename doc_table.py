@@ -1,23 +1,25 @@
 #!/usr/bin/env python3
 
-"""doc_table.py - DocTable class encapsulating QTextDocument and QTextTable
+"""doc_table.py - DocTable class building a text table with links
 """
 
 __author__ = "Josh Buchbinder"
 __copyright__ = "Copyright 2024, Josh Buchbinder"
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QFont, QBrush, QColor
-from PySide6.QtGui import QTextCursor, QTextDocument
-from PySide6.QtGui import QTextTableFormat, QTextTable, QTextFrameFormat
 from constants import LinkIds
 
+# Text between columns
+COLUMN_SEP = " | "
 
-class DocTable(QTextDocument):
-    """Subclass of QTextDocument that encapsulates the document and a table
+
+class DocTable:
+    """Table of text fields with optional links rendered as fixed width
+    lines for the status window
     """
-    table_format: QTextTableFormat
-    table: QTextTable
+    title: str
+    headers: list[str]
+    # Rows of (text, link) fields as passed to add_row()
+    rows: list[list[tuple[str | list[str], str]]]
 
     def __init__(self, title: str, headers: list[str]) -> None:
         """Initializer for DocTable
@@ -26,39 +28,13 @@ class DocTable(QTextDocument):
             title (str): Table title
             headers (list[str]): Headers for table
         """
-        super().__init__()
-        self.table_format = QTextTableFormat()
-        self.table_format.setCellPadding(5)
-        self.table_format.setCellSpacing(0)
-        self.table_format.setBorder(1)
-        self.table_format.setBorderStyle(
-            QTextFrameFormat.BorderStyle.BorderStyle_Solid)
-        self.table_format.setBorderBrush(QBrush(Qt.GlobalColor.black))
-        cursor = QTextCursor(self)
-        self.table = cursor.insertTable(1, len(headers), self.table_format)
-        self.add_headers([title])
-        self.table.appendRows(1)
-        self.add_headers(headers)
-
-    def add_headers(self, headers: list[str]) -> None:
-        """Adds a row of headers
-
-        Args:
-            headers (list[str]): List of headers text
-        """
-        row = self.table.rows() - 1
-        for idx, header in enumerate(headers):
-            cell = self.table.cellAt(row, idx)
-            cursor = cell.firstCursorPosition()
-            fmt = cell.format()
-            fmt.setFontWeight(QFont.Weight.Bold)
-            fmt.setForeground(QBrush(QColor.fromRgb(200, 100, 50)))
-            cell.setFormat(fmt)
-            cursor.insertText(header)
+        self.title = title
+        self.headers = headers
+        self.rows = []
 
     def add_row(self, fields:
                 list[tuple[str | list[str], str]]) -> None:
-        """Adds a row to a QTextTable
+        """Adds a row to the table
         Args:
 
             fields (list[tuple[tuple[str | list[str], str]]): List of
@@ -66,37 +42,61 @@ class DocTable(QTextDocument):
                 "" it is not a link. if text is a list the text is formed
                 from the list making links for each.
         """
-        row = self.table.rows()
-        self.table.appendRows(1)
-        for idx, field in enumerate(fields):
-            cell = self.table.cellAt(row, idx)
-            cursor = cell.firstCursorPosition()
-            if field[0]:
-                fmt_orig = cursor.charFormat()
-                if field[1]:
-                    # Link
-                    fmt = fmt_orig
-                    fmt.setAnchor(True)
-                    if isinstance(field[0], list):
-                        # A list of link strings
-                        for s in field[0]:
-                            link = field[1] + LinkIds.LINKID_SEP + s
-                            fmt.setAnchorHref(link)
-                            cursor.insertText(s, fmt)
-                            cursor.insertText(" ", fmt_orig)
-                    else:
-                        fmt.setAnchorHref(field[1])
-                        cursor.insertText(str(field[0]), fmt)
-                    # Restore original format
-                    cursor.setCharFormat(fmt_orig)
-                else:
-                    # Plain text
-                    cursor.insertText(str(field[0]))
+        self.rows.append(fields)
+
+    @staticmethod
+    def field_text(field: tuple[str | list[str], str]) -> str:
+        """Returns the displayed text of a field
+
+        Args:
+            field (tuple[str | list[str], str]): (text, link) field
+
+        Returns:
+            str: Text of field
+        """
+        if isinstance(field[0], list):
+            return " ".join(field[0])
+        return str(field[0]) if field[0] else ""
 
-    def to_html(self) -> str:
-        """Returns the QTextDocument as HTML
+    def to_lines(self) -> list[tuple[str, tuple[tuple[int, int, str], ...],
+                                     bool]]:
+        """Returns the table as text lines with padded columns
 
         Returns:
-            str: Document in HTML form
+            list[tuple[str, tuple[tuple[int, int, str], ...], bool]]: List
+                of (text, links, is header) where links are
+                (start, end, href) positions in text
         """
-        return self.toHtml()
+        widths = [len(header) for header in self.headers]
+        for fields in self.rows:
+            for idx, field in enumerate(fields):
+                widths[idx] = max(widths[idx], len(self.field_text(field)))
+        header_text = COLUMN_SEP.join(header.ljust(widths[idx])
+                                      for idx, header
+                                      in enumerate(self.headers))
+        lines: list[tuple[str, tuple[tuple[int, int, str], ...], bool]] = [
+            (self.title, (), True), (header_text.rstrip(), (), True),
+            ("-+-".join("-" * width for width in widths), (), False)]
+        for fields in self.rows:
+            text = ""
+            links: list[tuple[int, int, str]] = []
+            for idx, field in enumerate(fields):
+                if idx:
+                    text += COLUMN_SEP
+                if field[1] and isinstance(field[0], list):
+                    # A list of link strings
+                    for sub_idx, s in enumerate(field[0]):
+                        if sub_idx:
+                            text += " "
+                        link = field[1] + LinkIds.LINKID_SEP + s
+                        links.append((len(text), len(text) + len(s), link))
+                        text += s
+                    text += " " * (widths[idx] - len(self.field_text(field)))
+                    continue
+                field_text = self.field_text(field)
+                if field[1] and field_text:
+                    links.append((len(text), len(text) + len(field_text),
+                                  field[1]))
+                text += field_text.ljust(widths[idx])
+            lines.append((text.rstrip(), tuple(links), False))
+        return lines
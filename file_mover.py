@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+"""file_mover.py - Background mover of downloaded files from the staging
+directory to the download directory
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import time
+import queue
+import threading
+from typing import Optional
+from constants import AppConst
+from tracer import TRACER
+
+
+class MoveResult:
+    """Outcome of moving one file
+    """
+    __slots__ = ("source", "destination", "size", "seconds", "error",
+                 "kept_existing")
+    # Path of the file in the staging directory
+    source: str
+    # Final path in the download directory
+    destination: str
+    # Bytes moved
+    size: int
+    # Seconds the move took
+    seconds: float
+    # Error message, empty if the file was moved
+    error: str
+    # True if the file was discarded because the destination exists
+    kept_existing: bool
+
+    def __init__(self, source: str, destination: str) -> None:
+        """Initializer for MoveResult
+
+        Args:
+            source (str): Path of the file in the staging directory
+            destination (str): Final path in the download directory
+        """
+        self.source = source
+        self.destination = destination
+        self.size = 0
+        self.seconds = 0.0
+        self.error = ""
+        self.kept_existing = False
+
+
+def is_partial(name: str) -> bool:
+    """Returns True if a file name is an intermediate file of yt_dlp, such
+    as a partial download, a fragment or a postprocessing temporary
+
+    Args:
+        name (str): File name
+
+    Returns:
+        bool: True if the file is not a complete download
+    """
+    return name.endswith(AppConst.MOVER_PARTIAL_SUFFIXES) \
+        or any(marker in name for marker in AppConst.MOVER_PARTIAL_MARKERS)
+
+
+def fsync_file(path: str) -> None:
+    """Flushes the contents of a file to disk
+
+    Args:
+        path (str): File path
+
+    Raises:
+        OSError: If the file cannot be opened
+    """
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_directory(path: str) -> None:
+    """Flushes a directory entry to disk so a rename into it survives a
+    crash, does nothing where directories cannot be opened (Windows)
+
+    Args:
+        path (str): Directory path
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileMover:
+    """Moves the files of finished downloads out of their staging
+    directories on a background thread, so the next download starts
+    without waiting for copies to slow storage. Files on the same file
+    system are renamed, others are copied to a temporary name, flushed to
+    disk, checked for size and renamed. The queue is bounded so downloads
+    wait when the mover falls behind instead of filling the staging
+    directory.
+    """
+    # (staging directory, download directory, overwrite, bytes) or None to
+    # stop
+    entries: queue.Queue[Optional[tuple[str, str, bool, int]]]
+    # Results for the GUI thread to show
+    results: queue.SimpleQueue[MoveResult]
+    thread: Optional[threading.Thread]
+    # Number of submitted directories not yet moved and their bytes
+    unfinished: int
+    pending_bytes: int
+    idle_condition: threading.Condition
+
+    def __init__(self, max_queued: int = AppConst.MOVER_QUEUE_SIZE) -> None:
+        """Initializer for FileMover
+
+        Args:
+            max_queued (int, optional): Directories queued before submit()
+                blocks. Defaults to AppConst.MOVER_QUEUE_SIZE.
+        """
+        self.entries = queue.Queue(max_queued)
+        self.results = queue.SimpleQueue()
+        self.thread = None
+        self.unfinished = 0
+        self.pending_bytes = 0
+        self.idle_condition = threading.Condition()
+
+    def start(self) -> None:
+        """Starts the mover thread
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="mover",
+                                           daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        """Moves all queued files and stops the thread
+        """
+        if self.thread is None:
+            return
+        self.entries.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def submit(self, staging_dir: str, download_dir: str, overwrite: bool,
+               timeout: float, size: int = 0) -> bool:
+        """Queues the files of a finished download for moving
+
+        Args:
+            staging_dir (str): Staging directory of the download, removed
+                once empty
+            download_dir (str): Directory to move the files to
+            overwrite (bool): True to replace existing files, otherwise the
+                staged file is discarded
+            timeout (float): Seconds to wait while the queue is full
+            size (int, optional): Bytes of the download, reserved in the
+                download directory until moved. Defaults to 0.
+
+        Returns:
+            bool: True if queued, False if the queue stayed full
+        """
+        with self.idle_condition:
+            self.unfinished += 1
+            self.pending_bytes += size
+        try:
+            self.entries.put((staging_dir, download_dir, overwrite, size),
+                             timeout=timeout)
+        except queue.Full:
+            with self.idle_condition:
+                self.unfinished -= 1
+                self.pending_bytes -= size
+                self.idle_condition.notify_all()
+            return False
+        return True
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Waits for all submitted files to be moved
+
+        Args:
+            timeout (float): Seconds to wait at most
+
+        Returns:
+            bool: True if nothing is left to move
+        """
+        with self.idle_condition:
+            return self.idle_condition.wait_for(
+                lambda: self.unfinished == 0, timeout)
+
+    def take_results(self) -> list[MoveResult]:
+        """Returns the results of the moves finished since the last call
+
+        Returns:
+            list[MoveResult]: Results in the order files were moved
+        """
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def run(self) -> None:
+        """Thread function, moves queued directories
+        """
+        while True:
+            entry = self.entries.get()
+            if entry is None:
+                break
+            staging_dir, download_dir, overwrite, size = entry
+            with TRACER.span("move_files", "mover", {"dir": staging_dir}):
+                self.move_directory(staging_dir, download_dir, overwrite)
+            with self.idle_condition:
+                self.unfinished -= 1
+                self.pending_bytes -= size
+                self.idle_condition.notify_all()
+
+    def move_directory(self, staging_dir: str, download_dir: str,
+                       overwrite: bool) -> None:
+        """Moves the complete files of a staging directory, keeping the
+        subdirectories created by the output template, and removes the
+        directories left empty
+
+        Args:
+            staging_dir (str): Staging directory of a download
+            download_dir (str): Directory to move the files to
+            overwrite (bool): True to replace existing files
+        """
+        def walk_error(e: OSError) -> None:
+            result = MoveResult(e.filename or staging_dir, download_dir)
+            result.error = str(e)
+            self.results.put(result)
+
+        # Parent directories are walked before their subdirectories
+        walked_dirs = []
+        for directory, subdirs, names in os.walk(staging_dir,
+                                                 onerror=walk_error):
+            subdirs.sort()
+            walked_dirs.append(directory)
+            target_dir = os.path.normpath(os.path.join(
+                download_dir, os.path.relpath(directory, staging_dir)))
+            moved = False
+            for name in sorted(names):
+                source = os.path.join(directory, name)
+                # Leftovers of interrupted downloads are not complete files
+                if is_partial(name) or not os.path.isfile(source):
+                    continue
+                destination = os.path.join(target_dir, name)
+                try:
+                    os.makedirs(target_dir, exist_ok=True)
+                except OSError as e:
+                    result = MoveResult(source, destination)
+                    result.error = str(e)
+                    self.results.put(result)
+                    continue
+                self.results.put(self.move_file(source, destination,
+                                                overwrite))
+                moved = True
+            if moved:
+                fsync_directory(target_dir)
+        for directory in reversed(walked_dirs):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                # Not empty, partial files are kept for resuming
+                pass
+
+    def move_file(self, source: str, destination: str,
+                  overwrite: bool) -> MoveResult:
+        """Moves a file, renaming it if possible
+
+        Args:
+            source (str): File to move
+            destination (str): Final path
+            overwrite (bool): True to replace an existing file
+
+        Returns:
+            MoveResult: Outcome of the move
+        """
+        result = MoveResult(source, destination)
+        start = time.perf_counter()
+        try:
+            result.size = os.path.getsize(source)
+            if not overwrite and os.path.exists(destination):
+                os.remove(source)
+                result.kept_existing = True
+            elif os.stat(source).st_dev == os.stat(
+                    os.path.dirname(destination)).st_dev:
+                # yt_dlp does not flush its files
+                fsync_file(source)
+                os.replace(source, destination)
+            else:
+                self.copy_file(source, destination, result.size)
+                os.remove(source)
+        except OSError as e:
+            result.error = str(e)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    def copy_file(source: str, destination: str, size: int) -> None:
+        """Copies a file to another file system under a temporary name,
+        flushes it to disk, checks its size and renames it, so the final
+        path only ever holds a complete file
+
+        Args:
+            source (str): File to copy
+            destination (str): Final path
+            size (int): Expected size in bytes
+
+        Raises:
+            OSError: If copying fails or the copy has the wrong size
+        """
+        temp_path = destination + AppConst.MOVER_TEMP_SUFFIX
+        try:
+            with open(source, 'rb') as source_file, \
+                    open(temp_path, 'wb') as temp_file:
+                while True:
+                    chunk = source_file.read(AppConst.MOVER_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    temp_file.write(chunk)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            copied = os.path.getsize(temp_path)
+            if copied != size:
+                raise OSError(f"Copied {copied} of {size} bytes to "
+                              f"{destination}")
+            os.replace(temp_path, destination)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
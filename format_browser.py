@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+"""format_browser.py - Window listing the formats available for a video
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+from typing import Any, Optional
+from collections.abc import Callable
+from overrides import override
+from PySide6.QtCore import Qt, QObject, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import QSortFilterProxyModel, QPersistentModelIndex
+from PySide6.QtGui import QFont, QColor
+from PySide6.QtWidgets import QWidget, QTableView, QLabel, QVBoxLayout
+from PySide6.QtWidgets import QHBoxLayout, QHeaderView, QAbstractItemView
+from comboboxext import ComboBoxExt
+from constants import LinkIds, StringMaps, ToolTips
+
+# Item data role returning the value columns are sorted by
+SORT_ROLE = Qt.ItemDataRole.UserRole
+# Item data role returning the link of a cell or empty string
+LINK_ROLE = Qt.ItemDataRole.UserRole + 1
+
+# Columns as (header, format dict key, is numeric, suffix, link id)
+FORMAT_COLUMNS: list[tuple[str, str, bool, str, str]] = [
+    ("ID", "format_id", False, "", LinkIds.LINKID_FORMATID),
+    ("Extension", "ext", False, "", LinkIds.LINKID_FILEEXT),
+    # TODO - Implement audio and video codec links
+    ("Audio codec", "acodec", False, "", ""),
+    ("Video codec", "vcodec", False, "", ""),
+    ("Resolution", "resolution", False, "", LinkIds.LINKID_RESOLUTION),
+    ("Bitrate", "tbr", True, " K/s", ""),
+    ("Size", "filesize", True, " bytes", ""),
+    ("Note", "format_note", False, "", "")]
+COLUMN_EXT = 1
+COLUMN_ACODEC = 2
+COLUMN_VCODEC = 3
+COLUMN_RESOLUTION = 4
+
+
+class FormatRow:
+    """Display texts and sort keys of a single format
+    """
+    __slots__ = ("texts", "sort_keys")
+    texts: list[str]
+    sort_keys: list[Any]
+
+    def __init__(self, fmt: dict[str, Any]) -> None:
+        """Initializer for FormatRow
+
+        Args:
+            fmt (dict[str, Any]): Format dict from yt_dlp metadata
+        """
+        self.texts = []
+        self.sort_keys = []
+        for _, key, is_numeric, suffix, _ in FORMAT_COLUMNS:
+            value = fmt.get(key)
+            if not value:
+                self.texts.append("")
+                self.sort_keys.append(-1 if is_numeric else "")
+            elif is_numeric:
+                self.texts.append(format(value, ',') + suffix)
+                self.sort_keys.append(value)
+            else:
+                self.texts.append(str(value) + suffix)
+                self.sort_keys.append(str(value).lower())
+        # Sort resolutions by pixels, audio only formats first
+        self.sort_keys[COLUMN_RESOLUTION] = \
+            (fmt.get("height") or 0) * (fmt.get("width") or 0)
+
+
+class FormatTableModel(QAbstractTableModel):
+    """Table model of the formats of a video
+    """
+    rows: list[FormatRow]
+    link_font: QFont
+    link_color: QColor
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        """Initializer for FormatTableModel
+
+        Args:
+            parent (Optional[QObject], optional): Parent object.
+                Defaults to None.
+        """
+        super().__init__(parent)
+        self.rows = []
+        self.link_font = QFont()
+        self.link_font.setUnderline(True)
+        self.link_color = QColor(Qt.GlobalColor.blue)
+
+    def set_formats(self, format_list: list[dict[str, Any]]) -> None:
+        """Replaces the formats shown
+
+        Args:
+            format_list (list[dict[str, Any]]): Format dicts from yt_dlp
+                metadata
+        """
+        self.beginResetModel()
+        self.rows = [FormatRow(fmt) for fmt in format_list
+                     if isinstance(fmt, dict)]
+        self.endResetModel()
+
+    @override
+    def rowCount(self, parent: QModelIndex | QPersistentModelIndex
+                 = QModelIndex()) -> int:
+        """Override of rowCount
+
+        Args:
+            parent (QModelIndex | QPersistentModelIndex, optional): Parent
+                index. Defaults to QModelIndex().
+
+        Returns:
+            int: Number of formats
+        """
+        return 0 if parent.isValid() else len(self.rows)
+
+    @override
+    def columnCount(self, parent: QModelIndex | QPersistentModelIndex
+                    = QModelIndex()) -> int:
+        """Override of columnCount
+
+        Args:
+            parent (QModelIndex | QPersistentModelIndex, optional): Parent
+                index. Defaults to QModelIndex().
+
+        Returns:
+            int: Number of columns
+        """
+        return 0 if parent.isValid() else len(FORMAT_COLUMNS)
+
+    @override
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        """Override of headerData
+
+        Args:
+            section (int): Column or row number
+            orientation (Qt.Orientation): Header orientation
+            role (int, optional): Data role.
+                Defaults to Qt.ItemDataRole.DisplayRole.
+
+        Returns:
+            Any: Column header text
+        """
+        if orientation == Qt.Orientation.Horizontal \
+                and role == Qt.ItemDataRole.DisplayRole:
+            return FORMAT_COLUMNS[section][0]
+        return None
+
+    def link(self, row: int, column: int) -> str:
+        """Returns the link of a cell
+
+        Args:
+            row (int): Row number
+            column (int): Column number
+
+        Returns:
+            str: Link or empty string if the cell is not a link
+        """
+        link_id = FORMAT_COLUMNS[column][4]
+        text = self.rows[row].texts[column]
+        if not link_id or not text:
+            return ""
+        return link_id + LinkIds.LINKID_SEP + text
+
+    @override
+    def data(self, index: QModelIndex | QPersistentModelIndex,
+             role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        """Override of data
+
+        Args:
+            index (QModelIndex | QPersistentModelIndex): Item index
+            role (int, optional): Data role.
+                Defaults to Qt.ItemDataRole.DisplayRole.
+
+        Returns:
+            Any: Data of cell for role
+        """
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row.texts[column]
+        if role == SORT_ROLE:
+            return row.sort_keys[column]
+        if role == Qt.ItemDataRole.TextAlignmentRole \
+                and FORMAT_COLUMNS[column][2]:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        link = self.link(index.row(), column)
+        if not link:
+            return None
+        if role == LINK_ROLE:
+            return link
+        if role == Qt.ItemDataRole.FontRole:
+            return self.link_font
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.link_color
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return StringMaps.STRINGMAP_LINKID_TOOLTIP.get(
+                FORMAT_COLUMNS[column][4], "")
+        return None
+
+
+class FormatFilterModel(QSortFilterProxyModel):
+    """Proxy model sorting formats and filtering them by codec and
+    extension
+    """
+    # Shown extension, audio codec and video codec or "" for any
+    ext: str
+    acodec: str
+    vcodec: str
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        """Initializer for FormatFilterModel
+
+        Args:
+            parent (Optional[QObject], optional): Parent object.
+                Defaults to None.
+        """
+        super().__init__(parent)
+        self.ext = ""
+        self.acodec = ""
+        self.vcodec = ""
+        self.setSortRole(SORT_ROLE)
+
+    def set_filter(self, ext: str, acodec: str, vcodec: str) -> None:
+        """Changes the formats shown
+
+        Args:
+            ext (str): Extension or "" for any
+            acodec (str): Audio codec name without profile or "" for any
+            vcodec (str): Video codec name without profile or "" for any
+        """
+        self.ext = ext
+        self.acodec = acodec
+        self.vcodec = vcodec
+        self.invalidateFilter()
+
+    @override
+    def filterAcceptsRow(self, source_row: int,
+                         source_parent: QModelIndex |
+                         QPersistentModelIndex) -> bool:
+        """Override of filterAcceptsRow
+
+        Args:
+            source_row (int): Row in the source model
+            source_parent (QModelIndex | QPersistentModelIndex): Parent
+                index in the source model
+
+        Returns:
+            bool: True if the row is shown
+        """
+        model = self.sourceModel()
+        assert isinstance(model, FormatTableModel)
+        texts = model.rows[source_row].texts
+        return (not self.ext or texts[COLUMN_EXT] == self.ext) \
+            and (not self.acodec
+                 or codec_name(texts[COLUMN_ACODEC]) == self.acodec) \
+            and (not self.vcodec
+                 or codec_name(texts[COLUMN_VCODEC]) == self.vcodec)
+
+
+def codec_name(codec: str) -> str:
+    """Returns a codec without its profile, avc1.640028 becomes avc1
+
+    Args:
+        codec (str): Codec from format dict
+
+    Returns:
+        str: Codec name
+    """
+    return codec.split(".", 1)[0]
+
+
+class FormatBrowser(QWidget):
+    """Window with a sortable and filterable table of the formats of a
+    video. Clicking an ID, extension or resolution selects it in the
+    download options like the links in the status window.
+    """
+    link_click_callback: Callable[[str], None]
+    title_label: QLabel
+    ext_combo: ComboBoxExt
+    acodec_combo: ComboBoxExt
+    vcodec_combo: ComboBoxExt
+    table_view: QTableView
+    format_model: FormatTableModel
+    filter_model: FormatFilterModel
+
+    def __init__(self, link_click_callback: Callable[[str], None],
+                 parent: Optional[QWidget] = None) -> None:
+        """Initializer for FormatBrowser
+
+        Args:
+            link_click_callback (Callable[[str], None]): Called with the
+                link of clicked cells
+            parent (Optional[QWidget], optional): Parent widget.
+                Defaults to None.
+        """
+        super().__init__(parent, Qt.WindowType.Window)
+        self.link_click_callback = link_click_callback
+        self.setWindowTitle("File formats")
+        self.title_label = QLabel()
+        self.ext_combo = ComboBoxExt()
+        self.acodec_combo = ComboBoxExt()
+        self.vcodec_combo = ComboBoxExt()
+        self.table_view = QTableView()
+        self.format_model = FormatTableModel(self)
+        self.filter_model = FormatFilterModel(self)
+        self.filter_model.setSourceModel(self.format_model)
+        self.table_view.setModel(self.filter_model)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.setSelectionBehavior(
+            QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_view.setEditTriggers(
+            QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table_view.verticalHeader().setVisible(False)
+        self.table_view.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.ResizeToContents)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.clicked.connect(self.cell_clicked)
+        for combo in [self.ext_combo, self.acodec_combo, self.vcodec_combo]:
+            combo.currentIndexChanged.connect(lambda _: self.update_filter())
+        self.ext_combo.setToolTip(ToolTips.TTT_FORMATS_EXT_COMBO)
+        self.acodec_combo.setToolTip(ToolTips.TTT_FORMATS_ACODEC_COMBO)
+        self.vcodec_combo.setToolTip(ToolTips.TTT_FORMATS_VCODEC_COMBO)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Extension:"))
+        filter_layout.addWidget(self.ext_combo)
+        filter_layout.addWidget(QLabel("Audio codec:"))
+        filter_layout.addWidget(self.acodec_combo)
+        filter_layout.addWidget(QLabel("Video codec:"))
+        filter_layout.addWidget(self.vcodec_combo)
+        filter_layout.addStretch()
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.title_label)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.table_view)
+        self.resize(900, 500)
+
+    def set_formats(self, title: str,
+                    format_list: list[dict[str, Any]]) -> None:
+        """Shows the formats of a video
+
+        Args:
+            title (str): Title of the video
+            format_list (list[dict[str, Any]]): Format dicts from yt_dlp
+                metadata
+        """
+        self.title_label.setText(title)
+        self.format_model.set_formats(format_list)
+        texts = [row.texts for row in self.format_model.rows]
+        combos = [(self.ext_combo, "Any", COLUMN_EXT, False),
+                  (self.acodec_combo, "Any", COLUMN_ACODEC, True),
+                  (self.vcodec_combo, "Any", COLUMN_VCODEC, True)]
+        for combo, any_label, column, is_codec in combos:
+            values = {codec_name(row[column]) if is_codec else row[column]
+                      for row in texts}
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(any_label, "")
+            for value in sorted(value for value in values if value):
+                combo.addItem(value, value)
+            combo.blockSignals(False)
+        self.update_filter()
+
+    def update_filter(self) -> None:
+        """Applies the filter combo boxes to the table
+        """
+        self.filter_model.set_filter(self.ext_combo.currentData() or "",
+                                     self.acodec_combo.currentData() or "",
+                                     self.vcodec_combo.currentData() or "")
+
+    def cell_clicked(self, index: QModelIndex) -> None:
+        """Called when a table cell is clicked
+
+        Args:
+            index (QModelIndex): Index in the filter model
+        """
+        link = index.data(LINK_ROLE)
+        if link:
+            self.link_click_callback(link)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+
+"""job_progress_model.py - Table model of the progress of download jobs
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+from bisect import bisect_left
+from typing import Any, Optional
+from overrides import override
+from PySide6.QtCore import Qt, QObject, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import QPersistentModelIndex
+from constants import AppConst
+from job_store import JobStatus
+from utils import format_bytes, format_duration
+
+
+class JobStage:
+    """Stages of a download job shown in the downloads table
+    """
+    EXTRACTING = "Extracting"
+    # Waiting for free disk space
+    PAUSED = "Paused"
+    DOWNLOADING = "Downloading"
+    POSTPROCESSING = "Postprocessing"
+    DONE = "Done"
+    FAILED = "Failed"
+    SKIPPED = "Skipped"
+    CANCELED = "Canceled"
+    # Stages of jobs no longer in flight
+    FINISHED = (DONE, FAILED, SKIPPED, CANCELED)
+
+
+# Stage of a job after it finished with a JobStatus
+STAGE_OF_STATUS: dict[int, str] = {
+    JobStatus.DONE: JobStage.DONE,
+    JobStatus.FAILED: JobStage.FAILED,
+    JobStatus.SKIPPED: JobStage.SKIPPED,
+    JobStatus.CANCELED: JobStage.CANCELED}
+
+# Column headers
+JOB_COLUMNS = ["URL", "Title", "Stage", "Bytes", "Speed", "ETA", "Fragment"]
+COLUMN_STAGE = 2
+
+
+class JobProgressRow:
+    """Progress of a single download job
+    """
+    __slots__ = ("job", "url", "title", "stage", "downloaded_bytes",
+                 "total_bytes", "speed", "eta", "fragment_index",
+                 "fragment_count")
+    job: int
+    url: str
+    title: str
+    stage: str
+    downloaded_bytes: Optional[int]
+    # total_bytes or total_bytes_estimate of the progress dict
+    total_bytes: Optional[float]
+    speed: Optional[float]
+    eta: Optional[float]
+    fragment_index: Optional[int]
+    fragment_count: Optional[int]
+
+    def __init__(self, job: int, url: str) -> None:
+        """Initializer for JobProgressRow
+
+        Args:
+            job (int): Job id
+            url (str): URL being downloaded
+        """
+        self.job = job
+        self.url = url
+        self.title = ""
+        self.stage = JobStage.EXTRACTING
+        self.downloaded_bytes = None
+        self.total_bytes = None
+        self.speed = None
+        self.eta = None
+        self.fragment_index = None
+        self.fragment_count = None
+
+    def text(self, column: int) -> str:
+        """Returns the displayed text of a column
+
+        Args:
+            column (int): Column number
+
+        Returns:
+            str: Text of column
+        """
+        if column == 0:
+            return self.url
+        if column == 1:
+            return self.title
+        if column == COLUMN_STAGE:
+            return self.stage
+        if column == 3:
+            if self.downloaded_bytes is None:
+                return ""
+            text = format_bytes(self.downloaded_bytes)
+            if self.total_bytes:
+                text += f" / {format_bytes(self.total_bytes)}"
+            return text
+        if self.stage != JobStage.DOWNLOADING:
+            return ""
+        if column == 4:
+            return "" if self.speed is None \
+                else f"{format_bytes(self.speed)}/s"
+        if column == 5:
+            return "" if self.eta is None else format_duration(self.eta)
+        if self.fragment_index is None:
+            return ""
+        if self.fragment_count:
+            return f"{self.fragment_index}/{self.fragment_count}"
+        return str(self.fragment_index)
+
+
+class JobProgressModel(QAbstractTableModel):
+    """Table model with a row per download job. Rows are only changed by
+    method calls from the GUI thread, which only signal the row that
+    changed so many rows stay cheap.
+    """
+    rows: list[JobProgressRow]
+    # Job ids of rows, jobs are added in increasing order
+    row_jobs: list[int]
+    # Maximum number of rows before finished rows are removed
+    max_rows: int
+
+    def __init__(self, parent: Optional[QObject] = None,
+                 max_rows: int = AppConst.JOB_PROGRESS_MAX_ROWS) -> None:
+        """Initializer for JobProgressModel
+
+        Args:
+            parent (Optional[QObject], optional): Parent object.
+                Defaults to None.
+            max_rows (int, optional): Maximum number of rows before
+                finished rows are removed.
+                Defaults to AppConst.JOB_PROGRESS_MAX_ROWS.
+        """
+        super().__init__(parent)
+        self.rows = []
+        self.row_jobs = []
+        self.max_rows = max_rows
+
+    def row_of(self, job: int) -> int:
+        """Returns the row number of a job
+
+        Args:
+            job (int): Job id
+
+        Returns:
+            int: Row number or -1 if the job has no row
+        """
+        row = bisect_left(self.row_jobs, job)
+        if row < len(self.row_jobs) and self.row_jobs[row] == job:
+            return row
+        return -1
+
+    def start_job(self, job: int, url: str) -> None:
+        """Adds a row for a job
+
+        Args:
+            job (int): Job id, greater than any previous job id
+            url (str): URL being downloaded
+        """
+        self.trim()
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(JobProgressRow(job, url))
+        self.row_jobs.append(job)
+        self.endInsertRows()
+
+    def trim(self) -> None:
+        """Removes the oldest finished rows if the model is full
+        """
+        if len(self.rows) < self.max_rows:
+            return
+        # Finished jobs are nearly always the oldest, only remove those
+        count = 0
+        while count < len(self.rows) - self.max_rows // 2 \
+                and self.rows[count].stage in JobStage.FINISHED:
+            count += 1
+        if count:
+            self.beginRemoveRows(QModelIndex(), 0, count - 1)
+            del self.rows[:count]
+            del self.row_jobs[:count]
+            self.endRemoveRows()
+
+    def clear(self) -> None:
+        """Removes all rows
+        """
+        self.beginResetModel()
+        self.rows = []
+        self.row_jobs = []
+        self.endResetModel()
+
+    def update_job(self, job: int, progress_dict: dict[str, Any]) -> None:
+        """Updates a job from a yt_dlp progress dict
+
+        Args:
+            job (int): Job id
+            progress_dict (dict[str, Any]): Progress dict from yt_dlp
+        """
+        row = self.row_of(job)
+        if row < 0:
+            return
+        item = self.rows[row]
+        info_dict = progress_dict.get("info_dict", None)
+        if not item.title and isinstance(info_dict, dict):
+            item.title = str(info_dict.get("title") or "")
+        if progress_dict.get("status", None) == "downloading":
+            item.stage = JobStage.DOWNLOADING
+        item.total_bytes = progress_dict.get("total_bytes", None) \
+            or progress_dict.get("total_bytes_estimate", None)
+        item.downloaded_bytes = progress_dict.get("downloaded_bytes", None)
+        if item.downloaded_bytes is None \
+                and progress_dict.get("status", None) == "finished":
+            # Files already downloaded are reported without it
+            item.downloaded_bytes = item.total_bytes
+        item.speed = progress_dict.get("speed", None)
+        item.eta = progress_dict.get("eta", None)
+        item.fragment_index = progress_dict.get("fragment_index", None)
+        item.fragment_count = progress_dict.get("fragment_count", None)
+        self.row_changed(row)
+
+    def set_stage(self, job: int, stage: str) -> None:
+        """Changes the stage of a job
+
+        Args:
+            job (int): Job id
+            stage (str): JobStage value
+        """
+        row = self.row_of(job)
+        if row < 0 or self.rows[row].stage == stage:
+            return
+        self.rows[row].stage = stage
+        self.row_changed(row)
+
+    def row_changed(self, row: int) -> None:
+        """Signals views that a row changed
+
+        Args:
+            row (int): Row number
+        """
+        self.dataChanged.emit(self.index(row, 0),
+                              self.index(row, len(JOB_COLUMNS) - 1),
+                              [Qt.ItemDataRole.DisplayRole])
+
+    @override
+    def rowCount(self, parent: QModelIndex | QPersistentModelIndex
+                 = QModelIndex()) -> int:
+        """Override of rowCount
+
+        Args:
+            parent (QModelIndex | QPersistentModelIndex, optional): Parent
+                index. Defaults to QModelIndex().
+
+        Returns:
+            int: Number of jobs
+        """
+        return 0 if parent.isValid() else len(self.rows)
+
+    @override
+    def columnCount(self, parent: QModelIndex | QPersistentModelIndex
+                    = QModelIndex()) -> int:
+        """Override of columnCount
+
+        Args:
+            parent (QModelIndex | QPersistentModelIndex, optional): Parent
+                index. Defaults to QModelIndex().
+
+        Returns:
+            int: Number of columns
+        """
+        return 0 if parent.isValid() else len(JOB_COLUMNS)
+
+    @override
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        """Override of headerData
+
+        Args:
+            section (int): Column or row number
+            orientation (Qt.Orientation): Header orientation
+            role (int, optional): Data role.
+                Defaults to Qt.ItemDataRole.DisplayRole.
+
+        Returns:
+            Any: Column header text
+        """
+        if orientation == Qt.Orientation.Horizontal \
+                and role == Qt.ItemDataRole.DisplayRole:
+            return JOB_COLUMNS[section]
+        return None
+
+    @override
+    def data(self, index: QModelIndex | QPersistentModelIndex,
+             role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        """Override of data
+
+        Args:
+            index (QModelIndex | QPersistentModelIndex): Item index
+            role (int, optional): Data role.
+                Defaults to Qt.ItemDataRole.DisplayRole.
+
+        Returns:
+            Any: Data of cell for role
+        """
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole,
+                    Qt.ItemDataRole.ToolTipRole):
+            return self.rows[index.row()].text(index.column())
+        if role == Qt.ItemDataRole.TextAlignmentRole \
+                and index.column() > COLUMN_STAGE:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
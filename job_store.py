@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+"""job_store.py - Compact storage of the download jobs of a batch
+
+Queued URLs are held in a list with the index of the watch folder file they
+came from and the status in arrays, about 13 bytes per URL on 64 bit Python
+plus the URL string which is shared with the parsed URL list. A Job object
+is only created for the URL being downloaded and error messages are only
+stored for failed URLs. Run benchmarks/bench_job_store.py to measure.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+from array import array
+from typing import Optional
+
+
+class JobStatus:
+    """Job status values
+    """
+    QUEUED = 0
+    ACTIVE = 1
+    DONE = 2
+    FAILED = 3
+    SKIPPED = 4
+    CANCELED = 5
+    # Names of the values for reports
+    NAMES = ["queued", "active", "done", "failed", "skipped", "canceled"]
+
+
+class Job:
+    """A URL taken from the queue for downloading
+    """
+    __slots__ = ("index", "url", "source", "status")
+    # Index of the URL in the JobStore
+    index: int
+    # URL to download
+    url: str
+    # Claimed watch folder file the URL came from or empty string, shared
+    # by all jobs from one file
+    source: str
+    # One of the JobStatus values
+    status: int
+
+    def __init__(self, index: int, url: str, source: str) -> None:
+        """Initializer for Job
+
+        Args:
+            index (int): Index of the URL in the JobStore
+            url (str): URL to download
+            source (str): Claimed watch folder file the URL came from
+        """
+        self.index = index
+        self.url = url
+        self.source = source
+        self.status = JobStatus.QUEUED
+
+
+class JobStore:
+    """URLs of a batch in queue order. URLs are taken from the queue by
+    advancing a position and stay in the store for reporting. Downloaded
+    filenames are kept in a dict for constant time membership checks from
+    progress callbacks.
+    """
+    # All URLs of the batch in queue order
+    urls: list[str]
+    # Index in source_names of the source of each URL
+    source_indexes: array
+    # Distinct sources and their indexes in source_names
+    source_names: list[str]
+    source_lookup: dict[str, int]
+    # Index of the next queued URL
+    position: int
+    # JobStatus value of each URL
+    statuses: array
+    # Error messages of failed and canceled URLs by index
+    errors: dict[int, str]
+    # Number of URLs with each JobStatus value
+    status_counts: list[int]
+    # Downloaded filenames in insertion order, values are unused
+    filenames: dict[str, None]
+    # Final paths of completed downloads after postprocessing and moving
+    # out of the staging directory, values are unused
+    completed_files: dict[str, None]
+
+    def __init__(self) -> None:
+        """Initializer for JobStore
+        """
+        self.urls = []
+        self.source_indexes = array("I")
+        self.source_names = [""]
+        self.source_lookup = {"": 0}
+        self.position = 0
+        self.statuses = array("B")
+        self.errors = {}
+        self.status_counts = [0] * (JobStatus.CANCELED + 1)
+        self.filenames = {}
+        self.completed_files = {}
+
+    def start_batch(self) -> None:
+        """Removes jobs and filenames of the previous batch, keeping URLs
+        that are still queued
+        """
+        self.urls = self.urls[self.position:]
+        self.source_indexes = self.source_indexes[self.position:]
+        # Forget sources of finished watch folder files
+        used_indexes = set(self.source_indexes)
+        used_indexes.add(0)
+        self.source_lookup = {name: index for name, index
+                              in self.source_lookup.items()
+                              if index in used_indexes}
+        self.position = 0
+        self.statuses = array("B", bytes(len(self.urls)))
+        self.errors = {}
+        self.status_counts = [0] * (JobStatus.CANCELED + 1)
+        self.status_counts[JobStatus.QUEUED] = len(self.urls)
+        self.filenames = {}
+        self.completed_files = {}
+
+    def extend(self, url_list: list[str], source: str = "") -> None:
+        """Queues a list of URLs
+
+        Args:
+            url_list (list[str]): URLs to download
+            source (str, optional): Claimed watch folder file the URLs came
+                from. Defaults to "".
+        """
+        source_index = self.source_lookup.get(source)
+        if source_index is None:
+            source_index = len(self.source_names)
+            self.source_names.append(source)
+            self.source_lookup[source] = source_index
+        self.urls.extend(url_list)
+        self.source_indexes.extend([source_index] * len(url_list))
+        self.statuses.frombytes(bytes(len(url_list)))
+        self.status_counts[JobStatus.QUEUED] += len(url_list)
+
+    def next_job(self) -> Optional[Job]:
+        """Takes the next URL from the queue
+
+        Returns:
+            Optional[Job]: Job for the URL or None if the queue is empty
+        """
+        if self.position >= len(self.urls):
+            return None
+        job = Job(self.position, self.urls[self.position],
+                  self.source_names[self.source_indexes[self.position]])
+        self.position += 1
+        return job
+
+    def pending_count(self) -> int:
+        """Returns the number of URLs still queued
+
+        Returns:
+            int: Number of queued URLs
+        """
+        return len(self.urls) - self.position
+
+    def processed_count(self) -> int:
+        """Returns the number of jobs taken from the queue
+
+        Returns:
+            int: Number of jobs taken from the queue
+        """
+        return self.position
+
+    def cancel_pending(self) -> set[str]:
+        """Marks all queued URLs as canceled without creating jobs for them
+
+        Returns:
+            set[str]: Sources of the canceled URLs
+        """
+        count = self.pending_count()
+        sources = {self.source_names[index] for index
+                   in set(self.source_indexes[self.position:])}
+        self.statuses[self.position:] = array(
+            "B", bytes([JobStatus.CANCELED]) * count)
+        self.position = len(self.urls)
+        self.status_counts[JobStatus.QUEUED] -= count
+        self.status_counts[JobStatus.CANCELED] += count
+        return sources
+
+    def set_status(self, job: Job, status: int,
+                   error: Optional[str] = None) -> None:
+        """Changes the status of a job
+
+        Args:
+            job (Job): Job to change
+            status (int): New JobStatus value
+            error (Optional[str], optional): Error message. Defaults to None.
+        """
+        self.status_counts[job.status] -= 1
+        self.status_counts[status] += 1
+        job.status = status
+        self.statuses[job.index] = status
+        if error is None:
+            self.errors.pop(job.index, None)
+        else:
+            self.errors[job.index] = error
+
+    def count(self, status: int) -> int:
+        """Returns the number of jobs with a status
+
+        Args:
+            status (int): JobStatus value
+
+        Returns:
+            int: Number of jobs
+        """
+        return self.status_counts[status]
+
+    def add_filename(self, filename: str) -> bool:
+        """Records a downloaded filename
+
+        Args:
+            filename (str): Filename reported by yt_dlp
+
+        Returns:
+            bool: True if the filename was not recorded before
+        """
+        if filename in self.filenames:
+            return False
+        self.filenames[filename] = None
+        return True
+
+    def add_completed_file(self, path: str) -> None:
+        """Records the final path of a completed download
+
+        Args:
+            path (str): Absolute path of the file
+        """
+        self.completed_files[path] = None
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""lag_probe.py - Measures how late a timer fires to find GUI freezes
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import time
+from typing import Optional
+from PySide6.QtCore import QObject, Qt, QTimer
+from constants import AppConst
+from tracer import TRACER
+
+
+class LagProbe(QObject):
+    """Fires a timer every LAG_PROBE_INTERVAL milliseconds and records how
+    much later than scheduled it fired. The timer only fires when the event
+    loop runs, so the lag is how long the window could not respond to
+    input. Lags are counted in 1 millisecond buckets so long sessions use
+    constant memory.
+    """
+    timer: QTimer
+    # Number of lags of each whole millisecond, the last bucket also
+    # counts longer lags
+    counts: list[int]
+    sample_count: int
+    # Longest lag in seconds
+    max_lag: float
+    # time.perf_counter() of the last time the timer fired
+    last_time: float
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        """Initializer for LagProbe
+
+        Args:
+            parent (QObject, optional): Parent object. Defaults to None.
+        """
+        super().__init__(parent)
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(AppConst.LAG_PROBE_INTERVAL)
+        self.timer.timeout.connect(self.timeout)
+        self.counts = []
+        self.sample_count = 0
+        self.max_lag = 0.0
+        self.last_time = 0.0
+
+    def start(self) -> None:
+        """Clears the lags measured so far and starts measuring
+        """
+        self.counts = [0] * (AppConst.LAG_PROBE_MAX_MS + 1)
+        self.sample_count = 0
+        self.max_lag = 0.0
+        self.last_time = time.perf_counter()
+        self.timer.start()
+
+    def stop(self) -> None:
+        """Stops measuring, the lags measured are kept
+        """
+        self.timer.stop()
+
+    def timeout(self) -> None:
+        """Timer slot, records the lag of this firing
+        """
+        now = time.perf_counter()
+        scheduled = self.last_time + AppConst.LAG_PROBE_INTERVAL / 1000
+        lag = max(now - scheduled, 0.0)
+        self.last_time = now
+        self.counts[min(int(lag * 1000), AppConst.LAG_PROBE_MAX_MS)] += 1
+        self.sample_count += 1
+        if lag > self.max_lag:
+            self.max_lag = lag
+        if TRACER.enabled and lag * 1000 >= AppConst.LAG_PROBE_TRACE_MS:
+            # Show the freeze in the trace
+            TRACER.complete("event_loop_lag", "gui", scheduled,
+                            {"lag_ms": round(lag * 1000)})
+
+    def percentile(self, fraction: float) -> int:
+        """Returns a percentile of the lags measured
+
+        Args:
+            fraction (float): Percentile from 0 to 1
+
+        Returns:
+            int: Lag in whole milliseconds, 0 if nothing was measured
+        """
+        rank = fraction * self.sample_count
+        total = 0
+        for lag_ms, count in enumerate(self.counts):
+            total += count
+            if count and total >= rank:
+                return lag_ms
+        return 0
+
+    def summary(self) -> str:
+        """Returns a summary of the lags measured
+
+        Returns:
+            str: Summary such as "p50 2 ms, p99 180 ms, max 1,204 ms over
+                3,310 samples"
+        """
+        return f"p50 {self.percentile(0.5)} ms, " \
+            f"p99 {self.percentile(0.99)} ms, " \
+            f"max {round(self.max_lag * 1000):,} ms over " \
+            f"{self.sample_count:,} samples"
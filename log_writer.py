@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""log_writer.py - Background writer of the status log to rotating files
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Optional, TextIO
+from constants import AppConst
+from tracer import TRACER
+
+
+class LogWriter:
+    """Writes status messages to a log file on a background thread. Callers
+    only put a tuple on a queue, the thread formats and writes messages in
+    batches and rotates the file when it exceeds a size.
+    """
+    # Path of the current log file, rotated files get .1, .2... suffixes
+    file_path: str
+    # Size at which the file is rotated
+    max_bytes: int
+    # Number of rotated files kept
+    backup_count: int
+    # (time, level, job id, message) tuples or None to stop
+    entries: queue.SimpleQueue[Optional[tuple[float, int, int, str]]]
+    thread: Optional[threading.Thread]
+    # Open log file, only used by the thread
+    file: Optional[TextIO]
+    # Size of the current log file, only used by the thread
+    file_size: int
+
+    def __init__(self, file_path: str,
+                 max_bytes: int = AppConst.LOGFILE_MAX_BYTES,
+                 backup_count: int = AppConst.LOGFILE_BACKUP_COUNT) -> None:
+        """Initializer for LogWriter
+
+        Args:
+            file_path (str): Path of log file
+            max_bytes (int, optional): Size at which the file is rotated.
+                Defaults to AppConst.LOGFILE_MAX_BYTES.
+            backup_count (int, optional): Number of rotated files kept.
+                Defaults to AppConst.LOGFILE_BACKUP_COUNT.
+        """
+        self.file_path = os.path.abspath(file_path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.entries = queue.SimpleQueue()
+        self.thread = None
+        self.file = None
+        self.file_size = 0
+
+    def start(self) -> bool:
+        """Opens the log file and starts the writer thread
+
+        Returns:
+            bool: True if the log file could be opened
+        """
+        try:
+            self.open_file()
+        except OSError:
+            return False
+        self.thread = threading.Thread(target=self.run, name="logwriter",
+                                       daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Writes all queued messages, stops the thread and closes the file
+        """
+        if self.thread is None:
+            return
+        self.entries.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def write(self, message: str, level: int = logging.INFO,
+              job: int = -1) -> None:
+        """Queues a message for writing, never blocks
+
+        Args:
+            message (str): Message text
+            level (int, optional): logging module level.
+                Defaults to logging.INFO.
+            job (int, optional): Id of the active download job or -1.
+                Defaults to -1.
+        """
+        self.entries.put((time.time(), level, job, message))
+
+    def open_file(self) -> None:
+        """Opens the log file for appending
+        """
+        self.file = open(self.file_path, 'a', encoding="utf-8")
+        self.file_size = self.file.tell()
+
+    def rotate(self) -> None:
+        """Renames the log file to .1, shifting older files, and opens a new
+        file
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.file_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.file_path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.file_path, f"{self.file_path}.1")
+        else:
+            os.remove(self.file_path)
+        self.open_file()
+
+    @staticmethod
+    def format_entry(entry: tuple[float, int, int, str]) -> str:
+        """Formats a queued message as log file lines
+
+        Args:
+            entry (tuple[float, int, int, str]): (time, level, job id,
+                message)
+
+        Returns:
+            str: Lines ending with a line break
+        """
+        timestamp, level, job, message = entry
+        prefix = time.strftime("%Y-%m-%d %H:%M:%S",
+                               time.localtime(timestamp)) \
+            + f".{int(timestamp % 1 * 1000):03d} " \
+            + f"{logging.getLevelName(level):<7} " \
+            + (f"[job {job}] " if job >= 0 else "")
+        return "".join(prefix + line + "\n"
+                       for line in message.split("\n"))
+
+    def write_batch(self, texts: list[str]) -> None:
+        """Writes formatted messages with as few write calls as possible,
+        rotating the file when it would exceed max_bytes
+
+        Args:
+            texts (list[str]): Formatted messages
+        """
+        if self.file is None:
+            self.open_file()
+        chunk: list[str] = []
+        chunk_size = 0
+        for text in texts:
+            if self.file_size + chunk_size + len(text) > self.max_bytes \
+                    and self.file_size + chunk_size > 0:
+                self.write_chunk(chunk)
+                chunk = []
+                chunk_size = 0
+                self.rotate()
+            chunk.append(text)
+            # Characters, not bytes, close enough for rotating
+            chunk_size += len(text)
+        self.write_chunk(chunk)
+
+    def write_chunk(self, chunk: list[str]) -> None:
+        """Writes formatted messages to the log file in one call
+
+        Args:
+            chunk (list[str]): Formatted messages
+        """
+        if not chunk or self.file is None:
+            return
+        text = "".join(chunk)
+        self.file.write(text)
+        self.file.flush()
+        self.file_size += len(text)
+
+    def run(self) -> None:
+        """Thread function, writes queued messages in batches
+        """
+        stopping = False
+        while not stopping:
+            # Wait for a message then take everything queued with it
+            batch = [self.entries.get()]
+            while len(batch) < AppConst.LOGFILE_BATCH_SIZE:
+                try:
+                    batch.append(self.entries.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+            try:
+                with TRACER.span("write_log", "logfile",
+                                 {"messages": len(batch)}):
+                    self.write_batch([self.format_entry(entry)
+                                      for entry in batch
+                                      if entry is not None])
+            except OSError:
+                # Drop messages rather than stopping the program, retry
+                # opening the file with the next batch
+                if self.file is not None:
+                    self.file.close()
+                self.file = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
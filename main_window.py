@@ -6,19 +6,21 @@
 __author__ = "Josh Buchbinder"
 __copyright__ = "Copyright 2024, Josh Buchbinder"
 
-
-from typing import Any
+import time
+import logging
+import functools
+from typing import Any, Optional, TYPE_CHECKING
+from concurrent.futures import wait, FIRST_COMPLETED, Future
 from overrides import override
-from PySide6.QtCore import Qt, QFileInfo, QDir, QUrl, QSettings
+from PySide6.QtCore import Qt, QFileInfo, QDir, QUrl, QSettings, QTimer, QFile
 from PySide6.QtGui import QDesktopServices, QCloseEvent, QDragEnterEvent
 from PySide6.QtGui import QDropEvent
 from PySide6.QtWidgets import QApplication, QWidget, QMainWindow, QMessageBox
 from PySide6.QtWidgets import QLayout, QFormLayout, QHBoxLayout, QGridLayout
 from PySide6.QtWidgets import QLineEdit, QPushButton, QLabel, QFileDialog
 from PySide6.QtWidgets import QProgressBar, QDialogButtonBox, QSpinBox
-from PySide6.QtWidgets import QCheckBox, QStyle
+from PySide6.QtWidgets import QCheckBox, QStyle, QTableView, QHeaderView
 from PySide6.QtWidgets import QSizePolicy, QStackedWidget
-from yt_dlp import YoutubeDL, utils
 
 from comboboxext import ComboBoxExt
 from status_window import StatusWindow
@@ -26,13 +28,46 @@ from constants import AppConst, SettingsConst, ComboBoxConst, ToolTips, LinkIds
 from bookmark_html_parser import BookmarkHTMLParser
 from doc_table import DocTable
 from utils import value_to_bool, normalize_path, get_ffmpeg_bin_path
-from utils import get_videos_path
+from utils import get_videos_path, get_app_data_path, format_bytes
+from utils import format_duration
+from utils import url_shard, url_key
+from negative_cache import NegativeCache
+from preflight import PreflightValidator, PreflightResult
+from watch_folder import WatchFolder
+from job_store import JobStore, JobStatus
+from batch_progress import BatchProgress
+from run_report import RunReport, UrlReport, ReportPhase
+from progress_slot import ProgressSlot
+from log_writer import LogWriter
+from file_mover import FileMover
+from disk_space import DiskSpaceGuard, needed_info_bytes
+from dedup import Deduplicator
+from partial_store import PartialStore, PartialFile, ServerProber
+from partial_store import ServerState, probe_server, is_fragmented
+from partial_store import find_partial_files
+from ydl_logger import YdlLogger
+from tracer import TRACER
+from profiler import PROFILER
+from format_browser import FormatBrowser
+from job_progress_model import JobProgressModel, JobStage, STAGE_OF_STATUS
+from lag_probe import LagProbe
+from startup_report import STARTUP
+from ydl_importer import YDL_IMPORTER
+
+if TYPE_CHECKING:
+    # yt_dlp is imported where used as importing it slows startup
+    from yt_dlp import YoutubeDL
 
 
 class MainWindow(QMainWindow):
     """Main application window class derived from QMainWindow
     """
-    download_filenames: list[str]
+    jobs: JobStore
+    # Byte weighted progress of the jobs of the batch
+    batch_progress: BatchProgress
+    # Report of the URLs of the batch and of the active download
+    run_report: RunReport
+    url_report: UrlReport
     cancel_flag: bool
     settings: QSettings
     main_layout: QFormLayout
@@ -58,6 +93,8 @@ class MainWindow(QMainWindow):
     keepfiles_check: QCheckBox
     preferfreeformats_check: QCheckBox
     consoleoutput_check: QCheckBox
+    skipfailed_check: QCheckBox
+    validate_check: QCheckBox
     format_layout: QHBoxLayout
     format_stacked_widget: QStackedWidget
     format_type_combo: ComboBoxExt
@@ -91,6 +128,10 @@ class MainWindow(QMainWindow):
     subs_delay_spin: QSpinBox
     list_subs_button: QPushButton
     status_text: StatusWindow
+    status_level_combo: ComboBoxExt
+    status_alljobs_button: QPushButton
+    job_table: QTableView
+    job_model: JobProgressModel
     file_progress: QProgressBar
     total_progress: QProgressBar
     close_button: QPushButton
@@ -99,6 +140,64 @@ class MainWindow(QMainWindow):
     cancel_button: QPushButton
     settings_save: bool
     exit_on_completion: bool
+    negative_cache: NegativeCache
+    downloading: bool
+    watch_folder: Optional[WatchFolder]
+    watch_files: dict[str, list[int]]
+    # Shard of parsed URL lists to download and number of shards
+    shard_index: int
+    shard_count: int
+    # Latest progress of the active download, rendered by progress_timer
+    progress_slot: ProgressSlot
+    progress_timer: QTimer
+    # Filename of the last progress callback
+    progress_filename: Optional[str]
+    # time.monotonic() after which the progress hook runs the message loop
+    progress_events_time: float
+    # Id of the last download job, tags status lines for filtering
+    job_serial: int
+    # Job id the status window is filtered to or -1 for all jobs
+    status_filter_job: int
+    # Writer of status messages to a log file
+    log_writer: Optional[LogWriter]
+    # Routes yt_dlp output into the status window
+    ydl_logger: YdlLogger
+    # Window listing the formats of a video, created when first used
+    format_browser: Optional[FormatBrowser]
+    # Measures event loop lag during batches if enabled with --lagprobe
+    lag_probe: Optional[LagProbe]
+    # Directory downloads are written to before being moved to the download
+    # directory by file_mover, empty to download in place
+    staging_dir: str
+    file_mover: Optional[FileMover]
+    # Pauses downloads that do not fit in the free disk space, None if
+    # disabled with --nodiskcheck
+    disk_guard: Optional[DiskSpaceGuard]
+    # Absolute download directory of the batch in progress
+    download_dir: str
+    # Links identical downloads after each batch if enabled with --dedup
+    deduplicator: Optional[Deduplicator]
+    # Final paths of the files of the active job from the post hook
+    job_files: list[str]
+    # Partial downloads kept between sessions to resume or restart them
+    partial_store: PartialStore
+    # Files of the active job being downloaded, by final filename
+    job_partials: dict[str, PartialFile]
+    # Asks servers for the validators of files as their download starts,
+    # set while download_url_list() is running
+    server_prober: Optional[ServerProber]
+    # URL, partial file and pending answer of the server for each file
+    # being asked about
+    server_probes: list[tuple[str, PartialFile,
+                              Future[Optional[ServerState]]]]
+    # Output template of the subdirectory of the download directory files
+    # are written to, set with --subdirs, empty for none
+    subdir_outtmpl: str
+    # Waits for the background import of yt_dlp to print the startup
+    # report if enabled with --startup-report
+    startup_report_timer: Optional[QTimer]
+    # Number of URLs validated at once
+    validate_workers: int
 
     def __init__(self, settings_load: bool = True,
                  settings_save: bool = True) -> None:
@@ -122,6 +221,7 @@ class MainWindow(QMainWindow):
 
         # Create widgets for window
         self.create_mainwindow_widgets()
+        STARTUP.mark("create widgets")
         # Create central widget
         central_widget = QWidget()
         # Create window layout
@@ -130,16 +230,68 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(layout)
         # Set widget as main window central widget
         self.setCentralWidget(central_widget)
+        STARTUP.mark("create layout")
         # Connect widget signals
         self.connect_mainwindow_signals()
         # Set widget tooltips
         self.create_mainwindow_tooltips()
+        STARTUP.mark("connect signals, set tooltips")
 
         # Persistent settings object
         self.settings = QSettings(SettingsConst.SETTINGS_COMPANYNAME,
                                   SettingsConst.SETTINGS_APPNAME)
-        # Used to store downloaded filenames from progress hook callback
-        self.download_filenames = []
+        # Queued and processed download jobs and their downloaded filenames
+        self.jobs = JobStore()
+        self.batch_progress = BatchProgress(self.jobs)
+        # Cache of URLs that failed recently
+        app_data_path = get_app_data_path()
+        self.negative_cache = NegativeCache(
+            QDir(app_data_path).filePath(AppConst.FILENAME_NEGATIVECACHE)
+            if app_data_path else "")
+        # Per URL report written after each batch
+        self.run_report = RunReport(
+            QDir(app_data_path).filePath(AppConst.REPORT_DIR)
+            if app_data_path else "", prune=True)
+        self.url_report = UrlReport("")
+
+        # Set while download_url_list() is running
+        self.downloading = False
+        # Watched directory for URL list files
+        self.watch_folder = None
+        # Claimed watch folder file to [URLs remaining, URLs failed]
+        self.watch_files = {}
+        # Download all URLs unless set_shard() is called
+        self.shard_index = 1
+        self.shard_count = 1
+        # Progress callbacks only store their values, a timer renders them
+        self.progress_slot = ProgressSlot()
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(AppConst.PROGRESS_RENDER_INTERVAL)
+        self.progress_timer.timeout.connect(self.render_progress)
+        self.progress_timer.timeout.connect(self.record_server_states)
+        self.progress_filename = None
+        self.progress_events_time = 0.0
+        self.job_serial = -1
+        self.status_filter_job = -1
+        self.log_writer = None
+        self.ydl_logger = YdlLogger(self.add_status_message)
+        self.format_browser = None
+        self.lag_probe = None
+        self.staging_dir = ""
+        self.file_mover = None
+        self.disk_guard = DiskSpaceGuard()
+        self.download_dir = ""
+        self.deduplicator = None
+        self.job_files = []
+        self.partial_store = PartialStore(
+            QDir(app_data_path).filePath(AppConst.FILENAME_PARTIALS)
+            if app_data_path else "")
+        self.job_partials = {}
+        self.server_prober = None
+        self.server_probes = []
+        self.subdir_outtmpl = ""
+        self.startup_report_timer = None
+        self.validate_workers = AppConst.PREFLIGHT_WORKERS
 
         # Used to detect cancel request
         self.cancel_flag = False
@@ -174,6 +326,7 @@ class MainWindow(QMainWindow):
         self.main_layout.setRowVisible(self.format_layout, visible)
         visible = self.specifyres_check.isChecked()
         self.main_layout.setRowVisible(self.resolution_layout, visible)
+        STARTUP.mark("create state, load settings")
 
     def create_mainwindow_widgets(self) -> None:
         """Create widgets for window
@@ -200,6 +353,8 @@ class MainWindow(QMainWindow):
         self.keepfiles_check = QCheckBox("Keep files")
         self.preferfreeformats_check = QCheckBox("Prefer free formats")
         self.consoleoutput_check = QCheckBox("Console output")
+        self.skipfailed_check = QCheckBox("Skip failed URLs")
+        self.validate_check = QCheckBox("Validate first")
         self.format_layout = QHBoxLayout()
         self.format_stacked_widget = QStackedWidget()
         self.format_type_combo = ComboBoxExt()
@@ -233,6 +388,10 @@ class MainWindow(QMainWindow):
         self.subs_delay_spin = QSpinBox()
         self.list_subs_button = QPushButton("List subtitles")
         self.status_text = StatusWindow(self.status_click_callback)
+        self.status_level_combo = ComboBoxExt()
+        self.status_alljobs_button = QPushButton("Show all downloads")
+        self.job_table = QTableView()
+        self.job_model = JobProgressModel(self)
         self.file_progress = QProgressBar()
         self.total_progress = QProgressBar()
         self.cancel_button = QPushButton("Cancel")
@@ -245,6 +404,34 @@ class MainWindow(QMainWindow):
         # Populate url type listbox
         for label in ComboBoxConst.URL_TYPE_LABELS:
             self.url_type_combo.addItem(label)
+        # Populate status filter level listbox
+        for label, level in ComboBoxConst.STATUS_LEVEL_LIST:
+            self.status_level_combo.addItem(label, level)
+        self.status_alljobs_button.setVisible(False)
+        # Downloads table, columns sized once as sizing to contents would
+        # measure every row on each update
+        self.job_table.setModel(self.job_model)
+        self.job_table.verticalHeader().setVisible(False)
+        self.job_table.setEditTriggers(
+            QTableView.EditTrigger.NoEditTriggers)
+        self.job_table.setSelectionBehavior(
+            QTableView.SelectionBehavior.SelectRows)
+        self.job_table.setWordWrap(False)
+        self.job_table.horizontalHeader().setSectionResizeMode(
+            1, QHeaderView.ResizeMode.Stretch)
+        self.job_table.verticalHeader().setDefaultSectionSize(
+            self.job_table.fontMetrics().height() + 4)
+        self.job_table.horizontalHeader().setDefaultSectionSize(
+            self.job_table.fontMetrics().horizontalAdvance("0") * 12)
+        self.job_table.setColumnWidth(
+            0, self.job_table.fontMetrics().horizontalAdvance("0") * 40)
+        self.job_table.setColumnWidth(
+            3, self.job_table.fontMetrics().horizontalAdvance("0") * 22)
+        self.job_table.setFixedHeight(
+            self.job_table.horizontalHeader().sizeHint().height()
+            + self.job_table.verticalHeader().defaultSectionSize()
+            * AppConst.JOB_PROGRESS_VISIBLE_ROWS
+            + 2 * self.job_table.frameWidth())
         # These Expanding policies seem necessary for Mac to get the
         # QLineEdit fields to expand to fill
         widgets: list[QWidget] = [self.list_path_text, self.download_path_text,
@@ -267,9 +454,10 @@ class MainWindow(QMainWindow):
             widget.setSizePolicy(QSizePolicy.Policy.Fixed,
                                  QSizePolicy.Policy.Fixed)
 
-        # Populate subtitles combo boxes
-        for lang, lang_code in ComboBoxConst.SUBTITLES_LANGUAGES_LIST:
-            self.subs_lang_combo.add_check_item(lang, lang_code)
+        # Populate subtitles combo boxes, the long list of languages is
+        # only added when it is first shown
+        self.subs_lang_combo.add_deferred_check_items(
+            ComboBoxConst.SUBTITLES_LANGUAGES_LIST)
         for label in ComboBoxConst.SUBTITLES_DOWNFMT_LIST:
             self.subs_format_combo.addItem(label)
         for label, data in ComboBoxConst.SUBTITLES_CNVTFMT_LIST:
@@ -299,8 +487,8 @@ class MainWindow(QMainWindow):
         for label, res in ComboBoxConst.FORMAT_RESOLUTION_LIST:
             self.resheight_combo.addItem(label, res)
 
-        # Set progress bars display text formats
-        self.file_progress.setFormat(AppConst.FORMATSTR_FILEPROGRESS)
+        # Progress bar texts are set while downloading
+        self.file_progress.setTextVisible(False)
         self.total_progress.setFormat(AppConst.FORMATSTR_TOTALPROGRESS)
 
         # Hide cancel button
@@ -356,6 +544,13 @@ class MainWindow(QMainWindow):
         switches_layout.addWidget(self.keepfiles_check, 2, 3)
         switches_layout.addWidget(self.preferfreeformats_check, 1, 4)
         switches_layout.addWidget(self.consoleoutput_check, 2, 4)
+        switches_layout.addWidget(self.skipfailed_check, 1, 5)
+        switches_layout.addWidget(self.validate_check, 2, 5)
+        # Status window filter layout
+        status_filter_layout = QHBoxLayout()
+        status_filter_layout.addWidget(self.status_level_combo)
+        status_filter_layout.addWidget(self.status_alljobs_button)
+        status_filter_layout.addStretch()
         # - Format selection layouts
         # Audio + video by quality layout
         format_quality_layout = QHBoxLayout(
@@ -472,7 +667,9 @@ class MainWindow(QMainWindow):
         self.main_layout.addRow("Format selection:", self.format_layout)
         self.main_layout.addRow("Max resolution:", self.resolution_layout)
         self.main_layout.addRow("Subtitles:", self.subtitles_layout)
+        self.main_layout.addRow("Status filter:", status_filter_layout)
         self.main_layout.addRow(self.status_text)
+        self.main_layout.addRow("Downloads", self.job_table)
         self.main_layout.addRow("File progress", self.file_progress)
         self.main_layout.addRow("Total progress", self.total_progress)
         self.main_layout.addRow(QLabel(""))
@@ -505,6 +702,14 @@ class MainWindow(QMainWindow):
         self.autoscroll_check.checkStateChanged.connect(
             lambda checked: self.status_text.set_autoscroll(
                 checked == Qt.CheckState.Checked))
+        self.status_level_combo.currentIndexChanged.connect(
+            lambda _: self.update_status_filter())
+        self.status_alljobs_button.clicked.connect(
+            lambda: self.set_status_filter_job(-1))
+        self.status_text.doubleClicked.connect(
+            lambda index: self.set_status_filter_job(
+                self.status_text.job_at(index)
+                if self.status_filter_job < 0 else -1))
         self.subs_all_button.clicked.connect(
             lambda: self.subs_lang_combo.check_all(True))
         self.subs_clear_button.clicked.connect(
@@ -547,6 +752,8 @@ class MainWindow(QMainWindow):
         self.preferfreeformats_check.setToolTip(
             ToolTips.TTT_PREFERFREEFORMATS_CHECK)
         self.consoleoutput_check.setToolTip(ToolTips.TTT_CONSOLEOUTPUT_CHECK)
+        self.skipfailed_check.setToolTip(ToolTips.TTT_SKIPFAILED_CHECK)
+        self.validate_check.setToolTip(ToolTips.TTT_VALIDATE_CHECK)
         self.subsgenerated_check.setToolTip(ToolTips.TTT_SUBSGENERATED_CHECK)
         self.subs_lang_combo.setToolTip(ToolTips.TTT_SUBS_LANG_COMBO)
         self.subs_clear_button.setToolTip(ToolTips.TTT_SUBS_CLEAR_BUTTON)
@@ -574,6 +781,10 @@ class MainWindow(QMainWindow):
             ToolTips.TTT_FORMAT_STRING_HELP_BUTTON)
         self.resheight_combo.setToolTip(ToolTips.TTT_RESOLUTION_COMBO)
         self.status_text.setToolTip(ToolTips.TTT_STATUSWINDOW_TEXT)
+        self.status_level_combo.setToolTip(ToolTips.TTT_STATUS_LEVEL_COMBO)
+        self.status_alljobs_button.setToolTip(
+            ToolTips.TTT_STATUS_ALLJOBS_BUTTON)
+        self.job_table.setToolTip(ToolTips.TTT_JOB_TABLE)
         self.close_button.setToolTip(ToolTips.TTT_CLOSE_BUTTON)
         self.download_button.setToolTip(ToolTips.TTT_DOWNLOAD_BUTTON)
 
@@ -889,14 +1100,123 @@ class MainWindow(QMainWindow):
                                          "Valid file types are HTML, TXT")
         # Process URLs
         if url_list:
-            # Store the current diretory to return after processing
-            current_path = QDir.currentPath()
-            # Change path to download directory
-            QDir.setCurrent(dir_info.absoluteFilePath())
-            # Download URLs
-            self.download_url_list(url_list)
-            # Return to current directory
-            QDir.setCurrent(current_path)
+            self.start_download(url_list)
+
+    def start_download(self, url_list: list[str], source: str = "") -> None:
+        """Downloads a list of URLs into the download directory
+
+        Args:
+            url_list (list[str]): List of URLs to download
+            source (str, optional): Claimed watch folder file the URLs came
+                from. Defaults to "".
+        """
+        self.download_url_list(url_list, source)
+
+    def start_watch_folder(self, watch_path: str) -> bool:
+        """Starts watching a directory for URL list files to download
+
+        Args:
+            watch_path (str): Directory to watch
+
+        Returns:
+            bool: True if watching started
+        """
+        if not QFileInfo(watch_path).isDir():
+            self.display_warning("Missing watch directory",
+                                 "Enter a valid directory to watch for "
+                                 "URL lists")
+            return False
+        self.watch_folder = WatchFolder(watch_path, self)
+        # Queued so claimed files are handled after the scan completes and
+        # scanning continues while their URLs download
+        self.watch_folder.file_claimed.connect(
+            self.watch_file_claimed, Qt.ConnectionType.QueuedConnection)
+        if not self.watch_folder.start():
+            self.display_warning("Watch directory error",
+                                 "Unable to create subdirectories in "
+                                 f"{watch_path}")
+            self.watch_folder = None
+            return False
+        message = f"Watching directory {self.watch_folder.watch_path} for " \
+            "URL lists"
+        self.add_status_message(message)
+        return True
+
+    def watch_file_claimed(self, file_path: str) -> None:
+        """Called when a URL list file is claimed from the watch folder
+
+        Args:
+            file_path (str): Path of claimed file
+        """
+        message = f"Processing URL list {file_path}"
+        self.add_status_message(message)
+        url_list: list[str] = []
+        try:
+            if file_path.lower().endswith(".txt"):
+                url_list = self.parse_txt_file(file_path)
+            else:
+                url_list = self.parse_html_file(file_path,
+                                                select_folder=False)
+        except (OSError, UnicodeDecodeError) as e:
+            message = f"Error reading URL list {file_path}: {e}"
+            self.add_status_message(message, logging.ERROR)
+        if not url_list \
+                or not QFileInfo(self.download_path_text.text()).isDir():
+            if url_list:
+                message = "Download directory is not valid"
+            else:
+                message = f"No URLs found in {file_path}"
+            self.add_status_message(message, logging.WARNING)
+            self.finish_watch_file(file_path, False)
+            return
+        self.watch_files[file_path] = [len(url_list), 0]
+        # A download in progress picks up the queued URLs, otherwise start
+        # one after any other files claimed by this scan are queued
+        self.queue_urls(url_list, file_path)
+        if not self.downloading:
+            QTimer.singleShot(0, self, self.start_queued_download)
+
+    def start_queued_download(self) -> None:
+        """Starts downloading queued URLs if not already downloading
+        """
+        if not self.downloading and self.jobs.pending_count():
+            self.start_download([])
+
+    def source_url_done(self, source: str, success: bool) -> None:
+        """Called when a URL from a watch folder file has been processed,
+        finishes the file when all its URLs have been processed
+
+        Args:
+            source (str): Claimed watch folder file the URL came from
+            success (bool): True if the URL was downloaded
+        """
+        counts = self.watch_files.get(source)
+        if counts is None:
+            return
+        counts[0] -= 1
+        if not success:
+            counts[1] += 1
+        if counts[0] <= 0:
+            del self.watch_files[source]
+            self.finish_watch_file(source, counts[1] == 0)
+
+    def finish_watch_file(self, file_path: str, success: bool) -> None:
+        """Moves a processed watch folder file to the done or failed
+        directory
+
+        Args:
+            file_path (str): Path of claimed file
+            success (bool): True if all URLs were downloaded
+        """
+        if self.watch_folder is None:
+            return
+        new_path = self.watch_folder.finish(file_path, success)
+        if new_path:
+            message = f"Moved URL list to {new_path}"
+            self.add_status_message(message)
+        else:
+            message = f"Unable to move URL list {file_path}"
+            self.add_status_message(message, logging.ERROR)
 
     def parse_txt_file(self, file_path: str) -> list[str]:
         """Parses a simple text file and builds a list of entries
@@ -912,14 +1232,17 @@ class MainWindow(QMainWindow):
                     .readlines() if line[0] != '#']
         # Remove blank lines
         url_list_clean = [x for x in url_list if x]
-        return url_list_clean
+        return self.shard_url_list(url_list_clean)
 
-    def parse_html_file(self, file_path: str) -> list[str]:
+    def parse_html_file(self, file_path: str,
+                        select_folder: bool = True) -> list[str]:
         """Parses a HTML bookmark file and builds a list of entries.
         These files are exported from Chrome and Firefox
 
         Args:
             file_path (str): Path to file to parse
+            select_folder (bool, optional): Let the user select a bookmark
+                folder, otherwise all folders are used. Defaults to True.
 
         Returns:
             list[str]: List of lines extracted from file
@@ -930,7 +1253,35 @@ class MainWindow(QMainWindow):
         with open(file_path, 'r', encoding="utf-8") as f:
             parser.feed(f.read())
         # Get URL list from parser
-        return parser.get_url_list()
+        return self.shard_url_list(parser.get_url_list(select_folder))
+
+    def set_shard(self, shard_index: int, shard_count: int) -> None:
+        """Sets the shard of parsed URL lists to download
+
+        Args:
+            shard_index (int): Shard to download from 1 to shard_count
+            shard_count (int): Number of shards
+        """
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+
+    def shard_url_list(self, url_list: list[str]) -> list[str]:
+        """Removes URLs that belong to other shards
+
+        Args:
+            url_list (list[str]): Parsed URLs
+
+        Returns:
+            list[str]: URLs of this shard
+        """
+        if self.shard_count <= 1:
+            return url_list
+        shard_list = [url for url in url_list
+                      if url_shard(url, self.shard_count) == self.shard_index]
+        message = f"Shard {self.shard_index}/{self.shard_count}: " \
+            f"{len(shard_list)} of {len(url_list)} URLs"
+        self.add_status_message(message)
+        return shard_list
 
     def create_ydl_quiet_options(self, ydl_opts: dict[str, Any]) -> None:
         """Returns a YouTubeDL Options map preset to quiet settings
@@ -939,14 +1290,18 @@ class MainWindow(QMainWindow):
             ydl_opts (dict[str, Any]): Dict of options for yt_dlp.YoutubeDL
                 constructor
         """
+        # yt_dlp output goes to the status window instead of the console
+        ydl_opts["logger"] = self.ydl_logger
         if self.consoleoutput_check.isChecked():
             ydl_opts["quiet"] = False
             ydl_opts["verbose"] = True
             ydl_opts["no_warnings"] = False
+            self.ydl_logger.min_level = logging.DEBUG
         else:
             ydl_opts["quiet"] = True
             ydl_opts["verbose"] = False
             ydl_opts["no_warnings"] = True
+            self.ydl_logger.min_level = logging.WARNING
         ydl_opts["noprogress"] = True
 
     def create_ydl_auth_options(self, ydl_opts: dict[str, Any]) -> None:
@@ -972,11 +1327,27 @@ class MainWindow(QMainWindow):
         """
         if self.overwrite_check.isChecked():
             ydl_opts["overwrites"] = True
+        # Partial files are checked by check_partial_files() before being
+        # resumed, whether or not files are overwritten
+        ydl_opts["continuedl"] = True
         if self.keepfiles_check.isChecked():
             ydl_opts["keepvideo"] = True
         if self.preferfreeformats_check.isChecked():
             ydl_opts["prefer_free_formats"] = True
 
+    def create_ydl_output_options(self, ydl_opts: dict[str, Any]) -> None:
+        """Sets the dictionary values for output file names. The directory
+        is set per job in download_url_list().
+
+        Args:
+            ydl_opts (dict[str, Any]): Dict of options for yt_dlp.YoutubeDL
+                constructor
+        """
+        if self.subdir_outtmpl:
+            ydl_opts["outtmpl"] = {
+                "default": f"{self.subdir_outtmpl}/"
+                f"{AppConst.OUTTMPL_FILENAME}"}
+
     def create_ydl_subtitle_options(self, ydl_opts: dict[str, Any]) -> None:
         """Sets the dictionary values for subtitle options
 
@@ -1089,67 +1460,260 @@ class MainWindow(QMainWindow):
         self.create_ydl_quiet_options(ydl_opts)
         self.create_ydl_auth_options(ydl_opts)
         self.create_ydl_switches_options(ydl_opts)
+        self.create_ydl_output_options(ydl_opts)
         self.create_ydl_subtitle_options(ydl_opts)
         self.create_ydl_format_options(ydl_opts)
         return ydl_opts
 
-    def download_url_list(self, url_list: list[str]) -> None:
-        """Performs the downloading of URLs
+    def download_url_list(self, url_list: list[str],
+                          source: str = "") -> None:
+        """Performs the downloading of URLs and any URLs already queued. If
+        a download is already in progress the URLs are added to its queue
+        instead.
 
         Args:
             url_list (list[str]): List of URLs to download
+            source (str, optional): Claimed watch folder file the URLs came
+                from. Defaults to "".
         """
+        if self.downloading:
+            self.queue_urls(url_list, source)
+            return
+        self.downloading = True
+        batch_start = time.perf_counter()
+        # Every job gets an explicit output directory rather than changing
+        # the current directory of the process, which other work such as
+        # listing formats during a download depends on
+        self.download_dir = QFileInfo(
+            self.download_path_text.text() or ".").absoluteFilePath()
+
         # Disable widgets that would interfere with processing
         self.enable_active_buttons(False)
 
-        errors: list[str] = []
-        self.download_filenames = []
-        count = 0
+        self.jobs.start_batch()
+        self.batch_progress.start_batch()
+        self.run_report.start_batch()
+        if self.lag_probe is not None:
+            self.lag_probe.start()
         ydl_opts = self.create_ydl_download_options()
 
-        # Reset total progress bar
-        self.file_progress.setValue(0)
-        self.file_progress.setTextVisible(False)
-        self.total_progress.setRange(0, len(url_list))
-        self.total_progress.setValue(0)
+        # Skip URLs that failed recently unless overridden for this run
+        self.negative_cache.load()
+        self.partial_store.load()
+        skipped_count = 0
+        if self.skipfailed_check.isChecked():
+            total_count = len(url_list)
+            kept_urls: list[str] = []
+            for url in url_list:
+                error_class = self.negative_cache.lookup(url)
+                if error_class:
+                    self.run_report.add_url(
+                        url, JobStatus.NAMES[JobStatus.SKIPPED],
+                        f"Failed recently: {error_class}")
+                else:
+                    kept_urls.append(url)
+            url_list = kept_urls
+            skipped_count = total_count - len(url_list)
+            for _ in range(skipped_count):
+                self.source_url_done(source, False)
+            if skipped_count:
+                message = f"Skipping {skipped_count} URLs that failed " \
+                    "recently, uncheck 'Skip failed URLs' to retry them"
+                self.add_status_message(message, logging.WARNING)
 
         # Unhide cancel button
         self.cancel_button.setVisible(True)
 
-        # Perform downloads
+        # Validate URLs and only download those that are available
+        preflight_results: dict[str, PreflightResult] = {}
+        if self.validate_check.isChecked() and url_list:
+            with TRACER.span("validate_url_list", "validate",
+                             {"urls": len(url_list)}):
+                preflight_results = self.validate_url_list(url_list,
+                                                           ydl_opts)
+            for url in url_list:
+                if url not in preflight_results:
+                    self.source_url_done(source, False)
+            url_list = [url for url in url_list if url in preflight_results]
+        self.queue_urls(url_list, source)
+        for url, result in preflight_results.items():
+            self.batch_progress.add_estimate(url, result.estimated_bytes)
+        if self.disk_guard is not None and url_list:
+            self.show_disk_space_estimate()
+
+        # Reset progress bars
+        self.file_progress.setRange(0, AppConst.PROGRESS_BAR_SCALE)
+        self.file_progress.setValue(0)
+        self.file_progress.setTextVisible(False)
+        self.total_progress.setRange(0, AppConst.PROGRESS_BAR_SCALE)
+        self.render_batch_progress()
+
+        # Perform downloads, more URLs may be queued while downloading
+        self.progress_timer.start()
+        # Waits for the background import if it is still running
+        # pylint: disable-next=import-outside-toplevel
+        from yt_dlp import YoutubeDL, utils
+        if STARTUP.mark(STARTUP.PHASE_FIRST_DOWNLOAD) \
+                and self.startup_report_timer is not None:
+            elapsed = STARTUP.elapsed(STARTUP.PHASE_FIRST_DOWNLOAD)
+            print(f"First download started {elapsed * 1000:,.0f} ms after "
+                  "startup", flush=True)
         with YoutubeDL(ydl_opts) as ydl:
             ydl.add_progress_hook(self.ydl_download_progress_hook)
-            for url in url_list:
-                if self.cancel_flag:
+            ydl.add_post_hook(self.ydl_post_hook)
+            # Only set for downloading, validation never downloads
+            ydl.params["match_filter"] = functools.partial(
+                self.ydl_match_filter, ydl)
+            server_prober = ServerProber(ydl)
+            self.server_prober = server_prober
+            while not self.cancel_flag:
+                job = self.jobs.next_job()
+                if job is None:
                     break
+                url = job.url
+                if self.skipfailed_check.isChecked() \
+                        and self.negative_cache.lookup(url):
+                    self.jobs.set_status(job, JobStatus.SKIPPED)
+                    self.batch_progress.skip_job(url)
+                    self.render_batch_progress()
+                    self.run_report.add_url(
+                        url, JobStatus.NAMES[JobStatus.SKIPPED],
+                        "Failed recently")
+                    self.source_url_done(job.source, False)
+                    continue
+                # Tag status lines of this job
+                self.job_serial += 1
+                self.status_text.current_job = self.job_serial
+                job_start = time.perf_counter()
+                self.batch_progress.start_job(url)
+                self.url_report = UrlReport(url)
+                self.job_model.start_job(self.job_serial, url)
+                if self.autoscroll_check.isChecked():
+                    self.job_table.scrollToBottom()
                 message = f"Trying download of URL {url}"
                 self.add_status_message(message)
+                self.jobs.set_status(job, JobStatus.ACTIVE)
+                self.ydl_logger.start_job()
+                self.progress_slot = ProgressSlot()
+                self.progress_filename = None
+                self.job_files = []
+                self.job_partials = {}
+                result = preflight_results.pop(url, None)
+                if result is not None and result.info is not None:
+                    self.url_report.set_info(result.info)
+                staging_dir = ""
+                if self.file_mover is not None:
+                    # Each URL has a staging directory of its own, a failed
+                    # download leaves its partial files there to be resumed
+                    # by the next attempt
+                    staging_dir = QDir(self.staging_dir).filePath(
+                        url_key(url))
+                ydl.params["paths"] = {
+                    "home": staging_dir or self.download_dir}
                 try:
-                    ydl.download(url)
-                except utils.DownloadError as e:
+                    with PROFILER.section(AppConst.PROFILE_SECTION_DOWNLOAD):
+                        if result is not None and result.is_fresh():
+                            # Reuse validated metadata instead of extracting
+                            # again
+                            ydl.process_ie_result(result.info, download=True)
+                        else:
+                            ydl.download(url)
+                    self.negative_cache.remove(url)
+                    self.jobs.set_status(job, JobStatus.DONE)
+                except (utils.DownloadError, utils.ExtractorError) as e:
                     error_message = str(e)
-                    errors.append(error_message)
-                    message = f"Download error: {error_message}"
-                    self.add_status_message(message)
+                    self.jobs.set_status(job, JobStatus.FAILED, error_message)
+                    # Errors are usually shown by ydl_logger already
+                    if not self.ydl_logger.error_shown(error_message):
+                        message = f"Download error: {error_message}"
+                        self.add_status_message(message, logging.ERROR)
+                    self.negative_cache.add_error(url, error_message)
                 except utils.DownloadCancelled as e:
                     error_message = str(e)
-                    errors.append(error_message)
+                    self.jobs.set_status(job, JobStatus.CANCELED,
+                                         error_message)
                     message = f"Download canceled: {error_message}"
-                    self.add_status_message(message)
-                count += 1
-                self.total_progress.setValue(count)
+                    self.add_status_message(message, logging.WARNING)
+                self.record_partial_files(job.status == JobStatus.DONE)
+                if job.status == JobStatus.DONE:
+                    self.add_completed_files(staging_dir)
+                if staging_dir and job.status == JobStatus.DONE:
+                    self.move_staged_files(staging_dir, self.download_dir)
+                self.render_progress()
+                self.job_model.set_stage(self.job_serial,
+                                         STAGE_OF_STATUS[job.status])
+                self.url_report.bytes = self.batch_progress.finish_job()
+                self.render_batch_progress()
+                self.url_report.retries = self.ydl_logger.retry_count
+                self.run_report.finish_url(self.url_report,
+                                           JobStatus.NAMES[job.status],
+                                           self.jobs.errors.get(job.index))
+                if TRACER.enabled:
+                    TRACER.complete("job", "download", job_start,
+                                    {"url": url, "job": self.job_serial,
+                                     "status": JobStatus.NAMES[job.status]})
+                self.source_url_done(job.source,
+                                     job.status == JobStatus.DONE)
+                self.ydl_logger.flush()
+                self.status_text.current_job = -1
+            # Answers still pending are not waited for, their partial files
+            # are only checked by size
+            self.record_server_states()
+            server_prober.shutdown()
+            self.server_prober = None
+            self.server_probes = []
+        self.progress_timer.stop()
+        self.wait_for_file_mover()
+        reclaimed_bytes = 0
+        if self.deduplicator is not None and not self.cancel_flag:
+            reclaimed_bytes = self.dedup_completed_files()
+        if self.lag_probe is not None:
+            self.lag_probe.stop()
+            message = "Event loop lag during batch: " \
+                + self.lag_probe.summary()
+            self.add_status_message(message)
+
+        processed_count = self.jobs.processed_count()
+        error_count = self.jobs.count(JobStatus.FAILED) \
+            + self.jobs.count(JobStatus.CANCELED)
+        skipped_count += self.jobs.count(JobStatus.SKIPPED)
+        # URLs left over after canceling fail their watch folder files
+        for url in self.jobs.urls[self.jobs.position:]:
+            self.run_report.add_url(url, JobStatus.NAMES[JobStatus.CANCELED])
+        for source in self.jobs.cancel_pending():
+            if self.watch_files.pop(source, None) is not None:
+                self.finish_watch_file(source, False)
+
+        # Remember failed URLs for later runs
+        self.negative_cache.save()
+        report_path = self.run_report.finish_batch()
+        if TRACER.enabled:
+            TRACER.complete("download_url_list", "download", batch_start,
+                            {"processed": processed_count})
+        if report_path:
+            message = f"Run report written to {report_path}.json and .csv"
+            self.add_status_message(message)
 
         # Reenable widgets
         self.enable_active_buttons(True)
         self.cancel_flag = False
         self.cancel_button.setVisible(False)
+        self.downloading = False
 
         # Display summary message box
-        message = f"{len(url_list)} URLs processed"
-        message += f"\n{len(self.download_filenames)} downloads complete"
-        if errors:
-            message += f"\n{len(errors)} errors encountered"
-        if self.exit_on_completion:
+        message = f"{processed_count} URLs processed"
+        message += f"\n{len(self.jobs.filenames)} downloads complete"
+        if error_count:
+            message += f"\n{error_count} errors encountered"
+        if skipped_count:
+            message += f"\n{skipped_count} URLs skipped after recent failures"
+        if reclaimed_bytes:
+            message += f"\n{format_bytes(reclaimed_bytes)} reclaimed from " \
+                "duplicate files"
+        if self.watch_folder is not None:
+            # Keep running unattended
+            self.add_status_message(message.replace("\n", ", "))
+        elif self.exit_on_completion:
             print(message)
             self.close()
         else:
@@ -1158,46 +1722,227 @@ class MainWindow(QMainWindow):
             dlg.setText(message)
             dlg.exec()
 
+    def queue_urls(self, url_list: list[str], source: str = "") -> None:
+        """Adds URLs to the download queue
+
+        Args:
+            url_list (list[str]): List of URLs to download
+            source (str, optional): Claimed watch folder file the URLs came
+                from. Defaults to "".
+        """
+        self.jobs.extend(url_list, source)
+        if self.downloading:
+            self.render_batch_progress()
+
+    def set_validate_workers(self, max_workers: int) -> None:
+        """Sets the number of URLs validated at once
+
+        Args:
+            max_workers (int): Number of concurrent validations
+        """
+        self.validate_workers = max(1, max_workers)
+
+    def validate_url_list(self, url_list: list[str],
+                          ydl_opts: dict[str, Any]) -> dict[
+                              str, PreflightResult]:
+        """Validates URLs concurrently and reports their availability and
+        the estimated total download size
+
+        Args:
+            url_list (list[str]): List of URLs to validate
+            ydl_opts (dict[str, Any]): Dict of options for yt_dlp.YoutubeDL
+                used for downloading
+
+        Returns:
+            dict[str, PreflightResult]: Validation results keyed by URL,
+                metadata of available URLs is kept for downloading
+        """
+        message = f"Validating {len(url_list)} URLs"
+        self.add_status_message(message)
+        self.total_progress.setFormat(AppConst.FORMATSTR_TOTALPROGRESS)
+        self.total_progress.setRange(0, len(url_list))
+        self.total_progress.setValue(0)
+
+        results: dict[str, PreflightResult] = {}
+        status_counts: dict[str, int] = {}
+        estimated_bytes = 0
+        unknown_size_count = 0
+        kept_info_count = 0
+        validator = PreflightValidator(ydl_opts, self.validate_workers)
+        pending = {validator.submit(url) for url in url_list}
+        while pending and not self.cancel_flag:
+            done, pending = wait(pending, timeout=0.05,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[result.url] = result
+                status_counts[result.status] = \
+                    status_counts.get(result.status, 0) + 1
+                if result.status != AppConst.PREFLIGHT_AVAILABLE:
+                    message = f"Validation failed ({result.status}): " \
+                        f"{result.url}"
+                    self.add_status_message(message)
+                    self.run_report.add_url(
+                        result.url, AppConst.REPORT_STATUS_INVALID,
+                        f"{result.status}: {result.error}")
+                    self.negative_cache.add_error(result.url, result.error)
+                    continue
+                if result.estimated_bytes is None:
+                    unknown_size_count += 1
+                else:
+                    estimated_bytes += result.estimated_bytes
+                if result.info is not None:
+                    if kept_info_count < AppConst.PREFLIGHT_MAX_INFOS:
+                        kept_info_count += 1
+                    else:
+                        # Too many to keep, extract again when downloading
+                        result.info = None
+            self.total_progress.setValue(len(results))
+            # Drive message loop
+            QApplication.processEvents()
+        if self.cancel_flag:
+            validator.cancel()
+            for url in url_list:
+                if url not in results:
+                    self.run_report.add_url(
+                        url, JobStatus.NAMES[JobStatus.CANCELED])
+        validator.shutdown()
+
+        message = "Validation complete: " + ", ".join(
+            f"{count} {status}" for status, count in status_counts.items())
+        self.add_status_message(message)
+        message = f"Estimated download size: {format_bytes(estimated_bytes)}"
+        if unknown_size_count:
+            message += f" plus {unknown_size_count} URLs of unknown size"
+        self.add_status_message(message)
+        return {url: result for url, result in results.items()
+                if result.status == AppConst.PREFLIGHT_AVAILABLE}
+
     def ydl_download_progress_hook(self, progress_dict:
                                    dict[str, Any]) -> None:
-        """Callback function for download progress
+        """Callback function for download progress. Called many times per
+        second so it only stores the progress for render_progress() and
+        handles changes of file or status.
 
         Args:
             progress_dict (dict[str:Any]): progress dictionary
         """
-        # Drive message loop
-        QApplication.processEvents()
+        trace_start = time.perf_counter() if TRACER.enabled else 0.0
+        self.progress_slot.publish(progress_dict)
+        if self.url_report.phase != ReportPhase.DOWNLOAD:
+            self.url_report.set_phase(ReportPhase.DOWNLOAD)
+            info_dict = progress_dict.get("info_dict", None)
+            if isinstance(info_dict, dict):
+                self.url_report.set_info(info_dict)
+        status = progress_dict.get("status", None)
+        filename = progress_dict.get("filename", None)
+        if "downloading" != status or filename != self.progress_filename:
+            self.progress_status_changed(status, filename)
+            self.track_partial_file(progress_dict)
+        # Drive message loop at a limited rate, renders progress
+        now = time.monotonic()
+        if now >= self.progress_events_time:
+            self.progress_events_time = now \
+                + AppConst.PROGRESS_EVENTS_INTERVAL
+            QApplication.processEvents()
+        if TRACER.enabled:
+            TRACER.complete("progress_hook", "hook", trace_start)
         if self.cancel_flag:
+            # pylint: disable-next=import-outside-toplevel
+            from yt_dlp import utils
             raise utils.DownloadCancelled("Aborted")
+
+    def progress_status_changed(self, status: Optional[str],
+                                filename: Optional[str]) -> None:
+        """Called from the progress hook when the download status is not
+        "downloading" or the file changed
+
+        Args:
+            status (Optional[str]): Status from the progress dict
+            filename (Optional[str]): Filename from the progress dict
+        """
+        self.progress_filename = filename
+        if filename is None:
+            return
+        if self.jobs.add_filename(filename):
+            message = f"Downloading file {filename}"
+            self.add_status_message(message)
+        if "finished" == status:
+            self.render_progress()
+            message = f"Finished with file {filename}"
+            self.add_status_message(message)
+        elif "error" == status:
+            message = f"Error with file {filename}"
+            self.add_status_message(message, logging.ERROR)
+
+    def render_progress(self) -> None:
+        """Updates the progress bars and downloads table from the latest
+        progress of the active download, called by progress_timer
+        """
+        trace_start = time.perf_counter() if TRACER.enabled else 0.0
+        progress_dict = self.progress_slot.take()
+        if progress_dict is not None:
+            self.job_model.update_job(self.job_serial, progress_dict)
+            self.batch_progress.update(progress_dict)
+            self.render_file_progress(progress_dict)
+        self.render_batch_progress()
+        if TRACER.enabled:
+            TRACER.complete("render_progress", "gui", trace_start)
+
+    def render_file_progress(self, progress_dict: dict[str, Any]) -> None:
+        """Updates the file progress bar
+
+        Args:
+            progress_dict (dict[str, Any]): Progress dict from yt_dlp
+        """
         status = progress_dict.get("status", None)
         file_bytes = progress_dict.get("downloaded_bytes", None)
         file_total = progress_dict.get("total_bytes", None)
         if not file_total:
             file_total = progress_dict.get("total_bytes_estimate", None)
+        if "finished" == status and file_total:
+            file_bytes = file_total
+        elif "downloading" != status:
+            return
+        if file_bytes is None or not file_total:
+            return
+        self.file_progress.setFormat(AppConst.FORMATSTR_FILEPROGRESS.format(
+            downloaded=format_bytes(file_bytes),
+            total=format_bytes(file_total)))
+        self.file_progress.setTextVisible(True)
+        self.file_progress.setValue(min(
+            int(file_bytes / file_total * AppConst.PROGRESS_BAR_SCALE),
+            AppConst.PROGRESS_BAR_SCALE))
+
+    def render_batch_progress(self) -> None:
+        """Updates the total progress bar with the byte weighted progress,
+        rate and ETA of the batch
+        """
+        batch = self.batch_progress
+        batch.sample()
+        total = batch.total_bytes()
+        rate = batch.rate()
+        eta = batch.eta()
+        total_text = "?" if total is None else format_bytes(total)
+        if total is not None and batch.is_estimate():
+            total_text = "~" + total_text
+        self.total_progress.setFormat(AppConst.FORMATSTR_BATCHPROGRESS.format(
+            processed=self.jobs.processed_count(),
+            count=self.jobs.processed_count() + self.jobs.pending_count(),
+            downloaded=format_bytes(batch.downloaded_bytes()),
+            total=total_text,
+            rate="?" if rate is None else format_bytes(rate),
+            eta="?" if eta is None else format_duration(eta)))
+        self.total_progress.setValue(
+            int(batch.fraction() * AppConst.PROGRESS_BAR_SCALE))
+
+    def ydl_post_hook(self, filename: str) -> None:
+        """Callback function after all postprocessing of a video
 
-        if "downloading" == status:
-            if file_bytes is not None and file_total is not None:
-                pos_value = file_bytes // 1024 // 1024
-                pos_max = file_total // 1024 // 1024
-                self.file_progress.setTextVisible(True)
-                self.file_progress.setValue(pos_value)
-                self.file_progress.setMaximum(pos_max)
-        if "filename" in progress_dict:
-            filename = progress_dict["filename"]
-            if filename not in self.download_filenames:
-                self.download_filenames.append(filename)
-                message = f"Downloading file {filename}"
-                self.add_status_message(message)
-            if "finished" == status:
-                message = f"Finished with file {filename}"
-                self.add_status_message(message)
-                if file_total:
-                    pos_max = file_total // 1024 // 1024
-                    self.file_progress.setMaximum(pos_max)
-                    self.file_progress.setValue(pos_max)
-            elif "error" == status:
-                message = f"Error with file {filename}"
-                self.add_status_message(message)
+        Args:
+            filename (str): Final path of the video file
+        """
+        self.job_files.append(filename)
 
     def ydl_postprocessor_hook(self, hook_dict: dict[str, Any]) -> None:
         """Callback function for postprocessing progress info
@@ -1208,9 +1953,16 @@ class MainWindow(QMainWindow):
         status = hook_dict.get("status", None)
         info_dict = hook_dict.get("info_dict", {})
         filename = info_dict.get("filename", "[UNKNOWN]")
+        if TRACER.enabled:
+            TRACER.instant("postprocessor_hook", "hook",
+                           {"status": status,
+                            "postprocessor": hook_dict.get("postprocessor")})
         message = ""
         if "started" == status:
             message = f"Starting postprocessing of {filename}"
+            self.job_model.set_stage(self.job_serial, JobStage.POSTPROCESSING)
+            self.url_report.set_phase(ReportPhase.POSTPROCESS)
+            self.url_report.set_info(info_dict)
         elif "finished" == status:
             message = f"Finished postprocessing of {filename}"
         if message:
@@ -1233,9 +1985,13 @@ class MainWindow(QMainWindow):
         ydl_opts["simulate"] = True
 
         # Perform data retrieval
+        # pylint: disable-next=import-outside-toplevel
+        from yt_dlp import YoutubeDL, utils
         with YoutubeDL(ydl_opts) as ydl:
             try:
-                meta = ydl.extract_info(url, download=False)
+                with TRACER.span("extract_info", "formats", {"url": url}), \
+                        PROFILER.section(AppConst.PROFILE_SECTION_EXTRACT):
+                    meta = ydl.extract_info(url, download=False)
                 if isinstance(meta, dict):
                     format_list = meta.get('formats', [meta])
                 else:
@@ -1244,47 +2000,25 @@ class MainWindow(QMainWindow):
                     return
             except utils.DownloadError as e:
                 error_message = str(e)
-                message = f"Download error: {error_message}"
-                self.add_status_message(message)
+                if not self.ydl_logger.error_shown(error_message):
+                    message = f"Download error: {error_message}"
+                    self.add_status_message(message, logging.ERROR)
                 # Reenable widgets that would interfere with processing
                 self.enable_active_buttons(True)
                 return
 
-            headers = ["ID", "Extension", "Audio codec", "Video codec",
-                       "Resolution", "Bitrate", "Size", "Note"]
-            table = DocTable("File formats", headers)
-
-            for fmt in format_list:
-                # Tuple is (key, is_numeric, suffix, linkId)
-                keys: list[tuple[str, bool, str, str]] = \
-                        [("format_id", False, "", LinkIds.LINKID_FORMATID),
-                         ("ext", False, "", LinkIds.LINKID_FILEEXT),
-                         # TODO - Implement audio and video codec links
-                         # ("acodec", False, "", LinkIds.LINKID_AUDIOCODEC),
-                         # ("vcodec", False, "", LinkIds.LINKID_VIDEOCODEC),
-                         ("acodec", False, "", ""),
-                         ("vcodec", False, "", ""),
-                         ("resolution", False, "", LinkIds.LINKID_RESOLUTION),
-                         ("tbr", True, " K/s", ""),
-                         ("filesize", True, " bytes", ""),
-                         ("format_note", False, "", "")]
-                fields: list[tuple[str | list[str], str]] = []
-                for key, is_numeric, suffix, linkid in keys:
-                    text: str = ""
-                    link: str = ""
-                    if key in fmt and fmt[key]:
-                        if is_numeric:
-                            text = format(fmt[key], ',')
-                        else:
-                            text = fmt[key]
-                        text += suffix
-                        if linkid:
-                            link = linkid + LinkIds.LINKID_SEP + text
-                    fields.append((text, link))
-                # Add fields to table
-                table.add_row(fields)
-            # Add table to status window
-            self.status_text.append_html(table.to_html())
+            title = str(meta.get('title') or url)
+            if self.format_browser is None:
+                self.format_browser = FormatBrowser(
+                    self.status_click_callback, self)
+            with TRACER.span("show_formats", "gui",
+                             {"formats": len(format_list)}):
+                self.format_browser.set_formats(title, format_list)
+            self.format_browser.show()
+            self.format_browser.raise_()
+            self.format_browser.activateWindow()
+            self.add_status_message(f"Listed {len(format_list)} formats "
+                                    f"for {title}")
 
         # Reenable widgets that would interfere with processing
         self.enable_active_buttons(True)
@@ -1303,13 +2037,18 @@ class MainWindow(QMainWindow):
         self.create_ydl_quiet_options(ydl_opts)
         ydl_opts["simulate"] = True
 
+        # pylint: disable-next=import-outside-toplevel
+        from yt_dlp import YoutubeDL, utils
         with YoutubeDL(ydl_opts) as ydl:
             try:
-                meta = ydl.extract_info(url, download=False)
+                with TRACER.span("extract_info", "subtitles", {"url": url}), \
+                        PROFILER.section(AppConst.PROFILE_SECTION_EXTRACT):
+                    meta = ydl.extract_info(url, download=False)
             except utils.DownloadError as e:
                 error_message = str(e)
-                message = f"Download error: {error_message}"
-                self.add_status_message(message)
+                if not self.ydl_logger.error_shown(error_message):
+                    message = f"Download error: {error_message}"
+                    self.add_status_message(message, logging.ERROR)
                 self.enable_active_buttons(True)
                 return
 
@@ -1347,7 +2086,7 @@ class MainWindow(QMainWindow):
                                        LinkIds.LINKID_SUBEXTENSION))
                         table.add_row(fields)
                     # Add table to status window
-                    self.status_text.append_html(table.to_html())
+                    self.status_text.append_table(table)
 
             parse_subs(self, "automatic_captions", "Auto-generated captions")
             parse_subs(self, "subtitles", "Subtitles")
@@ -1355,19 +2094,614 @@ class MainWindow(QMainWindow):
         # Restore focus to clicked button which got disabled and lost focus
         self.list_subs_button.setFocus()
 
-    def add_status_message(self, message: str) -> None:
+    def start_log_file(self, file_path: str) -> bool:
+        """Starts writing status messages to a log file
+
+        Args:
+            file_path (str): Path of log file
+
+        Returns:
+            bool: True if the log file could be opened
+        """
+        self.stop_log_file()
+        log_writer = LogWriter(file_path)
+        if not log_writer.start():
+            message = f"Unable to open log file {file_path}"
+            self.add_status_message(message, logging.ERROR)
+            return False
+        self.log_writer = log_writer
+        message = f"Writing status log to {log_writer.file_path}"
+        self.add_status_message(message)
+        return True
+
+    def start_trace(self, file_path: str) -> bool:
+        """Starts collecting trace events, written by stop_trace()
+
+        Args:
+            file_path (str): Path of trace file
+
+        Returns:
+            bool: True if the trace file could be created
+        """
+        if not TRACER.start(file_path):
+            message = f"Unable to create trace file {file_path}"
+            self.add_status_message(message, logging.ERROR)
+            return False
+        message = f"Tracing to {TRACER.file_path}"
+        self.add_status_message(message)
+        return True
+
+    def stop_trace(self) -> None:
+        """Writes collected trace events to the trace file
+        """
+        if TRACER.enabled and not TRACER.stop():
+            print(f"Unable to write trace file {TRACER.file_path}")
+
+    def enable_lag_probe(self) -> None:
+        """Measures event loop lag during each batch and shows a summary
+        when the batch finishes
+        """
+        if self.lag_probe is None:
+            self.lag_probe = LagProbe(self)
+
+    def enable_startup_report(self) -> None:
+        """Prints the startup report once the window is shown and yt_dlp
+        is imported
+        """
+        if self.startup_report_timer is None:
+            self.startup_report_timer = QTimer(self)
+            self.startup_report_timer.setInterval(
+                AppConst.STARTUP_REPORT_POLL_INTERVAL)
+            self.startup_report_timer.timeout.connect(
+                self.print_startup_report)
+
+    def window_shown(self) -> None:
+        """Called by the first run of the message loop after the window is
+        shown, imports yt_dlp in the background
+        """
+        STARTUP.mark(STARTUP.PHASE_SHOW_WINDOW)
+        YDL_IMPORTER.start()
+        if self.startup_report_timer is not None:
+            self.startup_report_timer.start()
+
+    def print_startup_report(self) -> None:
+        """Timer slot, prints the startup report when yt_dlp is imported
+        """
+        if not YDL_IMPORTER.is_done() or self.startup_report_timer is None:
+            return
+        self.startup_report_timer.stop()
+        print("\n".join(STARTUP.to_lines(AppConst.STARTUP_BUDGET_MS,
+                                          YDL_IMPORTER.seconds,
+                                          YDL_IMPORTER.end_time)),
+              flush=True)
+
+    def set_staging_dir(self, directory: str) -> bool:
+        """Downloads into a staging directory and moves finished files to
+        the download directory on a background thread
+
+        Args:
+            directory (str): Staging directory, created if missing
+
+        Returns:
+            bool: True if the directory exists or was created
+        """
+        path = QFileInfo(directory).absoluteFilePath()
+        if not QDir().mkpath(path):
+            message = f"Unable to create staging directory {path}"
+            self.add_status_message(message, logging.ERROR)
+            return False
+        self.staging_dir = path
+        if self.file_mover is None:
+            self.file_mover = FileMover()
+            self.file_mover.start()
+        message = f"Downloading into staging directory {path}"
+        self.add_status_message(message)
+        return True
+
+    def set_subdirs(self, subdirs: str) -> None:
+        """Downloads into subdirectories of the download directory named by
+        a field of each video, so no directory grows too large
+
+        Args:
+            subdirs (str): One of the AppConst.SUBDIRS_ values
+        """
+        self.subdir_outtmpl = AppConst.SUBDIRS_OUTTMPL[subdirs]
+        if self.subdir_outtmpl:
+            message = f"Downloading into subdirectories by {subdirs}"
+            self.add_status_message(message)
+
+    def set_disk_margin(self, margin_mib: int) -> None:
+        """Sets the free space kept on the download file systems, or
+        disables checking the free space
+
+        Args:
+            margin_mib (int): Margin in MiB, negative to disable checking
+        """
+        if margin_mib < 0:
+            self.disk_guard = None
+            return
+        self.disk_guard = DiskSpaceGuard(margin_mib * 1024 * 1024)
+
+    def show_disk_space_estimate(self) -> None:
+        """Shows the estimated size of the batch and whether it fits in the
+        free space of the download directory before downloading
+        """
+        if self.disk_guard is None:
+            return
+        free = DiskSpaceGuard.free_bytes(self.download_dir)
+        if free is None:
+            return
+        total = self.batch_progress.total_bytes()
+        if total is None:
+            message = f"Batch size unknown, {format_bytes(free)} free in " \
+                f"{self.download_dir}"
+            self.add_status_message(message)
+            return
+        # Staged files are moved out, so only the download directory has
+        # to hold the whole batch
+        reason = self.disk_guard.shortfall(total, self.download_dir)
+        if reason:
+            message = f"Estimated batch size {format_bytes(total)} does " \
+                f"not fit, {reason}. Downloads pause when they do not fit."
+            self.add_status_message(message, logging.WARNING)
+        else:
+            message = f"Estimated batch size {format_bytes(total)}, " \
+                f"{format_bytes(free)} free in {self.download_dir}"
+            self.add_status_message(message)
+
+    def disk_space_shortfall(self, needed: int) -> str:
+        """Checks whether a download fits in the free disk space
+
+        Args:
+            needed (int): Estimated bytes of the download
+
+        Returns:
+            str: Description of the missing space, empty if it fits
+        """
+        if self.disk_guard is None:
+            return ""
+        reserved = 0
+        if self.file_mover is not None:
+            reserved = self.file_mover.pending_bytes
+        return self.disk_guard.shortfall(needed, self.download_dir,
+                                         self.staging_dir, reserved)
+
+    def wait_for_disk_space(self, needed: int) -> bool:
+        """Pauses downloading until a download fits in the free disk
+        space, running the message loop
+
+        Args:
+            needed (int): Estimated bytes of the download
+
+        Returns:
+            bool: True if the download fits, False if canceled
+        """
+        reason = self.disk_space_shortfall(needed)
+        if reason and self.file_mover is not None:
+            # Moving finished downloads may free the staging directory
+            self.wait_for_file_mover()
+            reason = self.disk_space_shortfall(needed)
+        if not reason:
+            return True
+        message = f"Downloads paused, not enough disk space: {reason}. " \
+            "Free some space or cancel."
+        self.add_status_message(message, logging.WARNING)
+        self.job_model.set_stage(self.job_serial, JobStage.PAUSED)
+        pause_start = time.monotonic()
+        next_check = pause_start + AppConst.DISK_CHECK_INTERVAL
+        while not self.cancel_flag:
+            time.sleep(AppConst.DISK_WAIT_INTERVAL)
+            QApplication.processEvents()
+            now = time.monotonic()
+            if now < next_check:
+                continue
+            next_check = now + AppConst.DISK_CHECK_INTERVAL
+            if not self.disk_space_shortfall(needed):
+                message = "Downloads resumed after " \
+                    f"{format_duration(now - pause_start)}"
+                self.add_status_message(message)
+                self.job_model.set_stage(self.job_serial,
+                                         JobStage.EXTRACTING)
+                if TRACER.enabled:
+                    TRACER.complete("disk_space_pause", "download",
+                                    pause_start, {"needed": needed})
+                return True
+        return False
+
+    def ydl_match_filter(self, ydl: "YoutubeDL",
+                         info_dict: dict[str, Any], *,
+                         incomplete: bool) -> Optional[str]:
+        """Callback function of yt_dlp before downloading a video, with the
+        formats selected. Skips videos already in the download directory
+        when staging, checks partial files left by earlier sessions and
+        admits the download if it fits in the free disk space, otherwise
+        pauses until it does.
+
+        Args:
+            ydl (YoutubeDL): YoutubeDL instance downloading the video
+            info_dict (dict[str, Any]): Metadata of the video
+            incomplete (bool): True while the formats are not selected yet
+
+        Raises:
+            DownloadError: If the download cannot fit on the file system
+            DownloadCancelled: If canceled while paused
+
+        Returns:
+            Optional[str]: Why the video is skipped or None to download it
+        """
+        if incomplete:
+            return None
+        existing = self.existing_download(ydl, info_dict)
+        if existing:
+            return f"{existing} has already been downloaded"
+        self.check_partial_files(ydl, info_dict)
+        if self.disk_guard is None:
+            return None
+        # pylint: disable-next=import-outside-toplevel
+        from yt_dlp import utils
+        needed = needed_info_bytes(info_dict)
+        if needed is None:
+            # Assume the average size of the batch
+            needed = int(self.batch_progress.average_bytes() or 0)
+        reason = self.disk_guard.exceeds_capacity(needed, self.download_dir,
+                                                  self.staging_dir)
+        if reason:
+            raise utils.DownloadError(f"Too large for the disk, {reason}")
+        if not self.wait_for_disk_space(needed):
+            raise utils.DownloadCancelled("Canceled while waiting for disk "
+                                          "space")
+        return None
+
+    def existing_download(self, ydl: "YoutubeDL",
+                          info_dict: dict[str, Any]) -> str:
+        """Looks for a video in the download directory when downloading to
+        a staging directory without overwriting. yt_dlp only looks in the
+        staging directory so would download it again.
+
+        Args:
+            ydl (YoutubeDL): YoutubeDL instance downloading the video
+            info_dict (dict[str, Any]): Metadata of the video with the
+                formats selected
+
+        Returns:
+            str: Path of the existing file, empty if none
+        """
+        home = (ydl.params.get("paths") or {}).get("home", "")
+        if not home or home == self.download_dir \
+                or ydl.params.get("overwrites"):
+            return ""
+        # Moved to the same relative path in the download directory
+        filename = QDir(self.download_dir).filePath(
+            QDir(home).relativeFilePath(ydl.prepare_filename(info_dict)))
+        filenames = [filename]
+        final_ext = ydl.params.get("final_ext")
+        if final_ext:
+            file_info = QFileInfo(filename)
+            filenames.insert(0, QDir(file_info.path()).filePath(
+                f"{file_info.completeBaseName()}.{final_ext}"))
+        for path in filenames:
+            if QFileInfo(path).isFile():
+                return path
+        return ""
+
+    def track_partial_file(self, progress_dict: dict[str, Any]) -> None:
+        """Records a file when its download starts so a partial file left
+        by canceling, an error or a crash can be checked before resuming
+        it, and forgets it when complete. The validators of the server are
+        asked for in the background as the download starts, so they
+        describe the file the partial file is the start of.
+
+        Args:
+            progress_dict (dict[str, Any]): Progress dict from yt_dlp
+        """
+        status = progress_dict.get("status", None)
+        filename = progress_dict.get("filename", None)
+        if filename is None:
+            return
+        if "finished" == status:
+            partial = self.job_partials.pop(filename, None)
+            if partial is not None:
+                self.partial_store.remove(self.url_report.url, partial.path)
+                self.partial_store.save()
+            return
+        tmpfilename = progress_dict.get("tmpfilename", None)
+        if "downloading" != status or filename in self.job_partials \
+                or not tmpfilename:
+            return
+        info_dict = progress_dict.get("info_dict", None) or {}
+        partial = PartialFile(tmpfilename,
+                              str(info_dict.get("format_id", "")),
+                              is_fragmented(info_dict),
+                              int(progress_dict.get("total_bytes") or 0))
+        self.job_partials[filename] = partial
+        if 0 < partial.expected_size < AppConst.RESUME_MIN_BYTES:
+            return
+        self.partial_store.add(self.url_report.url, partial)
+        self.partial_store.save()
+        if not partial.fragmented and self.server_prober is not None:
+            self.server_probes.append((self.url_report.url, partial,
+                                       self.server_prober.submit(info_dict)))
+
+    def record_server_states(self) -> None:
+        """Records the validators of the answers of servers received so
+        far, called by progress_timer
+        """
+        if not self.server_probes:
+            return
+        pending = []
+        for url, partial, future in self.server_probes:
+            if not future.done():
+                pending.append((url, partial, future))
+                continue
+            # Requests may fail once the YoutubeDL instance is closed
+            state = None if future.cancelled() or future.exception() \
+                else future.result()
+            if state is not None:
+                self.partial_store.set_server_state(url, partial, state)
+        self.server_probes = pending
+        self.partial_store.save()
+
+    def record_partial_files(self, done: bool) -> None:
+        """Keeps the records of partial files left by the active job, or
+        forgets its partial files if it completed
+
+        Args:
+            done (bool): True if the job completed
+        """
+        url = self.url_report.url
+        self.record_server_states()
+        if done:
+            self.partial_store.take(url)
+        else:
+            for partial in self.job_partials.values():
+                if not QFileInfo(partial.path).isFile() \
+                        or 0 < partial.expected_size \
+                        < AppConst.RESUME_MIN_BYTES:
+                    continue
+                self.partial_store.add(url, partial)
+                message = f"Kept partial file {partial.path} to resume " \
+                    "later"
+                self.add_status_message(message)
+        self.job_partials = {}
+        self.partial_store.save()
+
+    def check_partial_files(self, ydl: "YoutubeDL",
+                            info_dict: dict[str, Any]) -> None:
+        """Checks partial files of a video left by earlier downloads. They
+        are resumed if the same format is selected and the server supports
+        resuming and still sends the same file, otherwise deleted so the
+        download starts over. Partial files without a record cannot be
+        checked so are deleted too.
+
+        Args:
+            ydl (YoutubeDL): YoutubeDL instance downloading the video
+            info_dict (dict[str, Any]): Metadata of the video with the
+                formats selected
+        """
+        url = self.url_report.url
+        filename = ydl.prepare_filename(info_dict)
+        partials = self.partial_store.take(url, filename)
+        kept_paths: set[str] = set()
+        formats = {str(format_info.get("format_id", "")): format_info
+                   for format_info
+                   in info_dict.get("requested_formats") or [info_dict]}
+        for partial in partials:
+            if not QFileInfo(partial.path).isFile():
+                continue
+            format_info = formats.get(partial.format_id)
+            if format_info is None:
+                reason = f"format {partial.format_id} is no longer selected"
+            elif partial.fragmented:
+                # yt_dlp checks fragments against its .ytdl state file
+                reason = ""
+            else:
+                state = probe_server(ydl, format_info)
+                reason = "the server did not answer" if state is None \
+                    else partial.mismatch(state)
+            if reason:
+                partial.delete()
+                message = f"Restarting download of {partial.path}, {reason}"
+                self.add_status_message(message, logging.WARNING)
+                continue
+            # Recorded again in case this download is interrupted too
+            self.partial_store.add(url, partial)
+            kept_paths.update(QFileInfo(path).absoluteFilePath()
+                              for path in partial.related_paths())
+            message = f"Resuming {partial.path} from " \
+                f"{format_bytes(QFileInfo(partial.path).size())}"
+            self.add_status_message(message)
+        self.partial_store.save()
+        for path in find_partial_files(filename):
+            if QFileInfo(path).absoluteFilePath() in kept_paths:
+                continue
+            # Left by an earlier version, too small to be recorded or its
+            # record was lost, yt_dlp would resume it unchecked
+            QFile.remove(path)
+            message = f"Restarting download of {path}, it has no record " \
+                "to check it against"
+            self.add_status_message(message, logging.WARNING)
+
+    def set_dedup(self, mode: str) -> None:
+        """Replaces downloaded files identical to files downloaded before
+        with links to them after each batch
+
+        Args:
+            mode (str): One of the AppConst.DEDUP_MODE_ values
+        """
+        app_data_path = get_app_data_path()
+        self.deduplicator = Deduplicator(
+            QDir(app_data_path).filePath(AppConst.FILENAME_DEDUP_INDEX)
+            if app_data_path else "", mode)
+
+    def add_completed_files(self, staging_dir: str) -> None:
+        """Records the files of a completed download at the path they end
+        up at
+
+        Args:
+            staging_dir (str): Staging directory of the download, empty if
+                not staged
+        """
+        for filename in self.job_files:
+            if staging_dir:
+                # Moved to the same relative path in the download directory
+                filename = QDir(self.download_dir).filePath(
+                    QDir(staging_dir).relativeFilePath(filename))
+            self.jobs.add_completed_file(
+                QFileInfo(filename).absoluteFilePath())
+
+    def dedup_completed_files(self) -> int:
+        """Hashes the files downloaded in the batch and replaces those
+        identical to files downloaded before with links, running the
+        message loop
+
+        Returns:
+            int: Bytes reclaimed
+        """
+        paths = list(self.jobs.completed_files)
+        if self.deduplicator is None or not paths:
+            return 0
+        dedup_start = time.perf_counter()
+        message = f"Checking {len(paths)} downloaded files for duplicates"
+        self.add_status_message(message)
+        self.deduplicator.load()
+        linked_count = 0
+        reclaimed_bytes = 0
+        pending = {self.deduplicator.submit(path) for path in paths}
+        while pending:
+            done, pending = wait(pending, timeout=0.05,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result.error:
+                    message = f"Unable to deduplicate {result.path}: " \
+                        f"{result.error}"
+                    self.add_status_message(message, logging.WARNING)
+                elif result.linked:
+                    linked_count += 1
+                    reclaimed_bytes += result.size
+                    message = f"Replaced {result.path} with a " \
+                        f"{self.deduplicator.mode} to the identical " \
+                        f"{result.original}"
+                    self.add_status_message(message)
+            # Drive message loop
+            QApplication.processEvents()
+        self.deduplicator.save()
+        message = f"Deduplicated {linked_count} of {len(paths)} files, " \
+            f"reclaimed {format_bytes(reclaimed_bytes)} in " \
+            f"{time.perf_counter() - dedup_start:.2f} s"
+        self.add_status_message(message)
+        if TRACER.enabled:
+            TRACER.complete("dedup", "dedup", dedup_start,
+                            {"files": len(paths), "linked": linked_count,
+                             "reclaimed": reclaimed_bytes})
+        return reclaimed_bytes
+
+    def move_staged_files(self, staging_dir: str, download_dir: str) -> None:
+        """Queues the files of a finished download for the file mover,
+        running the message loop while its queue is full
+
+        Args:
+            staging_dir (str): Staging directory of the download
+            download_dir (str): Directory to move the files to
+        """
+        if self.file_mover is None:
+            return
+        # Still counted as the active job, reserved until moved
+        size = self.batch_progress.active_bytes()
+        while not self.file_mover.submit(
+                staging_dir, download_dir, self.overwrite_check.isChecked(),
+                AppConst.MOVER_WAIT_INTERVAL, size):
+            self.show_move_results()
+            QApplication.processEvents()
+        self.show_move_results()
+
+    def wait_for_file_mover(self) -> None:
+        """Waits for the file mover to move all queued files, running the
+        message loop
+        """
+        if self.file_mover is None:
+            return
+        while not self.file_mover.wait_idle(AppConst.MOVER_WAIT_INTERVAL):
+            self.show_move_results()
+            QApplication.processEvents()
+        self.show_move_results()
+
+    def show_move_results(self) -> None:
+        """Shows status messages for files the file mover finished
+        """
+        if self.file_mover is None:
+            return
+        for result in self.file_mover.take_results():
+            if result.error:
+                message = f"Unable to move {result.source} to " \
+                    f"{result.destination}: {result.error}"
+                self.add_status_message(message, logging.ERROR)
+            elif result.kept_existing:
+                message = f"Kept existing file {result.destination}, " \
+                    "discarded the downloaded copy"
+                self.add_status_message(message, logging.WARNING)
+            else:
+                message = f"Moved {format_bytes(result.size)} to " \
+                    f"{result.destination} in {result.seconds:.2f} s"
+                self.add_status_message(message)
+
+    def set_report_dir(self, directory: str) -> None:
+        """Writes run reports to a directory instead of the application data
+        directory, old reports there are kept
+
+        Args:
+            directory (str): Directory for reports
+        """
+        self.run_report = RunReport(QFileInfo(directory).absoluteFilePath())
+
+    def stop_log_file(self) -> None:
+        """Writes remaining status messages and closes the log file
+        """
+        if self.log_writer is not None:
+            self.log_writer.stop()
+            self.log_writer = None
+
+    def update_status_filter(self) -> None:
+        """Applies the status filter widgets to the status window
+        """
+        level = self.status_level_combo.currentData()
+        self.status_text.set_filter(level if isinstance(level, int)
+                                    else logging.NOTSET,
+                                    self.status_filter_job)
+        self.status_alljobs_button.setVisible(self.status_filter_job >= 0)
+
+    def set_status_filter_job(self, job: Optional[int]) -> None:
+        """Shows only status lines of a download job
+
+        Args:
+            job (Optional[int]): Job id or -1 or None for all jobs
+        """
+        self.status_filter_job = -1 if job is None else job
+        self.update_status_filter()
+
+    def add_status_message(self, message: str,
+                           level: int = logging.INFO) -> None:
         """Adds text to the status window and scrolls to the bottom
 
         Args:
             message (str): Message text to add
+            level (int, optional): logging module level of the message.
+                Defaults to logging.INFO.
         """
+        trace_start = time.perf_counter() if TRACER.enabled else 0.0
         # Output to console
         if self.consoleoutput_check.isChecked():
             print(message)
+        # Queue for log file
+        if self.log_writer is not None:
+            self.log_writer.write(message, level,
+                                  self.status_text.current_job)
         # Add text to status window
-        self.status_text.append_text(message)
+        self.status_text.append_text(message, level)
         # Drive message loop
         QApplication.processEvents()
+        if TRACER.enabled:
+            TRACER.complete("status_message", "gui", trace_start)
 
     def enable_active_buttons(self, enable: bool) -> None:
         """Enables or disables widgets while downloading is in progress
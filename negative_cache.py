@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""negative_cache.py - Persistent cache of URLs that failed to download
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import re
+import json
+import time
+from constants import AppConst
+from utils import canonicalize_url
+
+
+class NegativeCache:
+    """Remembers URLs that failed with a recognized error so they can be
+    skipped on later runs until their entry expires
+    """
+    # Path of JSON file the cache is stored in
+    file_path: str
+    # Canonical URL to (error class, expiry time)
+    entries: dict[str, tuple[str, float]]
+    # Compiled (error class, is permanent, regex) list
+    error_classes: list[tuple[str, bool, re.Pattern[str]]]
+    # True if entries changed since loading
+    dirty: bool
+
+    def __init__(self, file_path: str) -> None:
+        """Initializer for NegativeCache
+
+        Args:
+            file_path (str): Path of JSON file to store cache in. If empty
+                the cache is not persisted.
+        """
+        self.file_path = file_path
+        self.entries = {}
+        self.error_classes = [
+            (name, permanent, re.compile(regex))
+            for name, permanent, regex in AppConst.NEGATIVECACHE_ERROR_CLASSES]
+        self.dirty = False
+
+    def load(self) -> None:
+        """Loads cache entries from file, dropping expired entries
+        """
+        self.entries = {}
+        self.dirty = False
+        if not self.file_path or not os.path.isfile(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for url, (error_class, expiry) in data.get("entries", {}).items():
+            if expiry > now:
+                self.entries[url] = (error_class, expiry)
+
+    def save(self) -> None:
+        """Saves cache entries to file if they have changed
+        """
+        if not self.file_path or not self.dirty:
+            return
+        temp_path = self.file_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding="utf-8") as f:
+                json.dump({"version": 1, "entries": self.entries}, f)
+            # Replace atomically so a crash never leaves a partial file
+            os.replace(temp_path, self.file_path)
+            self.dirty = False
+        except OSError:
+            pass
+
+    def classify_error(self, message: str) -> tuple[str, bool]:
+        """Returns the error class of a download error message
+
+        Args:
+            message (str): Error message from yt_dlp
+
+        Returns:
+            tuple[str, bool]: (error class, is permanent) or ("", False) if
+                the error is not recognized
+        """
+        for name, permanent, regex in self.error_classes:
+            if regex.search(message):
+                return name, permanent
+        return "", False
+
+    def lookup(self, url: str) -> str:
+        """Returns the error class cached for a URL
+
+        Args:
+            url (str): URL to look up
+
+        Returns:
+            str: Error class or empty string if not cached or expired
+        """
+        entry = self.entries.get(canonicalize_url(url))
+        if entry is None or entry[1] <= time.time():
+            return ""
+        return entry[0]
+
+    def add_error(self, url: str, message: str) -> str:
+        """Adds a URL to the cache if its error is recognized
+
+        Args:
+            url (str): URL that failed
+            message (str): Error message from yt_dlp
+
+        Returns:
+            str: Error class or empty string if the error was not cached
+        """
+        error_class, permanent = self.classify_error(message)
+        if error_class:
+            ttl = AppConst.NEGATIVECACHE_TTL_PERMANENT if permanent \
+                else AppConst.NEGATIVECACHE_TTL_TRANSIENT
+            self.entries[canonicalize_url(url)] = (error_class,
+                                                   time.time() + ttl)
+            self.dirty = True
+        return error_class
+
+    def remove(self, url: str) -> None:
+        """Removes a URL from the cache, for instance after it succeeded
+
+        Args:
+            url (str): URL to remove
+        """
+        if self.entries.pop(canonicalize_url(url), None) is not None:
+            self.dirty = True
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+
+"""partial_store.py - Persistent records of partial downloads so later
+sessions only resume them when the server still has the same file
+
+yt_dlp resumes any partial file it finds, even if the server now sends a
+different file or another format was selected, which corrupts the
+download. Each partial file is recorded with its format ID and expected
+size when its download starts, and with the ETag and Last-Modified
+validators the server sends for it at that time, asked for in a worker
+thread. Before it is resumed the server is asked again and the partial file
+is deleted if anything changed.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import re
+import json
+from typing import Any, Optional, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, Future
+from constants import AppConst
+from utils import canonicalize_url
+
+if TYPE_CHECKING:
+    # yt_dlp is imported where used as importing it slows startup
+    from yt_dlp import YoutubeDL
+
+
+class ServerState:
+    """Answer of a server to a request for the first byte of a file
+    """
+    __slots__ = ("ranges", "size", "etag", "last_modified")
+    # True if the server answered with a partial response
+    ranges: bool
+    # Size of the whole file or None if unknown
+    size: Optional[int]
+    # Validators of the file, empty if not sent
+    etag: str
+    last_modified: str
+
+    def __init__(self, ranges: bool, size: Optional[int], etag: str,
+                 last_modified: str) -> None:
+        """Initializer for ServerState
+
+        Args:
+            ranges (bool): True if the server supports range requests
+            size (Optional[int]): Size of the whole file or None if unknown
+            etag (str): ETag header
+            last_modified (str): Last-Modified header
+        """
+        self.ranges = ranges
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class PartialFile:
+    """A partial download left in the download or staging directory
+    """
+    __slots__ = ("path", "format_id", "fragmented", "expected_size", "etag",
+                 "last_modified")
+    # Path of the partial file
+    path: str
+    # yt_dlp format ID the file is a download of
+    format_id: str
+    # True for fragmented formats such as HLS and DASH, which yt_dlp
+    # resumes by fragment from its .ytdl state file
+    fragmented: bool
+    # Size of the complete file or 0 if unknown
+    expected_size: int
+    # Validators sent by the server, empty if unknown
+    etag: str
+    last_modified: str
+
+    def __init__(self, path: str, format_id: str, fragmented: bool = False,
+                 expected_size: int = 0, etag: str = "",
+                 last_modified: str = "") -> None:
+        """Initializer for PartialFile
+
+        Args:
+            path (str): Path of the partial file
+            format_id (str): yt_dlp format ID
+            fragmented (bool, optional): True for fragmented formats.
+                Defaults to False.
+            expected_size (int, optional): Size of the complete file.
+                Defaults to 0.
+            etag (str, optional): ETag of the file. Defaults to "".
+            last_modified (str, optional): Last-Modified of the file.
+                Defaults to "".
+        """
+        self.path = path
+        self.format_id = format_id
+        self.fragmented = fragmented
+        self.expected_size = expected_size
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the record as a dict for saving
+
+        Returns:
+            dict[str, Any]: Record fields
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def set_server_state(self, state: ServerState) -> None:
+        """Records the validators the server sent for the file
+
+        Args:
+            state (ServerState): Answer of the server
+        """
+        self.etag = state.etag
+        self.last_modified = state.last_modified
+        if state.size:
+            self.expected_size = state.size
+
+    def related_paths(self) -> list[str]:
+        """Returns the absolute paths of the partial file and of the state
+        file of fragmented downloads
+
+        Returns:
+            list[str]: Paths, the files may not exist
+        """
+        path = os.path.abspath(self.path)
+        return [path,
+                os.path.splitext(path)[0] + AppConst.RESUME_STATE_SUFFIX]
+
+    def delete(self) -> None:
+        """Deletes the partial file and the state file of fragmented
+        downloads so the download starts over
+        """
+        for path in self.related_paths():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def mismatch(self, state: ServerState) -> str:
+        """Compares the record with the current answer of the server
+
+        Args:
+            state (ServerState): Answer of the server
+
+        Returns:
+            str: Why the file cannot be resumed, empty if it can
+        """
+        if not state.ranges:
+            return "the server does not support resuming"
+        if self.expected_size and state.size \
+                and state.size != self.expected_size:
+            return f"the size changed from {self.expected_size} to " \
+                f"{state.size} bytes"
+        if self.etag and state.etag != self.etag:
+            return "the ETag changed"
+        if self.last_modified and state.last_modified != self.last_modified:
+            return "the Last-Modified date changed"
+        if not (self.etag or self.last_modified or self.expected_size):
+            return "nothing is known to verify it"
+        return ""
+
+
+def is_fragmented(format_info: dict[str, Any]) -> bool:
+    """Returns True if a format is downloaded in fragments
+
+    Args:
+        format_info (dict[str, Any]): Format or video metadata
+
+    Returns:
+        bool: True unless the format is a single HTTP file
+    """
+    return format_info.get("protocol", "https") \
+        not in AppConst.RESUME_PLAIN_PROTOCOLS
+
+
+def find_partial_files(filename: str) -> list[str]:
+    """Returns the partial files and fragment state files in the directory
+    of a video that yt_dlp would resume, of the video file or of each
+    format of a merged download, which are named like "name.f137.mp4.part"
+
+    Args:
+        filename (str): Final path of the video
+
+    Returns:
+        list[str]: Paths of the files
+    """
+    directory, name = os.path.split(filename)
+    prefix = os.path.splitext(name)[0] + "."
+    suffixes = (AppConst.RESUME_PART_SUFFIX, AppConst.RESUME_STATE_SUFFIX)
+    try:
+        with os.scandir(directory or ".") as entries:
+            return [entry.path for entry in entries
+                    if entry.name.startswith(prefix)
+                    and entry.name.endswith(suffixes) and entry.is_file()]
+    except OSError:
+        return []
+
+
+def probe_server(ydl: "YoutubeDL",
+                 format_info: dict[str, Any]) -> Optional[ServerState]:
+    """Requests the first byte of a format to learn whether the server
+    supports resuming and which validators it sends
+
+    Args:
+        ydl (YoutubeDL): YoutubeDL instance, for its cookies, proxy and
+            headers
+        format_info (dict[str, Any]): Selected format with its URL
+
+    Returns:
+        Optional[ServerState]: Answer of the server or None if the request
+            failed
+    """
+    url = format_info.get("url")
+    if not url:
+        return None
+    # pylint: disable-next=import-outside-toplevel
+    from yt_dlp.networking import Request
+    # pylint: disable-next=import-outside-toplevel
+    from yt_dlp.networking.exceptions import RequestError
+    headers = dict(format_info.get("http_headers") or {})
+    headers["Range"] = "bytes=0-0"
+    try:
+        response = ydl.urlopen(Request(
+            url, headers=headers,
+            extensions={"timeout": AppConst.RESUME_PROBE_TIMEOUT}))
+    except RequestError:
+        return None
+    try:
+        size = None
+        range_match = re.match(r"bytes \d+-\d+/(\d+)",
+                               response.headers.get("Content-Range", ""))
+        if range_match:
+            size = int(range_match.group(1))
+        elif response.status == 200 \
+                and response.headers.get("Content-Length", "").isdigit():
+            size = int(response.headers["Content-Length"])
+        return ServerState(response.status == 206, size,
+                           response.headers.get("ETag", ""),
+                           response.headers.get("Last-Modified", ""))
+    finally:
+        response.close()
+
+
+class ServerProber:
+    """Asks servers for the validators of files being downloaded in worker
+    threads, so neither the download nor canceling it waits for the answer
+    """
+    # YoutubeDL instance of the downloads, for its cookies, proxy and
+    # headers
+    ydl: "YoutubeDL"
+    executor: ThreadPoolExecutor
+
+    def __init__(self, ydl: "YoutubeDL",
+                 max_workers: int = AppConst.RESUME_PROBE_WORKERS) -> None:
+        """Initializer for ServerProber
+
+        Args:
+            ydl (YoutubeDL): YoutubeDL instance of the downloads
+            max_workers (int, optional): Number of servers asked at once.
+                Defaults to AppConst.RESUME_PROBE_WORKERS.
+        """
+        self.ydl = ydl
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="probe")
+
+    def submit(self,
+               format_info: dict[str, Any]) -> Future[Optional[ServerState]]:
+        """Queues a request for the first byte of a format
+
+        Args:
+            format_info (dict[str, Any]): Format with its URL
+
+        Returns:
+            Future[Optional[ServerState]]: Future for the answer
+        """
+        return self.executor.submit(probe_server, self.ydl,
+                                    dict(format_info))
+
+    def shutdown(self) -> None:
+        """Discards queued requests without waiting for those in progress
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PartialStore:
+    """Partial downloads by the URL they are downloads of, stored between
+    sessions
+    """
+    # Path of JSON file the records are stored in
+    file_path: str
+    # Canonical URL to its partial files
+    entries: dict[str, list[PartialFile]]
+    # True if entries changed since loading
+    dirty: bool
+
+    def __init__(self, file_path: str) -> None:
+        """Initializer for PartialStore
+
+        Args:
+            file_path (str): Path of JSON file to store records in. If
+                empty the records are not persisted.
+        """
+        self.file_path = file_path
+        self.entries = {}
+        self.dirty = False
+
+    def load(self) -> None:
+        """Loads records from file, dropping those whose partial file is
+        gone
+        """
+        self.entries = {}
+        self.dirty = False
+        if not self.file_path or not os.path.isfile(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for url, records in data.get("entries", {}).items():
+            try:
+                partials = [PartialFile(**record) for record in records]
+            except TypeError:
+                self.dirty = True
+                continue
+            kept = [partial for partial in partials
+                    if os.path.isfile(partial.path)]
+            if len(kept) != len(partials):
+                self.dirty = True
+            if kept:
+                self.entries[url] = kept
+
+    def save(self) -> None:
+        """Saves records to file if they have changed
+        """
+        if not self.file_path or not self.dirty:
+            return
+        temp_path = self.file_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding="utf-8") as f:
+                json.dump({"version": 1, "entries": {
+                    url: [partial.to_dict() for partial in partials]
+                    for url, partials in self.entries.items()}}, f)
+            # Replace atomically so a crash never leaves a partial file
+            os.replace(temp_path, self.file_path)
+            self.dirty = False
+        except OSError:
+            pass
+
+    def add(self, url: str, partial: PartialFile) -> None:
+        """Records a partial file, replacing an earlier record of its path
+
+        Args:
+            url (str): URL the file is a download of
+            partial (PartialFile): Partial file
+        """
+        key = canonicalize_url(url)
+        partials = [existing for existing in self.entries.get(key, [])
+                    if existing.path != partial.path]
+        partials.append(partial)
+        self.entries[key] = partials
+        self.dirty = True
+
+    def set_server_state(self, url: str, partial: PartialFile,
+                         state: ServerState) -> None:
+        """Records the validators the server sent for a partial file
+
+        Args:
+            url (str): URL the file is a download of
+            partial (PartialFile): Partial file
+            state (ServerState): Answer of the server
+        """
+        partial.set_server_state(state)
+        if partial in self.entries.get(canonicalize_url(url), []):
+            self.dirty = True
+
+    def remove(self, url: str, path: str) -> None:
+        """Forgets a partial file, for instance once it is complete
+
+        Args:
+            url (str): URL the file is a download of
+            path (str): Path of the partial file
+        """
+        key = canonicalize_url(url)
+        partials = self.entries.get(key)
+        if partials is None:
+            return
+        kept = [partial for partial in partials if partial.path != path]
+        if len(kept) == len(partials):
+            return
+        if kept:
+            self.entries[key] = kept
+        else:
+            del self.entries[key]
+        self.dirty = True
+
+    def take(self, url: str, filename: str = "") -> list[PartialFile]:
+        """Removes and returns the partial files of a URL
+
+        Args:
+            url (str): URL to look up
+            filename (str, optional): Final path of a video, to only take
+                its partial files as a playlist URL has several videos.
+                Defaults to "" for all.
+
+        Returns:
+            list[PartialFile]: Partial files, empty if none
+        """
+        key = canonicalize_url(url)
+        partials = self.entries.get(key)
+        if not partials:
+            return []
+        # Partial files of merged formats insert the format ID before the
+        # extension
+        stem = os.path.splitext(filename)[0]
+        taken = [partial for partial in partials
+                 if partial.path.startswith(stem)]
+        if not taken:
+            return []
+        kept = [partial for partial in partials if partial not in taken]
+        if kept:
+            self.entries[key] = kept
+        else:
+            del self.entries[key]
+        self.dirty = True
+        return taken
+
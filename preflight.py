@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+"""preflight.py - Concurrent validation of URLs before downloading
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import re
+import copy
+import time
+import threading
+from typing import Any, Optional, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, Future
+from constants import AppConst
+from utils import estimate_info_bytes
+from tracer import TRACER
+from profiler import PROFILER
+if TYPE_CHECKING:
+    # yt_dlp is imported where used as importing it slows startup
+    from yt_dlp import YoutubeDL
+
+
+class PreflightResult:
+    """Result of validating a single URL
+    """
+    __slots__ = ("url", "status", "error", "info", "estimated_bytes",
+                 "timestamp")
+    # URL that was validated
+    url: str
+    # One of the AppConst.PREFLIGHT_* result classes
+    status: str
+    # Error message if not available
+    error: str
+    # Unprocessed metadata from extract_info() if available
+    info: Optional[dict[str, Any]]
+    # Estimated download size for the selected formats, None if unknown
+    estimated_bytes: Optional[int]
+    # time.monotonic() when validated
+    timestamp: float
+
+    def __init__(self, url: str) -> None:
+        """Initializer for PreflightResult
+
+        Args:
+            url (str): URL being validated
+        """
+        self.url = url
+        self.status = AppConst.PREFLIGHT_DEAD
+        self.error = ""
+        self.info = None
+        self.estimated_bytes = None
+        self.timestamp = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        """Returns True if the metadata is recent enough to download with
+
+        Returns:
+            bool: True if the metadata can be used for downloading
+        """
+        return self.info is not None and \
+            time.monotonic() - self.timestamp < AppConst.PREFLIGHT_INFO_TTL
+
+
+class PreflightValidator:
+    """Validates URLs concurrently using lightweight metadata extraction
+    """
+    # Options for the yt_dlp.YoutubeDL instance of each worker thread
+    ydl_opts: dict[str, Any]
+    # Thread local storage for worker YoutubeDL instances
+    local: threading.local
+    # All worker YoutubeDL instances, closed on shutdown
+    ydl_list: list["YoutubeDL"]
+    ydl_list_lock: threading.Lock
+    # Set to stop workers from starting new validations
+    cancel_event: threading.Event
+    # Compiled (result class, regex) list
+    error_classes: list[tuple[str, re.Pattern[str]]]
+    executor: ThreadPoolExecutor
+
+    def __init__(self, ydl_opts: dict[str, Any],
+                 max_workers: int = AppConst.PREFLIGHT_WORKERS) -> None:
+        """Initializer for PreflightValidator
+
+        Args:
+            ydl_opts (dict[str, Any]): Options for yt_dlp.YoutubeDL used by
+                the download, hooks and logger are removed
+            max_workers (int, optional): Number of concurrent validations.
+                Defaults to AppConst.PREFLIGHT_WORKERS.
+        """
+        # Hooks and the logger update the GUI so are not thread safe
+        self.ydl_opts = {key: value for key, value in ydl_opts.items()
+                         if not key.endswith("_hooks") and key != "logger"}
+        self.ydl_opts["quiet"] = True
+        self.ydl_opts["verbose"] = False
+        self.ydl_opts["no_warnings"] = True
+        self.local = threading.local()
+        self.ydl_list = []
+        self.ydl_list_lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.error_classes = [(status, re.compile(regex)) for status, regex
+                              in AppConst.PREFLIGHT_ERROR_CLASSES]
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="preflight")
+
+    def submit(self, url: str) -> Future[PreflightResult]:
+        """Queues a URL for validation
+
+        Args:
+            url (str): URL to validate
+
+        Returns:
+            Future[PreflightResult]: Future for the result
+        """
+        return self.executor.submit(self.validate, url)
+
+    def cancel(self) -> None:
+        """Stops validations that have not yet started
+        """
+        self.cancel_event.set()
+
+    def shutdown(self) -> None:
+        """Shuts down worker threads, discarding queued validations
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.local = threading.local()
+        with self.ydl_list_lock:
+            for ydl in self.ydl_list:
+                ydl.close()
+            self.ydl_list = []
+
+    def get_ydl(self) -> "YoutubeDL":
+        """Returns the YoutubeDL instance for the calling worker thread
+
+        Returns:
+            YoutubeDL: YoutubeDL instance owned by this thread
+        """
+        ydl = getattr(self.local, "ydl", None)
+        if ydl is None:
+            # pylint: disable-next=import-outside-toplevel
+            from yt_dlp import YoutubeDL
+            ydl = YoutubeDL(self.ydl_opts)
+            self.local.ydl = ydl
+            with self.ydl_list_lock:
+                self.ydl_list.append(ydl)
+        return ydl
+
+    def classify_error(self, error: Exception) -> str:
+        """Returns the result class for an extraction error
+
+        Args:
+            error (Exception): Exception raised by extract_info()
+
+        Returns:
+            str: One of the AppConst.PREFLIGHT_* result classes
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from yt_dlp import utils
+        cause = error.exc_info[1] \
+            if isinstance(error, utils.DownloadError) and error.exc_info \
+            else error
+        if isinstance(cause, utils.GeoRestrictedError):
+            return AppConst.PREFLIGHT_GEO
+        if isinstance(cause, utils.UnsupportedError):
+            return AppConst.PREFLIGHT_UNSUPPORTED
+        message = str(error)
+        for status, regex in self.error_classes:
+            if regex.search(message):
+                return status
+        return AppConst.PREFLIGHT_DEAD
+
+    def validate(self, url: str) -> PreflightResult:
+        """Validates a URL, called on a worker thread
+
+        Args:
+            url (str): URL to validate
+
+        Returns:
+            PreflightResult: Validation result
+        """
+        result = PreflightResult(url)
+        if self.cancel_event.is_set():
+            result.error = "Canceled"
+            return result
+        try:
+            self.extract(url, result)
+        # Any exception would otherwise be raised by Future.result() and
+        # abort the whole batch, so it only fails this URL
+        # pylint: disable-next=broad-exception-caught
+        except Exception as e:
+            result.status = AppConst.PREFLIGHT_DEAD
+            result.error = f"Unexpected error: {e!r}"
+            result.info = None
+            result.estimated_bytes = None
+        return result
+
+    def extract(self, url: str, result: PreflightResult) -> None:
+        """Extracts the metadata of a URL and fills in the result
+
+        Args:
+            url (str): URL to validate
+            result (PreflightResult): Result to fill in
+
+        Raises:
+            Exception: Any error other than an extraction error
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from yt_dlp import utils
+        ydl = self.get_ydl()
+        try:
+            with TRACER.span("validate_url", "validate", {"url": url}), \
+                    PROFILER.section(AppConst.PROFILE_SECTION_EXTRACT):
+                info = ydl.extract_info(url, download=False, process=False)
+        except (utils.DownloadError, utils.ExtractorError) as e:
+            result.status = self.classify_error(e)
+            result.error = str(e)
+            return
+        result.timestamp = time.monotonic()
+        if not isinstance(info, dict):
+            result.error = "Data error in ydl metadata"
+            return
+        result.estimated_bytes = self.estimate_bytes(ydl, info)
+        result.info = info
+        result.status = AppConst.PREFLIGHT_AVAILABLE
+
+    def estimate_bytes(self, ydl: "YoutubeDL",
+                       info: dict[str, Any]) -> Optional[int]:
+        """Estimates the download size of the formats that would be selected
+        with the download options
+
+        Args:
+            ydl (YoutubeDL): YoutubeDL instance of this thread
+            info (dict[str, Any]): Unprocessed metadata
+
+        Returns:
+            Optional[int]: Estimated bytes or None if unknown
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from yt_dlp import utils
+        # Redirects and playlists would need further extraction
+        if info.get("_type", "video") != "video":
+            return None
+        try:
+            # Format selection modifies the dict so work on a copy
+            with TRACER.span("estimate_size", "validate"), \
+                    PROFILER.section(AppConst.PROFILE_SECTION_EXTRACT):
+                selected = ydl.process_ie_result(copy.deepcopy(info),
+                                                 download=False)
+        except (utils.DownloadError, utils.ExtractorError):
+            return None
+        return estimate_info_bytes(selected)
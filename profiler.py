@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+
+"""profiler.py - Profiling of a session with cProfile or a sampling thread
+
+Enable with --profile. Both modes write a .pstats file for pstats or
+snakeviz and a .folded file of collapsed stacks for flamegraph.pl or
+speedscope. cProfile mode measures every call of the profiled threads,
+the sampling mode records the stacks of all threads periodically with
+much lower overhead. Profiling can be restricted to sections, download
+jobs or metadata extraction, which are marked with PROFILER.section().
+
+Before Python 3.12 a cProfile profiler only measures the thread that
+enabled it, so each thread gets its own. When profiling the whole session
+threads started after profiling are profiled too, threads that were
+already running are not. From 3.12 cProfile is built on the
+process wide sys.monitoring and only one profiler can be enabled at a time,
+so a single profiler is enabled while any thread is in a profiled section.
+It then measures all threads, including threads that are not in a
+profiled section, and calls of different threads are not told apart. Use
+the sampling mode for per thread results on 3.12 and later.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import sys
+import pstats
+import marshal
+import cProfile
+import threading
+import contextlib
+from types import CodeType, FrameType
+from typing import Any, Optional, Iterator
+from constants import AppConst
+
+# pstats function key, (file name, line number, function name)
+FuncKey = tuple[str, int, str]
+# True if cProfile profiles all threads with a single profiler
+SHARED_CPROFILE = sys.version_info >= (3, 12)
+# Key of the single profiler in SessionProfiler.profiles
+SHARED_PROFILE_KEY = 0
+
+
+class SessionProfiler:
+    """Profiles the whole session or only the sections selected
+    """
+    # True while profiling
+    enabled: bool
+    # AppConst.PROFILE_MODE_CPROFILE or AppConst.PROFILE_MODE_SAMPLE
+    mode: str
+    # Sections profiled, empty to profile the whole session
+    sections: set[str]
+    # Output path without .pstats and .folded extensions
+    output_prefix: str
+    # Protects profiles and section_depths
+    lock: threading.Lock
+    # cProfile mode, profile of each thread, or a single profile under
+    # SHARED_PROFILE_KEY if SHARED_CPROFILE
+    profiles: dict[int, cProfile.Profile]
+    # cProfile mode, profiles of threads started while profiling the whole
+    # session, kept separately as thread IDs are reused
+    thread_profiles: list[cProfile.Profile]
+    # Number of selected sections each thread is in
+    section_depths: dict[int, int]
+    # Sampling mode, number of samples of each (thread name, stack) where
+    # stack is a tuple of code objects from outermost to innermost
+    samples: dict[tuple[str, tuple[CodeType, ...]], int]
+    sample_count: int
+    sampler: Optional[threading.Thread]
+    stop_event: threading.Event
+
+    def __init__(self) -> None:
+        """Initializer for SessionProfiler
+        """
+        self.enabled = False
+        self.mode = AppConst.PROFILE_MODE_CPROFILE
+        self.sections = set()
+        self.output_prefix = ""
+        self.lock = threading.Lock()
+        self.profiles = {}
+        self.thread_profiles = []
+        self.section_depths = {}
+        self.samples = {}
+        self.sample_count = 0
+        self.sampler = None
+        self.stop_event = threading.Event()
+
+    def start(self, output_prefix: str, mode: str,
+              section: str = AppConst.PROFILE_SECTION_ALL) -> None:
+        """Starts profiling
+
+        Args:
+            output_prefix (str): Output path without extension
+            mode (str): AppConst.PROFILE_MODE_CPROFILE or
+                AppConst.PROFILE_MODE_SAMPLE
+            section (str, optional): Section to profile.
+                Defaults to AppConst.PROFILE_SECTION_ALL.
+        """
+        self.output_prefix = os.path.abspath(output_prefix)
+        self.mode = mode
+        self.sections = set() if section == AppConst.PROFILE_SECTION_ALL \
+            else {section}
+        self.profiles = {}
+        self.thread_profiles = []
+        self.section_depths = {}
+        self.samples = {}
+        self.sample_count = 0
+        self.enabled = True
+        if self.mode == AppConst.PROFILE_MODE_SAMPLE:
+            self.stop_event.clear()
+            self.sampler = threading.Thread(target=self.run_sampler,
+                                            name="profiler", daemon=True)
+            self.sampler.start()
+        elif not self.sections:
+            # Profile the thread running the session
+            self.enter_section()
+            if not SHARED_CPROFILE:
+                # And threads started later, such as worker pools
+                threading.setprofile(self.profile_new_thread)
+
+    def stop(self) -> list[str]:
+        """Stops profiling and writes the output files
+
+        Returns:
+            list[str]: Paths of files written, empty if writing failed
+        """
+        if not self.enabled:
+            return []
+        self.enabled = False
+        threading.setprofile(None)  # type: ignore[arg-type]
+        if self.sampler is not None:
+            self.stop_event.set()
+            self.sampler.join()
+            self.sampler = None
+        with self.lock:
+            for profile in self.profiles.values():
+                profile.disable()
+            for profile in self.thread_profiles:
+                profile.disable()
+        if self.mode == AppConst.PROFILE_MODE_SAMPLE:
+            stats = self.sample_stats()
+            folded = self.sample_folded()
+        else:
+            stats = self.cprofile_stats()
+            folded = self.cprofile_folded(stats)
+        paths = [self.output_prefix + ".pstats",
+                 self.output_prefix + ".folded"]
+        self.profiles = {}
+        self.thread_profiles = []
+        self.samples = {}
+        try:
+            with open(paths[0], 'wb') as f:
+                marshal.dump(stats, f)
+            with open(paths[1], 'w', encoding="utf-8") as f:
+                f.writelines(f"{stack} {count}\n"
+                             for stack, count in sorted(folded.items()))
+        except OSError:
+            return []
+        return paths
+
+    @contextlib.contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Context manager marking a section of a thread, which is
+        profiled if it was selected
+
+        Args:
+            name (str): AppConst.PROFILE_SECTION_DOWNLOAD or
+                AppConst.PROFILE_SECTION_EXTRACT
+        """
+        if not self.enabled or name not in self.sections:
+            yield
+            return
+        self.enter_section()
+        try:
+            yield
+        finally:
+            self.leave_section()
+
+    def enter_section(self) -> None:
+        """Starts profiling the current thread
+        """
+        thread_id = threading.get_ident()
+        with self.lock:
+            depth = self.section_depths.get(thread_id, 0)
+            self.section_depths[thread_id] = depth + 1
+            if depth or self.mode != AppConst.PROFILE_MODE_CPROFILE:
+                return
+            if SHARED_CPROFILE:
+                # Enabling a second profiler would raise ValueError, the
+                # first thread to enter a section enables the only one
+                if len(self.section_depths) == 1:
+                    self.shared_profile().enable()
+                return
+            profile = self.profiles.get(thread_id)
+            if profile is None:
+                profile = self.profiles[thread_id] = cProfile.Profile()
+        profile.enable()
+
+    def leave_section(self) -> None:
+        """Stops profiling the current thread
+        """
+        thread_id = threading.get_ident()
+        with self.lock:
+            depth = self.section_depths.get(thread_id, 0) - 1
+            if depth > 0:
+                self.section_depths[thread_id] = depth
+                return
+            self.section_depths.pop(thread_id, None)
+            if self.mode != AppConst.PROFILE_MODE_CPROFILE:
+                return
+            if SHARED_CPROFILE:
+                # The last thread to leave a section disables it
+                if not self.section_depths:
+                    self.shared_profile().disable()
+                return
+            profile = self.profiles.get(thread_id)
+        if profile is not None:
+            profile.disable()
+
+    def profile_new_thread(self, _frame: FrameType, _event: str,
+                           _arg: Any) -> None:
+        """Profile function installed in threads started while profiling
+        the whole session, replaces itself with a cProfile profiler for the
+        thread on the first call
+
+        Args:
+            _frame (FrameType): Current frame
+            _event (str): Profile event
+            _arg (Any): Event argument
+        """
+        sys.setprofile(None)
+        if not self.enabled:
+            return
+        profile = cProfile.Profile()
+        with self.lock:
+            self.thread_profiles.append(profile)
+        profile.enable()
+
+    def shared_profile(self) -> cProfile.Profile:
+        """Returns the profiler of all threads if SHARED_CPROFILE. Call
+        with lock held.
+
+        Returns:
+            cProfile.Profile: Profiler
+        """
+        profile = self.profiles.get(SHARED_PROFILE_KEY)
+        if profile is None:
+            profile = self.profiles[SHARED_PROFILE_KEY] = cProfile.Profile()
+        return profile
+
+    def run_sampler(self) -> None:
+        """Thread function, records the stacks of the profiled threads
+        """
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(AppConst.PROFILE_SAMPLE_INTERVAL):
+            names = {thread.ident: thread.name
+                     for thread in threading.enumerate()}
+            # pylint: disable-next=protected-access
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (
+                        self.sections
+                        and thread_id not in self.section_depths):
+                    continue
+                key = (names.get(thread_id, str(thread_id)),
+                       frame_stack(frame))
+                self.samples[key] = self.samples.get(key, 0) + 1
+            self.sample_count += 1
+
+    def cprofile_stats(self) -> dict[FuncKey, Any]:
+        """Returns the combined stats of all profiled threads
+
+        Returns:
+            dict[FuncKey, Any]: pstats dict
+        """
+        profiles = list(self.profiles.values()) + self.thread_profiles
+        if not profiles:
+            return {}
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats.stats  # type: ignore[attr-defined]
+
+    @staticmethod
+    def cprofile_folded(stats: dict[FuncKey, Any]) -> dict[str, int]:
+        """Returns collapsed caller;function pairs weighted by the
+        microseconds spent in the function when called from that caller.
+        cProfile records no deeper stacks, use the sampling mode for full
+        stacks.
+
+        Args:
+            stats (dict[FuncKey, Any]): pstats dict
+
+        Returns:
+            dict[str, int]: Collapsed stack to weight
+        """
+        folded: dict[str, int] = {}
+        for func, (_, _, self_time, _, callers) in stats.items():
+            name = func_label(func)
+            if not callers:
+                folded[name] = folded.get(name, 0) + int(self_time * 1e6)
+            for caller, caller_stats in callers.items():
+                stack = func_label(caller) + ";" + name
+                folded[stack] = folded.get(stack, 0) \
+                    + int(caller_stats[2] * 1e6)
+        return {stack: weight for stack, weight in folded.items()
+                if weight > 0}
+
+    def sample_folded(self) -> dict[str, int]:
+        """Returns the collapsed stacks of the samples
+
+        Returns:
+            dict[str, int]: Collapsed stack to number of samples
+        """
+        folded: dict[str, int] = {}
+        for (thread_name, stack), count in self.samples.items():
+            key = ";".join([thread_name]
+                           + [func_label(code_key(code)) for code in stack])
+            folded[key] = folded.get(key, 0) + count
+        return folded
+
+    def sample_stats(self) -> dict[FuncKey, Any]:
+        """Returns a pstats dict estimated from the samples, call counts
+        are sample counts and times are samples times the interval
+
+        Returns:
+            dict[FuncKey, Any]: pstats dict
+        """
+        interval = AppConst.PROFILE_SAMPLE_INTERVAL
+        self_counts: dict[FuncKey, int] = {}
+        total_counts: dict[FuncKey, int] = {}
+        callers: dict[FuncKey, dict[FuncKey, int]] = {}
+        for (_, stack), count in self.samples.items():
+            funcs = [code_key(code) for code in stack]
+            if not funcs:
+                continue
+            self_counts[funcs[-1]] = self_counts.get(funcs[-1], 0) + count
+            # Recursive functions only count once per sample
+            for func in set(funcs):
+                total_counts[func] = total_counts.get(func, 0) + count
+            for caller, func in set(zip(funcs, funcs[1:])):
+                func_callers = callers.setdefault(func, {})
+                func_callers[caller] = func_callers.get(caller, 0) + count
+        stats: dict[FuncKey, Any] = {}
+        for func, count in total_counts.items():
+            self_time = self_counts.get(func, 0) * interval
+            stats[func] = (count, count, self_time, count * interval, {
+                caller: (calls, calls, 0.0, calls * interval)
+                for caller, calls in callers.get(func, {}).items()})
+        return stats
+
+
+def frame_stack(frame: Optional[FrameType]) -> tuple[CodeType, ...]:
+    """Returns the code objects of a stack from outermost to innermost
+
+    Args:
+        frame (Optional[FrameType]): Innermost frame
+
+    Returns:
+        tuple[CodeType, ...]: Code objects
+    """
+    codes: list[CodeType] = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    return tuple(codes)
+
+
+def code_key(code: CodeType) -> FuncKey:
+    """Returns the pstats key of a code object
+
+    Args:
+        code (CodeType): Code object
+
+    Returns:
+        FuncKey: (file name, line number, function name)
+    """
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def func_label(func: FuncKey) -> str:
+    """Returns a short function name for collapsed stacks
+
+    Args:
+        func (FuncKey): pstats function key
+
+    Returns:
+        str: Name such as "main_window.py:download_url_list"
+    """
+    file_name, _, name = func
+    if file_name == "~":
+        # Builtin function
+        return name.replace(";", ",")
+    return f"{os.path.basename(file_name)}:{name}".replace(";", ",")
+
+
+# Profiler shared by all modules
+PROFILER = SessionProfiler()
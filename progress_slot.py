@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+"""progress_slot.py - Latest value slot for download progress
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+from typing import Any, Optional
+
+
+class ProgressSlot:
+    """Holds the most recent progress of a download job. The writer only
+    replaces a reference, which is atomic in Python, so no lock is needed
+    and intermediate values are coalesced when the reader is slower than
+    the writer. Changes are detected with a counter rather than by
+    identity, as fragmented downloads publish the same dict each time with
+    its values changed in place.
+    """
+    __slots__ = ("latest", "version", "rendered_version")
+    # Most recently published progress dict from yt_dlp
+    latest: Optional[dict[str, Any]]
+    # Number of publish() calls
+    version: int
+    # Value of version when take() last returned progress
+    rendered_version: int
+
+    def __init__(self) -> None:
+        """Initializer for ProgressSlot
+        """
+        self.latest = None
+        self.version = 0
+        self.rendered_version = 0
+
+    def publish(self, progress_dict: dict[str, Any]) -> None:
+        """Stores progress, replacing any value not yet taken
+
+        Args:
+            progress_dict (dict[str, Any]): Progress dict from yt_dlp
+        """
+        self.latest = progress_dict
+        self.version += 1
+
+    def take(self) -> Optional[dict[str, Any]]:
+        """Returns the latest progress if it changed since the last call
+
+        Returns:
+            Optional[dict[str, Any]]: Progress dict or None if unchanged
+        """
+        version = self.version
+        if version == self.rendered_version:
+            return None
+        self.rendered_version = version
+        return self.latest
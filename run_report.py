@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+"""run_report.py - JSON and CSV report of the URLs of a download batch
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import csv
+import json
+import time
+from typing import Any, Optional, TextIO
+from constants import AppConst
+from tracer import TRACER
+
+
+class ReportPhase:
+    """Phases of a URL that are timed separately
+    """
+    EXTRACT = 0
+    DOWNLOAD = 1
+    POSTPROCESS = 2
+    # Names of the phases in traces
+    NAMES = ["extract", "download", "postprocess"]
+
+
+class UrlReport:
+    """Report of a single URL
+    """
+    __slots__ = ("url", "extractor", "format_id", "bytes", "retries",
+                 "status", "error", "phase_seconds", "phase",
+                 "phase_time")
+    url: str
+    extractor: str
+    format_id: str
+    bytes: int
+    retries: int
+    # Final status, a JobStatus.NAMES value or
+    # AppConst.REPORT_STATUS_INVALID
+    status: str
+    error: str
+    # Seconds spent in each ReportPhase
+    phase_seconds: list[float]
+    # Current ReportPhase and time.perf_counter() it started
+    phase: int
+    phase_time: float
+
+    def __init__(self, url: str) -> None:
+        """Initializer for UrlReport, starts timing the extract phase
+
+        Args:
+            url (str): URL
+        """
+        self.url = url
+        self.extractor = ""
+        self.format_id = ""
+        self.bytes = 0
+        self.retries = 0
+        self.status = ""
+        self.error = ""
+        self.phase_seconds = [0.0, 0.0, 0.0]
+        self.phase = ReportPhase.EXTRACT
+        self.phase_time = time.perf_counter()
+
+    def set_phase(self, phase: int) -> None:
+        """Ends the current phase and starts timing another
+
+        Args:
+            phase (int): ReportPhase value
+        """
+        if TRACER.enabled:
+            TRACER.complete(ReportPhase.NAMES[self.phase], "stage",
+                            self.phase_time, {"url": self.url})
+        now = time.perf_counter()
+        self.phase_seconds[self.phase] += now - self.phase_time
+        self.phase = phase
+        self.phase_time = now
+
+    def set_info(self, info: dict[str, Any]) -> None:
+        """Takes the extractor and format from metadata
+
+        Args:
+            info (dict[str, Any]): Metadata of the URL
+        """
+        self.extractor = str(info.get("extractor_key")
+                             or info.get("extractor") or self.extractor)
+        self.format_id = str(info.get("format_id") or self.format_id)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the report as a dict with the REPORT_FIELDS keys
+
+        Returns:
+            dict[str, Any]: Report fields
+        """
+        total = sum(self.phase_seconds)
+        download_seconds = self.phase_seconds[ReportPhase.DOWNLOAD]
+        return {
+            "url": self.url,
+            "status": self.status,
+            "extractor": self.extractor,
+            "format_id": self.format_id,
+            "bytes": self.bytes,
+            "extract_seconds": round(
+                self.phase_seconds[ReportPhase.EXTRACT], 3),
+            "download_seconds": round(download_seconds, 3),
+            "postprocess_seconds": round(
+                self.phase_seconds[ReportPhase.POSTPROCESS], 3),
+            "total_seconds": round(total, 3),
+            "bytes_per_second": int(self.bytes / download_seconds)
+            if download_seconds > 0 else 0,
+            "retries": self.retries,
+            "error": self.error}
+
+
+class RunReport:
+    """Writes a line to a JSON and a CSV report file as each URL of a batch
+    finishes, so reports of large batches use no memory and survive a
+    crash up to the last URL.
+    """
+    # Directory reports are written to
+    directory: str
+    # True to delete old reports beyond AppConst.REPORT_MAX_BATCHES
+    prune: bool
+    # Path of the reports of the current batch without extension
+    base_path: str
+    json_file: Optional[TextIO]
+    csv_file: Optional[TextIO]
+    csv_writer: Any
+    # Number of URLs written with each status
+    status_counts: dict[str, int]
+
+    def __init__(self, directory: str, prune: bool = False) -> None:
+        """Initializer for RunReport
+
+        Args:
+            directory (str): Directory reports are written to
+            prune (bool, optional): True to delete old reports beyond
+                AppConst.REPORT_MAX_BATCHES. Defaults to False.
+        """
+        self.directory = directory
+        self.prune = prune
+        self.base_path = ""
+        self.json_file = None
+        self.csv_file = None
+        self.csv_writer = None
+        self.status_counts = {}
+
+    def start_batch(self) -> bool:
+        """Creates the report files of a new batch
+
+        Returns:
+            bool: True if the files could be created
+        """
+        self.finish_batch()
+        if not self.directory:
+            return False
+        started = time.time()
+        self.base_path = os.path.join(
+            self.directory, AppConst.REPORT_FILE_PREFIX + time.strftime(
+                "%Y%m%d-%H%M%S", time.localtime(started)))
+        # Batches started within the same second get a suffix
+        suffix = 1
+        base_path = self.base_path
+        while os.path.exists(base_path + ".json"):
+            suffix += 1
+            base_path = f"{self.base_path}-{suffix}"
+        self.base_path = base_path
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.json_file = open(self.base_path + ".json", 'w',
+                                  encoding="utf-8")
+            self.csv_file = open(self.base_path + ".csv", 'w',
+                                 encoding="utf-8", newline="")
+        except OSError:
+            self.close()
+            return False
+        self.csv_writer = csv.DictWriter(self.csv_file,
+                                         fieldnames=AppConst.REPORT_FIELDS)
+        self.status_counts = {}
+        try:
+            self.csv_writer.writeheader()
+            self.json_file.write('{"started": '
+                                 + json.dumps(time_string(started))
+                                 + ',\n "urls": [')
+        except OSError:
+            self.close()
+            return False
+        return True
+
+    def finish_url(self, report: UrlReport, status: str,
+                   error: Optional[str] = None) -> None:
+        """Ends timing a URL and writes its report
+
+        Args:
+            report (UrlReport): Report of the URL
+            status (str): Final status
+            error (Optional[str], optional): Error message. Defaults to None.
+        """
+        report.set_phase(report.phase)
+        report.status = status
+        report.error = error or ""
+        self.write_url(report.to_dict())
+
+    def add_url(self, url: str, status: str,
+                error: Optional[str] = None) -> None:
+        """Writes the report of a URL that was not downloaded
+
+        Args:
+            url (str): URL
+            status (str): Reason the URL was not downloaded
+            error (Optional[str], optional): Error message. Defaults to None.
+        """
+        report = UrlReport(url)
+        report.status = status
+        report.error = error or ""
+        self.write_url(report.to_dict())
+
+    def write_url(self, fields: dict[str, Any]) -> None:
+        """Writes the report of a URL to both files
+
+        Args:
+            fields (dict[str, Any]): Report fields
+        """
+        status = fields["status"]
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if self.json_file is None or self.csv_file is None:
+            return
+        try:
+            separator = "\n  " if sum(self.status_counts.values()) == 1 \
+                else ",\n  "
+            self.json_file.write(separator + json.dumps(fields))
+            self.csv_writer.writerow(fields)
+        except OSError:
+            self.close()
+
+    def finish_batch(self) -> Optional[str]:
+        """Writes the summary and closes the report files
+
+        Returns:
+            Optional[str]: Path of the reports without extension or None if
+                no reports were written
+        """
+        if self.json_file is None:
+            return None
+        try:
+            self.json_file.write('\n ],\n "finished": '
+                                 + json.dumps(time_string(time.time()))
+                                 + ',\n "status_counts": '
+                                 + json.dumps(self.status_counts) + "}\n")
+        except OSError:
+            self.close()
+            return None
+        self.close()
+        if self.prune:
+            self.prune_reports()
+        return self.base_path
+
+    def close(self) -> None:
+        """Closes the report files
+        """
+        for file in [self.json_file, self.csv_file]:
+            if file is not None:
+                try:
+                    file.close()
+                except OSError:
+                    pass
+        self.json_file = None
+        self.csv_file = None
+        self.csv_writer = None
+
+    def prune_reports(self) -> None:
+        """Deletes the oldest reports beyond AppConst.REPORT_MAX_BATCHES
+        """
+        try:
+            names = sorted(name for name in os.listdir(self.directory)
+                           if name.startswith(AppConst.REPORT_FILE_PREFIX)
+                           and name.endswith(".json"))
+            for name in names[:-AppConst.REPORT_MAX_BATCHES]:
+                base_path = os.path.join(self.directory, name[:-5])
+                for extension in [".json", ".csv"]:
+                    if os.path.exists(base_path + extension):
+                        os.remove(base_path + extension)
+        except OSError:
+            pass
+
+
+def time_string(timestamp: float) -> str:
+    """Returns a local ISO 8601 time string
+
+    Args:
+        timestamp (float): time.time() value
+
+    Returns:
+        str: Time string such as "2024-05-01T13:45:10"
+    """
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(timestamp))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""startup_report.py - Timings of the phases of program startup
+
+video_download.py imports this module first so the times include importing
+Qt and the application modules, but not starting the Python interpreter. It
+only imports the standard library so it does not import Qt itself.
+Marking a phase only appends a timestamp, so phases are always recorded and
+--startup-report only decides whether they are printed.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import time
+
+
+class StartupReport:
+    """Records the end time of each startup phase
+    """
+    # Phase ending when the window is shown and the message loop runs
+    PHASE_SHOW_WINDOW = "show window"
+    # Phase ending when the first download starts
+    PHASE_FIRST_DOWNLOAD = "start first download"
+    # time.perf_counter() when this module was imported
+    start: float
+    # Phase name and time.perf_counter() at its end, in order
+    phases: list[tuple[str, float]]
+
+    def __init__(self) -> None:
+        """Initializer for StartupReport
+        """
+        self.start = time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase: str) -> bool:
+        """Records the end of a phase, which started at the end of the
+        previous phase. Phases already recorded are ignored, as MainWindow
+        imports video_download.py for its version which runs its imports
+        again when it is the main script.
+
+        Args:
+            phase (str): Phase name
+
+        Returns:
+            bool: True if the phase was recorded
+        """
+        if self.elapsed(phase):
+            return False
+        self.phases.append((phase, time.perf_counter()))
+        return True
+
+    def elapsed(self, phase: str) -> float:
+        """Returns the time from startup to the end of a phase
+
+        Args:
+            phase (str): Phase name
+
+        Returns:
+            float: Seconds, 0 if the phase was not marked
+        """
+        for name, end in self.phases:
+            if name == phase:
+                return end - self.start
+        return 0.0
+
+    def to_lines(self, budget_ms: int, background_seconds: float = 0.0,
+                 background_end: float = 0.0) -> list[str]:
+        """Creates the report of the phases marked so far
+
+        Args:
+            budget_ms (int): Target time to window in milliseconds
+            background_seconds (float, optional): Seconds the background
+                import of yt_dlp took, 0 if it did not run. Defaults to 0.0.
+            background_end (float, optional): time.perf_counter() when the
+                background import finished. Defaults to 0.0.
+
+        Returns:
+            list[str]: Report lines
+        """
+        lines = [f"{'Startup phase':<36}{'ms':>8}{'total ms':>10}"]
+        previous = self.start
+        for phase, end in self.phases:
+            lines.append(f"{phase:<36}{(end - previous) * 1000:>8,.0f}"
+                         f"{(end - self.start) * 1000:>10,.0f}")
+            previous = end
+        elapsed = self.elapsed(self.PHASE_SHOW_WINDOW)
+        lines.append(f"Time to window {elapsed * 1000:,.0f} ms, budget "
+                     f"{budget_ms:,} ms: "
+                     + ("within budget" if elapsed * 1000 <= budget_ms
+                        else "OVER BUDGET"))
+        if background_seconds:
+            lines.append(f"yt_dlp imported in the background in "
+                         f"{background_seconds * 1000:,.0f} ms, ready "
+                         f"{(background_end - self.start) * 1000:,.0f} ms "
+                         "after startup")
+        return lines
+
+
+# Phases of this run, marked by video_download.py and MainWindow
+STARTUP = StartupReport()
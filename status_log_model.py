@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+"""status_log_model.py - Bounded list model of status window lines
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import logging
+from typing import Any, Optional
+from overrides import override
+from PySide6.QtCore import Qt, QObject, QAbstractListModel
+from PySide6.QtCore import QSortFilterProxyModel, QModelIndex
+from PySide6.QtCore import QPersistentModelIndex
+from constants import AppConst
+
+# Item data role returning the LogLine of a row
+LINE_ROLE = Qt.ItemDataRole.UserRole
+
+
+class LogLine:
+    """A single line of the status window
+    """
+    __slots__ = ("text", "level", "job", "links", "header")
+    # Text without line breaks
+    text: str
+    # logging module level
+    level: int
+    # Id of the download job that was active or -1
+    job: int
+    # (start, end, href) of links in text or None
+    links: Optional[tuple[tuple[int, int, str], ...]]
+    # Displayed as a table header
+    header: bool
+
+    def __init__(self, text: str, level: int = logging.INFO, job: int = -1,
+                 links: Optional[tuple[tuple[int, int, str], ...]] = None,
+                 header: bool = False) -> None:
+        """Initializer for LogLine
+
+        Args:
+            text (str): Text without line breaks
+            level (int, optional): logging module level.
+                Defaults to logging.INFO.
+            job (int, optional): Id of the active download job.
+                Defaults to -1.
+            links (Optional[tuple[tuple[int, int, str], ...]], optional):
+                (start, end, href) of links in text. Defaults to None.
+            header (bool, optional): Display as a table header.
+                Defaults to False.
+        """
+        self.text = text
+        self.level = level
+        self.job = job
+        self.links = links
+        self.header = header
+
+
+class StatusLogModel(QAbstractListModel):
+    """List model keeping the most recent lines in a ring buffer so memory
+    and the cost of appending stay constant however long the program runs
+    """
+    # Ring buffer of lines
+    lines: list[Optional[LogLine]]
+    # Maximum number of lines kept
+    capacity: int
+    # Index in lines of the first row
+    start: int
+    # Number of rows
+    count: int
+    # Length of the longest line appended, used for the view width
+    max_length: int
+
+    def __init__(self, capacity: int = AppConst.STATUS_LOG_MAX_LINES,
+                 parent: Optional[QObject] = None) -> None:
+        """Initializer for StatusLogModel
+
+        Args:
+            capacity (int, optional): Maximum number of lines kept.
+                Defaults to AppConst.STATUS_LOG_MAX_LINES.
+            parent (Optional[QObject], optional): Parent object.
+                Defaults to None.
+        """
+        super().__init__(parent)
+        self.capacity = max(capacity, 1)
+        self.lines = [None] * self.capacity
+        self.start = 0
+        self.count = 0
+        self.max_length = 0
+
+    @override
+    def rowCount(self, parent: QModelIndex | QPersistentModelIndex
+                 = QModelIndex()) -> int:
+        """Override of rowCount
+
+        Args:
+            parent (QModelIndex | QPersistentModelIndex, optional): Parent
+                index. Defaults to QModelIndex().
+
+        Returns:
+            int: Number of rows
+        """
+        return 0 if parent.isValid() else self.count
+
+    @override
+    def data(self, index: QModelIndex | QPersistentModelIndex,
+             role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        """Override of data
+
+        Args:
+            index (QModelIndex | QPersistentModelIndex): Item index
+            role (int, optional): Data role.
+                Defaults to Qt.ItemDataRole.DisplayRole.
+
+        Returns:
+            Any: Line text for DisplayRole, LogLine for LINE_ROLE
+        """
+        if not index.isValid() or index.row() >= self.count:
+            return None
+        line = self.line(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            return line.text
+        if role == LINE_ROLE:
+            return line
+        return None
+
+    def line(self, row: int) -> LogLine:
+        """Returns the line of a row
+
+        Args:
+            row (int): Row number
+
+        Returns:
+            LogLine: Line
+        """
+        line = self.lines[(self.start + row) % self.capacity]
+        assert line is not None
+        return line
+
+    def append_lines(self, lines: list[LogLine]) -> None:
+        """Appends lines, removing the oldest lines when full
+
+        Args:
+            lines (list[LogLine]): Lines to append
+        """
+        if not lines:
+            return
+        lines = lines[-self.capacity:]
+        overflow = self.count + len(lines) - self.capacity
+        if overflow > 0:
+            # Remove a chunk at once so views update rarely
+            self.remove_first(min(max(overflow, self.capacity
+                                      // AppConst.STATUS_LOG_TRIM_DIVISOR),
+                                  self.count))
+        self.beginInsertRows(QModelIndex(), self.count,
+                             self.count + len(lines) - 1)
+        for line in lines:
+            self.lines[(self.start + self.count) % self.capacity] = line
+            self.count += 1
+            if len(line.text) > self.max_length:
+                self.max_length = len(line.text)
+        self.endInsertRows()
+
+    def remove_first(self, count: int) -> None:
+        """Removes the oldest lines
+
+        Args:
+            count (int): Number of lines to remove
+        """
+        if count <= 0:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        for row in range(count):
+            self.lines[(self.start + row) % self.capacity] = None
+        self.start = (self.start + count) % self.capacity
+        self.count -= count
+        self.endRemoveRows()
+
+    def clear(self) -> None:
+        """Removes all lines
+        """
+        self.beginResetModel()
+        self.lines = [None] * self.capacity
+        self.start = 0
+        self.count = 0
+        self.max_length = 0
+        self.endResetModel()
+
+
+class StatusLogFilter(QSortFilterProxyModel):
+    """Proxy model showing lines with a minimum level or of a single job
+    """
+    # Minimum logging module level shown
+    min_level: int
+    # Job id shown or -1 for all jobs
+    job: int
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        """Initializer for StatusLogFilter
+
+        Args:
+            parent (Optional[QObject], optional): Parent object.
+                Defaults to None.
+        """
+        super().__init__(parent)
+        self.min_level = logging.NOTSET
+        self.job = -1
+
+    def is_active(self) -> bool:
+        """Returns True if the filter hides any lines
+
+        Returns:
+            bool: True if filtering
+        """
+        return self.min_level > logging.NOTSET or self.job >= 0
+
+    def set_filter(self, min_level: int, job: int) -> None:
+        """Changes the lines shown
+
+        Args:
+            min_level (int): Minimum logging module level shown
+            job (int): Job id shown or -1 for all jobs
+        """
+        self.min_level = min_level
+        self.job = job
+        self.invalidateFilter()
+
+    @override
+    def filterAcceptsRow(self, source_row: int,
+                         source_parent: QModelIndex |
+                         QPersistentModelIndex) -> bool:
+        """Override of filterAcceptsRow
+
+        Args:
+            source_row (int): Row in the source model
+            source_parent (QModelIndex | QPersistentModelIndex): Parent
+                index in the source model
+
+        Returns:
+            bool: True if the row is shown
+        """
+        model = self.sourceModel()
+        assert isinstance(model, StatusLogModel)
+        line = model.line(source_row)
+        return line.level >= self.min_level \
+            and (self.job < 0 or line.job == self.job)
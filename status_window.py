@@ -1,28 +1,153 @@
 #!/usr/bin/env python3
 
-"""status_widow.py - Subclass of QTextEdit with additional features
+"""status_widow.py - Subclass of QListView showing the status log
 """
 
 __author__ = "Josh Buchbinder"
 __copyright__ = "Copyright 2024, Josh Buchbinder"
 
 import re
-from typing import cast
+import logging
+from typing import Optional, cast
 from collections.abc import Callable
 from overrides import override
-from PySide6.QtCore import Qt, QEvent
-from PySide6.QtGui import QFont, QTextCursor, QMouseEvent, QHelpEvent
-from PySide6.QtWidgets import QTextEdit, QToolTip
+from PySide6.QtCore import Qt, QEvent, QPoint, QSize, QModelIndex
+from PySide6.QtCore import QPersistentModelIndex
+from PySide6.QtGui import QFont, QFontMetrics, QMouseEvent, QHelpEvent
+from PySide6.QtGui import QKeyEvent, QKeySequence, QPainter, QColor
+from PySide6.QtGui import QWheelEvent
+from PySide6.QtWidgets import QListView, QToolTip, QStyledItemDelegate
+from PySide6.QtWidgets import QStyleOptionViewItem, QStyle, QApplication
+from PySide6.QtWidgets import QAbstractItemView
 from constants import AppConst, LinkIds, StringMaps
+from doc_table import DocTable
+from status_log_model import LogLine, StatusLogModel, StatusLogFilter
+from status_log_model import LINE_ROLE
 
+# Pixels between the item edge and the text
+TEXT_MARGIN = 3
 
-class StatusWindow(QTextEdit):
-    """Subclass of QTextEdit allowing clickable links
+
+class StatusLineDelegate(QStyledItemDelegate):
+    """Draws status lines with colors for levels and table headers and
+    underlined links
+    """
+    # Model providing the longest line length for the view width
+    log_model: StatusLogModel
+
+    def __init__(self, log_model: StatusLogModel) -> None:
+        """Initializer for StatusLineDelegate
+
+        Args:
+            log_model (StatusLogModel): Model of all lines
+        """
+        super().__init__()
+        self.log_model = log_model
+
+    @override
+    def sizeHint(self, option: QStyleOptionViewItem,
+                 index: QModelIndex | QPersistentModelIndex) -> QSize:
+        """Override of sizeHint, all lines have the width of the longest
+        line so the view can use uniform item sizes
+
+        Args:
+            option (QStyleOptionViewItem): Style options
+            index (QModelIndex | QPersistentModelIndex): Item index
+
+        Returns:
+            QSize: Item size
+        """
+        metrics = option.fontMetrics  # type: ignore[attr-defined]
+        # Allow for wider bold header characters
+        width = self.log_model.max_length \
+            * (metrics.horizontalAdvance("M") + 1) + 2 * TEXT_MARGIN
+        return QSize(width, metrics.height())
+
+    @override
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem,
+              index: QModelIndex | QPersistentModelIndex) -> None:
+        """Override of paint
+
+        Args:
+            painter (QPainter): Painter
+            option (QStyleOptionViewItem): Style options
+            index (QModelIndex | QPersistentModelIndex): Item index
+        """
+        line = index.data(LINE_ROLE)
+        if not isinstance(line, LogLine):
+            return
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""  # type: ignore[attr-defined]
+        widget = opt.widget  # type: ignore[attr-defined]
+        style = widget.style() if widget else QApplication.style()
+        # Draw background and selection
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, opt,
+                          painter, widget)
+        palette = opt.palette  # type: ignore[attr-defined]
+        rect = opt.rect  # type: ignore[attr-defined]
+        if opt.state & QStyle.StateFlag.State_Selected:  # type: ignore
+            color = palette.highlightedText().color()
+        elif line.header:
+            color = QColor.fromRgb(200, 100, 50)
+        elif line.level >= logging.ERROR:
+            color = QColor.fromRgb(200, 0, 0)
+        elif line.level >= logging.WARNING:
+            color = QColor.fromRgb(160, 100, 0)
+        elif line.level < logging.INFO:
+            color = QColor.fromRgb(110, 110, 110)
+        else:
+            color = palette.text().color()
+        painter.save()
+        font = QFont(opt.font)  # type: ignore[attr-defined]
+        if line.header:
+            font.setBold(True)
+        painter.setFont(font)
+        metrics = QFontMetrics(font)
+        x = rect.x() + TEXT_MARGIN
+        y = rect.y() + metrics.ascent()
+        text = line.text
+        if not line.links:
+            painter.setPen(color)
+            painter.drawText(QPoint(x, y), text)
+        else:
+            link_font = QFont(font)
+            link_font.setUnderline(True)
+            link_color = palette.link().color()
+            pos = 0
+            for start, end, _ in line.links:
+                if start > pos:
+                    painter.setFont(font)
+                    painter.setPen(color)
+                    painter.drawText(QPoint(x, y), text[pos:start])
+                    x += metrics.horizontalAdvance(text[pos:start])
+                painter.setFont(link_font)
+                painter.setPen(link_color)
+                painter.drawText(QPoint(x, y), text[start:end])
+                x += metrics.horizontalAdvance(text[start:end])
+                pos = end
+            if pos < len(text):
+                painter.setFont(font)
+                painter.setPen(color)
+                painter.drawText(QPoint(x, y), text[pos:])
+        painter.restore()
+
+
+class StatusWindow(QListView):
+    """Subclass of QListView showing a bounded log of status lines with
+    clickable links and filtering by level and job
     """
     anchor: str
     link_click_callback: Callable[[str], None]
     text_font: QFont
     autoscroll: bool
+    # All lines and the filter shown instead when active
+    log_model: StatusLogModel
+    log_filter: StatusLogFilter
+    # Id of the active download job added to new lines or -1
+    current_job: int
+    # Compiled AppConst.REGEX_COLORSTRIP
+    color_regex: re.Pattern[str]
 
     def __init__(self, link_click_callback: Callable[[str], None]) -> None:
         """Initializer for StatusWindow
@@ -39,13 +164,44 @@ class StatusWindow(QTextEdit):
         self.text_font.setStyleHint(QFont.StyleHint.TypeWriter)
         self.text_font.setWeight(QFont.Weight.Black)
         self.setFont(self.text_font)
-        # Set status text box to read only for status logs
-        self.setReadOnly(True)
-        # Set status window to not wrap text
-        self.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
-        # Set to accept rich text
-        self.setAcceptRichText(True)
+        self.log_model = StatusLogModel(parent=self)
+        self.log_filter = StatusLogFilter(self)
+        self.log_filter.setSourceModel(self.log_model)
+        self.setModel(self.log_model)
+        self.setItemDelegate(StatusLineDelegate(self.log_model))
+        # Only visible lines are laid out
+        self.setUniformItemSizes(True)
+        self.setHorizontalScrollMode(
+            QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setSelectionMode(
+            QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        # Track the mouse to show the link cursor
+        self.setMouseTracking(True)
         self.autoscroll = True
+        self.current_job = -1
+        self.color_regex = re.compile(AppConst.REGEX_COLORSTRIP)
+
+    def anchor_at(self, pos: QPoint) -> str:
+        """Returns the link at a position
+
+        Args:
+            pos (QPoint): Position in viewport coordinates
+
+        Returns:
+            str: Link or empty string if there is no link at pos
+        """
+        line = self.indexAt(pos).data(LINE_ROLE)
+        if not isinstance(line, LogLine) or not line.links:
+            return ""
+        rect = self.visualRect(self.indexAt(pos))
+        x = pos.x() - rect.x() - TEXT_MARGIN
+        metrics = QFontMetrics(self.font())
+        for start, end, href in line.links:
+            if metrics.horizontalAdvance(line.text[:start]) <= x \
+                    < metrics.horizontalAdvance(line.text[:end]):
+                return href
+        return ""
 
     @override
     def mouseMoveEvent(self, e: QMouseEvent) -> None:
@@ -54,11 +210,11 @@ class StatusWindow(QTextEdit):
         Args:
             e (QMouseEvent): Mouse event
         """
-        anchor = self.anchorAt(e.pos())
+        anchor = self.anchor_at(e.pos())
         if anchor:
             self.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
         else:
-            self.viewport().setCursor(Qt.CursorShape.IBeamCursor)
+            self.viewport().setCursor(Qt.CursorShape.ArrowCursor)
         super().mouseMoveEvent(e)
 
     @override
@@ -68,7 +224,7 @@ class StatusWindow(QTextEdit):
         Args:
             e (QMouseEvent): The mouse event
         """
-        self.anchor = self.anchorAt(e.pos())
+        self.anchor = self.anchor_at(e.pos())
         super().mousePressEvent(e)
 
     @override
@@ -79,15 +235,15 @@ class StatusWindow(QTextEdit):
             e (QMouseEvent): The mouse event
         """
         if self.anchor:
-            anchor = self.anchorAt(e.pos())
+            anchor = self.anchor_at(e.pos())
             if anchor == self.anchor:
                 self.link_click_callback(self.anchor)
                 self.anchor = ""
         super().mouseReleaseEvent(e)
 
     @override
-    def event(self, e: QEvent) -> bool:
-        """Override of event handler in parent class
+    def viewportEvent(self, e: QEvent) -> bool:
+        """Override of viewport event handler in parent class
 
         Args:
             e (QEvent): Event to handle
@@ -97,13 +253,42 @@ class StatusWindow(QTextEdit):
         """
         if e.type() == QEvent.Type.ToolTip:
             help_event = cast(QHelpEvent, e)
-            anchor = self.anchorAt(help_event.pos())
+            anchor = self.anchor_at(help_event.pos())
             if anchor:
                 QToolTip.showText(help_event.globalPos(),
                                   self.tooltip_from_anchor(anchor))
                 return True
 
-        return super().event(e)
+        return super().viewportEvent(e)
+
+    @override
+    def keyPressEvent(self, e: QKeyEvent) -> None:
+        """Override of keyPressEvent, copies selected lines
+
+        Args:
+            e (QKeyEvent): Key event
+        """
+        if e.matches(QKeySequence.StandardKey.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            QApplication.clipboard().setText(
+                "\n".join(self.model().index(row, 0).data() for row in rows))
+            return
+        super().keyPressEvent(e)
+
+    @override
+    def wheelEvent(self, e: QWheelEvent) -> None:
+        """Override of wheelEvent, zooms the text while ctrl is held
+
+        Args:
+            e (QWheelEvent): Wheel event
+        """
+        if e.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            font = self.font()
+            step = 1 if e.angleDelta().y() > 0 else -1
+            font.setPointSize(max(font.pointSize() + step, 4))
+            self.setFont(font)
+            return
+        super().wheelEvent(e)
 
     def tooltip_from_anchor(self, anchor: str) -> str:
         """Returns tooltip text for an anchor text
@@ -124,8 +309,7 @@ class StatusWindow(QTextEdit):
     def scroll_to_end(self) -> None:
         """Scrolls window to bottom of text
         """
-        self.verticalScrollBar().setValue(
-            self.verticalScrollBar().maximum())
+        self.scrollToBottom()
 
     def strip_color_codes(self, message: str) -> str:
         """Removes console color escape codes from string
@@ -136,32 +320,70 @@ class StatusWindow(QTextEdit):
         Returns:
             str: message with color escape codes removed
         """
-        regex = re.compile(AppConst.REGEX_COLORSTRIP)
-        return regex.sub("", message)
+        return self.color_regex.sub("", message)
 
-    def append_text(self, text: str) -> None:
-        """Appends to TextEdit without affecting the char format
-        and scrolls to the end.
+    def append_lines(self, lines: list[LogLine]) -> None:
+        """Appends lines and scrolls to the end
 
         Args:
-            text (str): Text to append
+            lines (list[LogLine]): Lines to append
         """
-        cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertText(self.strip_color_codes(text) + "\n")
+        self.log_model.append_lines(lines)
         if self.autoscroll:
             self.scroll_to_end()
 
-    def append_html(self, text: str) -> None:
-        """Simple text append, allows html
+    def append_text(self, text: str, level: int = logging.INFO) -> None:
+        """Appends text, one line per line break, and scrolls to the end.
 
         Args:
             text (str): Text to append
+            level (int, optional): logging module level.
+                Defaults to logging.INFO.
         """
-        self.append(text)
+        self.append_lines([LogLine(line, level, self.current_job)
+                           for line in self.strip_color_codes(text)
+                           .split("\n")])
+
+    def append_table(self, table: DocTable) -> None:
+        """Appends a table, links in the table are clickable
+
+        Args:
+            table (DocTable): Table to append
+        """
+        self.append_lines([LogLine(text, logging.INFO, self.current_job,
+                                   links, header)
+                           for text, links, header in table.to_lines()])
+
+    def set_filter(self, min_level: int, job: int) -> None:
+        """Shows only lines with a minimum level or of a single job
+
+        Args:
+            min_level (int): Minimum logging module level shown
+            job (int): Job id shown or -1 for all jobs
+        """
+        self.log_filter.set_filter(min_level, job)
+        # Bypass the proxy when not filtering so appending stays cheap
+        model = self.log_filter if self.log_filter.is_active() \
+            else self.log_model
+        if self.model() is not model:
+            self.setModel(model)
         if self.autoscroll:
             self.scroll_to_end()
 
+    def job_at(self, index: QModelIndex) -> Optional[int]:
+        """Returns the job id of a line
+
+        Args:
+            index (QModelIndex): Index of line
+
+        Returns:
+            Optional[int]: Job id or None if the line has no job
+        """
+        line = index.data(LINE_ROLE)
+        if not isinstance(line, LogLine) or line.job < 0:
+            return None
+        return line.job
+
     def set_autoscroll(self, flag: bool) -> None:
         """Sets auto-scroll to bottom of text and scrolls if flag is set
 
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+"""tracer.py - Spans of pipeline stages written in Chrome trace event format
+
+Enable with --trace and open the file in chrome://tracing or
+https://ui.perfetto.dev. Every thread gets its own lane. When tracing is
+disabled span() returns a shared object that does nothing, and hot paths
+check TRACER.enabled before taking timestamps.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import json
+import time
+import threading
+from types import TracebackType
+from typing import Any, Optional
+from constants import AppConst
+
+
+class NullSpan:
+    """Span returned while tracing is disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, exc_type: Optional[type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        return None
+
+
+class Span:
+    """Context manager recording a complete event when it exits
+    """
+    __slots__ = ("tracer", "name", "category", "args", "start")
+    tracer: "Tracer"
+    name: str
+    category: str
+    args: Optional[dict[str, Any]]
+    # time.perf_counter() on entry
+    start: float
+
+    def __init__(self, tracer: "Tracer", name: str, category: str,
+                 args: Optional[dict[str, Any]]) -> None:
+        """Initializer for Span
+
+        Args:
+            tracer (Tracer): Tracer to record to
+            name (str): Event name
+            category (str): Event category
+            args (Optional[dict[str, Any]]): Event arguments
+        """
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Optional[type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=exc_type.__name__)
+        self.tracer.complete(self.name, self.category, self.start,
+                             self.args)
+
+
+# Returned by Tracer.span() while disabled
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Collects trace events from any thread and writes them to a file
+    """
+    # True while collecting events
+    enabled: bool
+    # Path of the trace file
+    file_path: str
+    # time.perf_counter() trace timestamps are relative to
+    origin: float
+    # (phase, name, category, start, duration, thread id, args) tuples,
+    # appending to a list is atomic so threads need no lock
+    events: list[tuple[str, str, str, float, float, int, Optional[dict[
+        str, Any]]]]
+    # Events not recorded after AppConst.TRACE_MAX_EVENTS
+    dropped_count: int
+    # Names of threads that recorded events
+    thread_names: dict[int, str]
+
+    def __init__(self) -> None:
+        """Initializer for Tracer
+        """
+        self.enabled = False
+        self.file_path = ""
+        self.origin = 0.0
+        self.events = []
+        self.dropped_count = 0
+        self.thread_names = {}
+
+    def start(self, file_path: str) -> bool:
+        """Starts collecting events
+
+        Args:
+            file_path (str): Path of the trace file written by stop()
+
+        Returns:
+            bool: True if the trace file could be created
+        """
+        self.file_path = os.path.abspath(file_path)
+        try:
+            # Fail now rather than after a long run
+            with open(self.file_path, 'w', encoding="utf-8"):
+                pass
+        except OSError:
+            return False
+        self.events = []
+        self.dropped_count = 0
+        self.thread_names = {}
+        self.origin = time.perf_counter()
+        self.enabled = True
+        return True
+
+    def stop(self) -> bool:
+        """Stops collecting events and writes the trace file
+
+        Returns:
+            bool: True if the trace file was written
+        """
+        if not self.enabled:
+            return False
+        self.enabled = False
+        try:
+            self.write()
+        except OSError:
+            return False
+        finally:
+            self.events = []
+        return True
+
+    def span(self, name: str, category: str = "",
+             args: Optional[dict[str, Any]] = None) -> Span | NullSpan:
+        """Returns a context manager recording its duration
+
+        Args:
+            name (str): Event name
+            category (str, optional): Event category. Defaults to "".
+            args (Optional[dict[str, Any]], optional): Event arguments.
+                Defaults to None.
+
+        Returns:
+            Span | NullSpan: Context manager
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def complete(self, name: str, category: str, start: float,
+                 args: Optional[dict[str, Any]] = None) -> None:
+        """Records an event that started at start and ends now
+
+        Args:
+            name (str): Event name
+            category (str): Event category
+            start (float): time.perf_counter() at the start of the event
+            args (Optional[dict[str, Any]], optional): Event arguments.
+                Defaults to None.
+        """
+        self.record("X", name, category, start,
+                    time.perf_counter() - start, args)
+
+    def instant(self, name: str, category: str = "",
+                args: Optional[dict[str, Any]] = None) -> None:
+        """Records an event without duration
+
+        Args:
+            name (str): Event name
+            category (str, optional): Event category. Defaults to "".
+            args (Optional[dict[str, Any]], optional): Event arguments.
+                Defaults to None.
+        """
+        self.record("i", name, category, time.perf_counter(), 0.0, args)
+
+    def record(self, phase: str, name: str, category: str, start: float,
+               duration: float, args: Optional[dict[str, Any]]) -> None:
+        """Appends an event unless disabled or full
+
+        Args:
+            phase (str): Trace event phase, "X" or "i"
+            name (str): Event name
+            category (str): Event category
+            start (float): time.perf_counter() at the start of the event
+            duration (float): Seconds
+            args (Optional[dict[str, Any]]): Event arguments
+        """
+        if not self.enabled:
+            return
+        if len(self.events) >= AppConst.TRACE_MAX_EVENTS:
+            self.dropped_count += 1
+            return
+        thread_id = threading.get_ident()
+        if thread_id not in self.thread_names:
+            self.thread_names[thread_id] = threading.current_thread().name
+        self.events.append((phase, name, category, start, duration,
+                            thread_id, args))
+
+    def write(self) -> None:
+        """Writes the collected events to the trace file
+        """
+        pid = os.getpid()
+        with open(self.file_path, 'w', encoding="utf-8") as f:
+            f.write('{"displayTimeUnit": "ms", "otherData": '
+                    + json.dumps({"dropped_events": self.dropped_count})
+                    + ',\n"traceEvents": [\n')
+            lines = [json.dumps({"ph": "M", "name": "thread_name",
+                                 "pid": pid, "tid": thread_id,
+                                 "args": {"name": name}})
+                     for thread_id, name in self.thread_names.items()]
+            for phase, name, category, start, duration, thread_id, args \
+                    in self.events:
+                event: dict[str, Any] = {
+                    "ph": phase, "name": name, "cat": category,
+                    "ts": round((start - self.origin) * 1e6, 1),
+                    "pid": pid, "tid": thread_id}
+                if phase == "X":
+                    event["dur"] = round(duration * 1e6, 1)
+                else:
+                    event["s"] = "t"
+                if args:
+                    event["args"] = args
+                lines.append(json.dumps(event, default=str))
+            f.write(",\n".join(lines))
+            f.write("\n]}\n")
+
+
+# Tracer shared by all modules
+TRACER = Tracer()
@@ -7,8 +7,11 @@ __author__ = "Josh Buchbinder"
 __copyright__ = "Copyright 2024, Josh Buchbinder"
 
 import shutil
-from typing import Any
+import hashlib
+from typing import Any, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from PySide6.QtCore import QFileInfo, QDir, QStandardPaths
+from constants import AppConst, SettingsConst
 
 
 def value_to_bool(value: Any) -> bool:
@@ -69,3 +72,156 @@ def get_videos_path() -> str:
         return ""
     video_path = normalize_path(videos_paths[0])
     return video_path
+
+
+def format_bytes(num_bytes: float) -> str:
+    """Returns a human readable size string
+
+    Args:
+        num_bytes (float): Number of bytes
+
+    Returns:
+        str: Size string such as "1.5 GiB"
+    """
+    units = ["bytes", "KiB", "MiB", "GiB", "TiB"]
+    unit_index = 0
+    while abs(num_bytes) >= 1024 and unit_index < len(units) - 1:
+        num_bytes /= 1024
+        unit_index += 1
+    if unit_index == 0:
+        return f"{int(num_bytes)} {units[0]}"
+    return f"{num_bytes:.1f} {units[unit_index]}"
+
+
+def format_duration(seconds: float) -> str:
+    """Returns a short duration string
+
+    Args:
+        seconds (float): Duration in seconds
+
+    Returns:
+        str: Duration string such as "1:05" or "2:01:05"
+    """
+    minutes, secs = divmod(max(int(seconds), 0), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def get_app_data_path() -> str:
+    """Returns the path to a directory for storing application data files,
+    creating it if necessary
+
+    Returns:
+        str: Path to application data directory or empty string on failure
+    """
+    data_path = QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.GenericDataLocation)
+    if not data_path:
+        return ""
+    app_dir = QDir(data_path)
+    app_subpath = f"{SettingsConst.SETTINGS_COMPANYNAME}/" \
+        f"{SettingsConst.SETTINGS_APPNAME}"
+    if not app_dir.mkpath(app_subpath):
+        return ""
+    return normalize_path(app_dir.filePath(app_subpath))
+
+
+def is_tracking_param(key: str) -> bool:
+    """Returns True if a query parameter only tracks where a link was
+    shared and does not select content
+
+    Args:
+        key (str): Query parameter name
+
+    Returns:
+        bool: True if the parameter is removed when canonicalizing
+    """
+    key = key.lower()
+    return key in AppConst.URL_TRACKING_PARAMS \
+        or key.startswith(AppConst.URL_TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Returns a canonical form of a URL so that trivially different
+    spellings of the same URL compare equal
+
+    Args:
+        url (str): URL to canonicalize
+
+    Returns:
+        str: Canonical URL
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    # Remove default ports
+    if (scheme == "http" and netloc.endswith(":80")) \
+            or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    # Remove tracking parameters and sort the rest
+    query = [(key, value) for key, value in
+             parse_qsl(parts.query, keep_blank_values=True)
+             if not is_tracking_param(key)]
+    query.sort()
+    # Fragment is never sent to the server so it is dropped
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query),
+                       ""))
+
+
+def url_shard(url: str, shard_count: int) -> int:
+    """Returns the shard a URL belongs to. Uses a hash of the canonical URL
+    so the result is the same across runs, processes and machines, unlike
+    the builtin hash() which is randomized per process
+
+    Args:
+        url (str): URL
+        shard_count (int): Number of shards
+
+    Returns:
+        int: Shard number from 1 to shard_count
+    """
+    digest = hashlib.sha1(canonicalize_url(url).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count + 1
+
+
+def url_key(url: str) -> str:
+    """Returns a name for a URL that is the same across runs, processes and
+    machines, used to name the staging directory of its download
+
+    Args:
+        url (str): URL
+
+    Returns:
+        str: 16 hexadecimal digits
+    """
+    digest = hashlib.sha1(canonicalize_url(url).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def estimate_info_bytes(info: dict[str, Any]) -> Optional[int]:
+    """Estimates the download size of processed metadata from the sizes of
+    the selected formats
+
+    Args:
+        info (dict[str, Any]): Metadata after format selection
+
+    Returns:
+        Optional[int]: Estimated bytes or None if unknown
+    """
+    formats = info.get("requested_formats") or [info]
+    total = 0
+    for fmt in formats:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size and fmt.get("tbr") and info.get("duration"):
+            # Bitrate is in KBit/s
+            size = fmt["tbr"] * 1000 / 8 * info["duration"]
+        if not size:
+            return None
+        total += int(size)
+    return total
@@ -13,11 +13,39 @@ __version__ = "1.0.0"
 
 import sys
 import argparse
-from PySide6.QtCore import QTimer
-from PySide6.QtWidgets import QApplication
+# Imported first to time the other imports
+# pylint: disable=wrong-import-order,wrong-import-position
+from startup_report import STARTUP
+from PySide6.QtCore import QTimer  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+STARTUP.mark("import Qt")
 
-from constants import AppConst, ComboBoxConst, ToolTips, StringMaps
-from main_window import MainWindow
+from constants import AppConst, ComboBoxConst, ToolTips  # noqa: E402
+from constants import StringMaps  # noqa: E402
+from main_window import MainWindow  # noqa: E402
+from profiler import PROFILER  # noqa: E402
+STARTUP.mark("import application modules")
+
+
+def shard_arg(value: str) -> tuple[int, int]:
+    """Converts a --shard argument of the form i/n
+
+    Args:
+        value (str): Argument value
+
+    Returns:
+        tuple[int, int]: (shard index, shard count)
+    """
+    try:
+        index_text, count_text = value.split("/")
+        shard_index, shard_count = int(index_text), int(count_text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            f"invalid shard '{value}', expected i/n") from e
+    if shard_count < 1 or not 1 <= shard_index <= shard_count:
+        raise argparse.ArgumentTypeError(
+            f"invalid shard '{value}', i must be from 1 to n")
+    return shard_index, shard_count
 
 
 def create_parserer() -> argparse.ArgumentParser:
@@ -36,6 +64,42 @@ def create_parserer() -> argparse.ArgumentParser:
     url_group = parser.add_mutually_exclusive_group()
     url_group.add_argument("--url", help=ToolTips.TTT_URL_TEXT)
     url_group.add_argument("--urllist", help=ToolTips.TTT_LIST_PATH_TEXT)
+    parser.add_argument("--watchdir", help=ToolTips.TTT_WATCHDIR)
+    parser.add_argument("--logfile", help=ToolTips.TTT_LOGFILE)
+    parser.add_argument("--reportdir", help=ToolTips.TTT_REPORTDIR)
+    parser.add_argument("--stagingdir", help=ToolTips.TTT_STAGINGDIR)
+    parser.add_argument("--diskmargin", type=int, metavar="MIB",
+                        help=ToolTips.TTT_DISKMARGIN)
+    parser.add_argument("--nodiskcheck", action="store_true",
+                        help=ToolTips.TTT_NODISKCHECK)
+    parser.add_argument("--dedup",
+                        choices=[AppConst.DEDUP_MODE_HARDLINK,
+                                 AppConst.DEDUP_MODE_REFLINK],
+                        help=ToolTips.TTT_DEDUP)
+    parser.add_argument("--subdirs", default=AppConst.SUBDIRS_NONE,
+                        choices=list(AppConst.SUBDIRS_OUTTMPL),
+                        help=ToolTips.TTT_SUBDIRS)
+    parser.add_argument("--trace", metavar="FILE", help=ToolTips.TTT_TRACE)
+    parser.add_argument("--lagprobe", action="store_true",
+                        help=ToolTips.TTT_LAGPROBE)
+    parser.add_argument("--startupreport", "--startup-report",
+                        action="store_true",
+                        help=ToolTips.TTT_STARTUPREPORT)
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help=ToolTips.TTT_PROFILE)
+    parser.add_argument("--profilemode",
+                        default=AppConst.PROFILE_MODE_CPROFILE,
+                        choices=[AppConst.PROFILE_MODE_CPROFILE,
+                                 AppConst.PROFILE_MODE_SAMPLE],
+                        help=ToolTips.TTT_PROFILEMODE)
+    parser.add_argument("--profilesection",
+                        default=AppConst.PROFILE_SECTION_ALL,
+                        choices=[AppConst.PROFILE_SECTION_ALL,
+                                 AppConst.PROFILE_SECTION_DOWNLOAD,
+                                 AppConst.PROFILE_SECTION_EXTRACT],
+                        help=ToolTips.TTT_PROFILESECTION)
+    parser.add_argument("--shard", type=shard_arg, metavar="I/N",
+                        help=ToolTips.TTT_SHARD)
     parser.add_argument("--ffmpegpath", help=ToolTips.TTT_FFMPEG_PATH_TEXT)
     parser.add_argument("-u", "--username", help=ToolTips.TTT_USERNAME_TEXT)
     parser.add_argument("-p", "--password", help=ToolTips.TTT_PASSWORD_TEXT)
@@ -75,6 +139,17 @@ def create_parserer() -> argparse.ArgumentParser:
                                   help=ToolTips.TTT_CONSOLEOUTPUT_CHECK)
     consoleout_group.add_argument("--noconsoleout", action="store_true",
                                   help="Do not output to console.")
+    skipfailed_group = parser.add_mutually_exclusive_group()
+    skipfailed_group.add_argument("--skipfailed", action="store_true",
+                                  help=ToolTips.TTT_SKIPFAILED_CHECK)
+    skipfailed_group.add_argument("--noskipfailed", action="store_true",
+                                  help="Retry URLs that failed recently.")
+    validate_group = parser.add_mutually_exclusive_group()
+    validate_group.add_argument("--validate", action="store_true",
+                                help=ToolTips.TTT_VALIDATE_CHECK)
+    validate_group.add_argument("--novalidate", action="store_true",
+                                help="Do not validate URLs before "
+                                "downloading.")
     formattype_list = [item[2] for item in ComboBoxConst.FORMAT_TYPE_LIST]
     parser.add_argument("--formattype", choices=formattype_list,
                         help=ToolTips.TTT_FORMAT_TYPE_COMBO)
@@ -168,12 +243,18 @@ def main(argv: list[str]) -> int:
     parser = create_parserer()
     # Parse command line arguments
     args = parser.parse_args(argv[1:])
+    STARTUP.mark("parse arguments")
+
+    # Profile from startup to exit
+    if args.profile:
+        PROFILER.start(args.profile, args.profilemode, args.profilesection)
 
     # Create application
     app = QApplication(args.qtarg)
 
     # Use Fusion app style
     app.setStyle(args.guistyle)
+    STARTUP.mark("create application")
 
     # Create window
     window = MainWindow(not args.noloadsettings, not args.nosavesettings)
@@ -185,6 +266,19 @@ def main(argv: list[str]) -> int:
     elif args.urllist:
         window.url_type_combo.setCurrentIndex(ComboBoxConst.URL_TYPE_LIST)
         window.list_path_text.setText(args.urllist)
+    if args.shard:
+        window.set_shard(*args.shard)
+    if args.reportdir:
+        window.set_report_dir(args.reportdir)
+    if args.stagingdir:
+        window.set_staging_dir(args.stagingdir)
+    window.set_subdirs(args.subdirs)
+    if args.dedup:
+        window.set_dedup(args.dedup)
+    if args.nodiskcheck:
+        window.set_disk_margin(-1)
+    elif args.diskmargin is not None:
+        window.set_disk_margin(args.diskmargin)
     if args.ffmpegpath:
         window.ffmpeg_path_text.setText(args.ffmpegpath)
     if args.username:
@@ -211,6 +305,14 @@ def main(argv: list[str]) -> int:
         window.consoleoutput_check.setChecked(True)
     elif args.noconsoleout:
         window.consoleoutput_check.setChecked(False)
+    if args.skipfailed:
+        window.skipfailed_check.setChecked(True)
+    elif args.noskipfailed:
+        window.skipfailed_check.setChecked(False)
+    if args.validate:
+        window.validate_check.setChecked(True)
+    elif args.novalidate:
+        window.validate_check.setChecked(False)
     if args.formattype:
         window.format_type_combo.set_current_data(
             StringMaps.STRINGMAP_FORMATTYPE[args.formattype])
@@ -254,8 +356,25 @@ def main(argv: list[str]) -> int:
     if args.subsdelay is not None:
         window.subs_delay_spin.setValue(args.subsdelay)
 
-    # Show the main window
+    # Write status messages to log file
+    if args.logfile:
+        window.start_log_file(args.logfile)
+    # Collect trace events
+    if args.trace:
+        window.start_trace(args.trace)
+    if args.lagprobe:
+        window.enable_lag_probe()
+    if args.startupreport:
+        window.enable_startup_report()
+    STARTUP.mark("apply arguments")
+
+    # Show the main window, yt_dlp is imported once it is shown
     window.show()
+    QTimer.singleShot(0, window, window.window_shown)
+
+    # Start watching for URL list files
+    if args.watchdir:
+        window.start_watch_folder(args.watchdir)
 
     # Trigger the download
     if args.download:
@@ -263,7 +382,17 @@ def main(argv: list[str]) -> int:
         QTimer.singleShot(0, window, window.download_button_clicked)
 
     # Execute event loop
-    return app.exec()
+    exit_code = app.exec()
+    # Write remaining log messages and trace events
+    window.stop_log_file()
+    window.stop_trace()
+    if args.profile:
+        paths = PROFILER.stop()
+        if paths:
+            print("Profile written to " + " and ".join(paths))
+        else:
+            print(f"Unable to write profile {args.profile}")
+    return exit_code
 
 
 # Entry point
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""watch_folder.py - Watches a directory for new URL list files
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import os
+import time
+from typing import Optional
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+from constants import AppConst
+
+
+class WatchFolder(QObject):
+    """Watches a directory for URL list files and claims them by moving them
+    into a processing subdirectory. Uses QFileSystemWatcher (inotify on
+    Linux) with a polling timer as fallback for file systems such as network
+    mounts that do not report changes.
+    """
+    # Emitted with the path of a claimed file in the processing directory
+    file_claimed = Signal(str)
+
+    # Directory being watched
+    watch_path: str
+    # Subdirectories for claimed, finished and failed files
+    processing_path: str
+    done_path: str
+    failed_path: str
+    watcher: QFileSystemWatcher
+    poll_timer: QTimer
+    # Set while scanning to prevent reentrant scans from claim handlers
+    scanning: bool
+
+    def __init__(self, watch_path: str,
+                 parent: Optional[QObject] = None) -> None:
+        """Initializer for WatchFolder
+
+        Args:
+            watch_path (str): Directory to watch
+            parent (QObject, optional): Parent object. Defaults to None.
+        """
+        super().__init__(parent)
+        self.watch_path = os.path.abspath(watch_path)
+        self.processing_path = os.path.join(
+            self.watch_path, AppConst.WATCHFOLDER_PROCESSING_DIR)
+        self.done_path = os.path.join(self.watch_path,
+                                      AppConst.WATCHFOLDER_DONE_DIR)
+        self.failed_path = os.path.join(self.watch_path,
+                                        AppConst.WATCHFOLDER_FAILED_DIR)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(lambda _: self.scan())
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(AppConst.WATCHFOLDER_POLL_INTERVAL)
+        self.poll_timer.timeout.connect(self.scan)
+        self.scanning = False
+
+    def start(self) -> bool:
+        """Creates the subdirectories and starts watching
+
+        Returns:
+            bool: True if watching started
+        """
+        try:
+            for path in [self.processing_path, self.done_path,
+                         self.failed_path]:
+                os.makedirs(path, exist_ok=True)
+        except OSError:
+            return False
+        self.watcher.addPath(self.watch_path)
+        self.poll_timer.start()
+        # Pick up files that arrived while not watching
+        QTimer.singleShot(0, self, self.scan)
+        return True
+
+    def stop(self) -> None:
+        """Stops watching
+        """
+        self.poll_timer.stop()
+        self.watcher.removePath(self.watch_path)
+
+    def scan(self) -> None:
+        """Claims URL list files in the watched directory that are no
+        longer being written
+        """
+        if self.scanning:
+            return
+        self.scanning = True
+        try:
+            self.scan_entries()
+        finally:
+            self.scanning = False
+
+    def scan_entries(self) -> None:
+        """Claims files in the watched directory in name order
+        """
+        now = time.time()
+        try:
+            entries = sorted(os.scandir(self.watch_path),
+                             key=lambda entry: entry.name)
+        except OSError:
+            return
+        for entry in entries:
+            name = entry.name
+            suffix = os.path.splitext(name)[1][1:].lower()
+            if name.startswith(".") \
+                    or suffix not in AppConst.EXTENSIONS_URLLIST:
+                continue
+            try:
+                if not entry.is_file() or now - entry.stat().st_mtime \
+                        < AppConst.WATCHFOLDER_SETTLE_SECONDS:
+                    # Possibly still being written, the poll timer retries
+                    continue
+            except OSError:
+                continue
+            claimed_path = self.claim(entry.path)
+            if claimed_path:
+                self.file_claimed.emit(claimed_path)
+
+    def claim(self, path: str) -> str:
+        """Atomically moves a file into the processing directory so no
+        other watcher processes it
+
+        Args:
+            path (str): Path of file to claim
+
+        Returns:
+            str: Path of claimed file or empty string if it was claimed by
+                someone else
+        """
+        claimed_path = self.unique_path(self.processing_path,
+                                        os.path.basename(path))
+        try:
+            os.rename(path, claimed_path)
+        except OSError:
+            return ""
+        return claimed_path
+
+    def finish(self, claimed_path: str, success: bool) -> str:
+        """Moves a claimed file to the done or failed directory
+
+        Args:
+            claimed_path (str): Path of claimed file
+            success (bool): True to move to done, False to move to failed
+
+        Returns:
+            str: New path of file or empty string if it could not be moved
+        """
+        dest_dir = self.done_path if success else self.failed_path
+        dest_path = self.unique_path(dest_dir,
+                                     os.path.basename(claimed_path))
+        try:
+            os.rename(claimed_path, dest_path)
+        except OSError:
+            return ""
+        return dest_path
+
+    @staticmethod
+    def unique_path(directory: str, name: str) -> str:
+        """Returns a path in directory for name that does not exist yet
+
+        Args:
+            directory (str): Destination directory
+            name (str): File name
+
+        Returns:
+            str: Path that does not exist
+        """
+        path = os.path.join(directory, name)
+        base, ext = os.path.splitext(name)
+        count = 1
+        while os.path.exists(path):
+            path = os.path.join(directory, f"{base}_{count}{ext}")
+            count += 1
+        return path
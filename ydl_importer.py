@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""ydl_importer.py - Imports yt_dlp in a background thread
+
+Importing yt_dlp takes longer than creating the main window, so modules
+import it in the functions that use it and the main window starts this
+import once it is on screen. A function importing yt_dlp while this import
+is running waits for it to finish.
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import time
+import threading
+from typing import Optional
+
+
+class YdlImporter:
+    """Imports yt_dlp once in a background thread
+    """
+    thread: Optional[threading.Thread]
+    # Set when the import finished or failed
+    done_event: threading.Event
+    # Seconds the import took, measured in the importing thread
+    seconds: float
+    # time.perf_counter() when the import finished
+    end_time: float
+
+    def __init__(self) -> None:
+        """Initializer for YdlImporter
+        """
+        self.thread = None
+        self.done_event = threading.Event()
+        self.seconds = 0.0
+        self.end_time = 0.0
+
+    def start(self) -> None:
+        """Starts the import if it was not started before
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run,
+                                           name="ydlimport", daemon=True)
+            self.thread.start()
+
+    def run(self) -> None:
+        """Thread function, imports yt_dlp
+        """
+        start = time.perf_counter()
+        try:
+            # An import statement rather than importlib so -X importtime
+            # lists yt_dlp itself
+            # pylint: disable-next=import-outside-toplevel,unused-import
+            import yt_dlp  # noqa: F401
+        except ImportError:
+            # Reported by the import where yt_dlp is used
+            pass
+        self.end_time = time.perf_counter()
+        self.seconds = self.end_time - start
+        self.done_event.set()
+
+    def is_done(self) -> bool:
+        """Returns True if the import finished
+
+        Returns:
+            bool: True if the import finished or failed
+        """
+        return self.done_event.is_set()
+
+
+# Background import started by MainWindow
+YDL_IMPORTER = YdlImporter()
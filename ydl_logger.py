@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+"""ydl_logger.py - Logger object for yt_dlp routing messages into the
+status window
+"""
+
+__author__ = "Josh Buchbinder"
+__copyright__ = "Copyright 2024, Josh Buchbinder"
+
+import re
+import time
+import logging
+from typing import Optional
+from collections.abc import Callable
+from constants import AppConst
+
+
+class YdlLogger:
+    """Passed as the "logger" option of yt_dlp.YoutubeDL. Drops messages
+    below a level, collapses repeated messages into a count and limits the
+    rate of debug and info messages of each download job so verbose output
+    cannot flood the status window.
+    """
+    # Called with (message, logging module level) for messages shown
+    callback: Callable[[str, int], None]
+    # Messages below this level are dropped
+    min_level: int
+    # Last message shown and the number of times it was repeated since
+    last_message: Optional[tuple[int, str]]
+    repeat_count: int
+    # Error messages shown in the current job, errors are also raised as
+    # exceptions
+    shown_errors: set[str]
+    # Token bucket of the current job for debug and info messages
+    tokens: float
+    tokens_time: float
+    # Messages dropped by the rate limit in the current job
+    suppressed_count: int
+    # Retries announced by yt_dlp in the current job
+    retry_count: int
+    retry_regex: re.Pattern[str]
+
+    def __init__(self, callback: Callable[[str, int], None],
+                 min_level: int = logging.WARNING) -> None:
+        """Initializer for YdlLogger
+
+        Args:
+            callback (Callable[[str, int], None]): Called with
+                (message, logging module level) for messages shown
+            min_level (int, optional): Messages below this level are
+                dropped. Defaults to logging.WARNING.
+        """
+        self.callback = callback
+        self.min_level = min_level
+        self.last_message = None
+        self.repeat_count = 0
+        self.shown_errors = set()
+        self.tokens = AppConst.YDL_LOG_BURST
+        self.tokens_time = time.monotonic()
+        self.suppressed_count = 0
+        self.retry_count = 0
+        self.retry_regex = re.compile(AppConst.REGEX_YDL_RETRY)
+
+    def debug(self, msg: str) -> None:
+        """Called by yt_dlp for debug messages and screen output, which is
+        told apart by the [debug] prefix
+
+        Args:
+            msg (str): Message
+        """
+        self.log(logging.DEBUG if msg.startswith("[debug] ")
+                 else logging.INFO, msg)
+
+    def info(self, msg: str) -> None:
+        """Called by yt_dlp for info messages
+
+        Args:
+            msg (str): Message
+        """
+        self.log(logging.INFO, msg)
+
+    def warning(self, msg: str) -> None:
+        """Called by yt_dlp for warnings
+
+        Args:
+            msg (str): Message
+        """
+        self.log(logging.WARNING, msg)
+
+    def error(self, msg: str) -> None:
+        """Called by yt_dlp for errors
+
+        Args:
+            msg (str): Message
+        """
+        self.log(logging.ERROR, msg)
+
+    def log(self, level: int, msg: str) -> None:
+        """Shows a message unless it is filtered, repeated or over the rate
+        limit
+
+        Args:
+            level (int): logging module level
+            msg (str): Message
+        """
+        if "Retrying" in msg and self.retry_regex.search(msg):
+            self.retry_count += 1
+        if level < self.min_level:
+            return
+        if (level, msg) == self.last_message:
+            self.repeat_count += 1
+            return
+        if level < logging.WARNING and not self.take_token():
+            self.suppressed_count += 1
+            return
+        self.flush_repeats()
+        self.last_message = (level, msg)
+        if level >= logging.ERROR:
+            self.shown_errors.add(msg)
+        self.callback(msg, level)
+
+    def error_shown(self, msg: str) -> bool:
+        """Returns True if an error message was shown in the current job
+
+        Args:
+            msg (str): Error message
+
+        Returns:
+            bool: True if shown
+        """
+        return msg in self.shown_errors
+
+    def take_token(self) -> bool:
+        """Takes a token from the bucket of the current job
+
+        Returns:
+            bool: True if a message may be shown
+        """
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self.tokens_time)
+                          * AppConst.YDL_LOG_RATE, AppConst.YDL_LOG_BURST)
+        self.tokens_time = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def flush_repeats(self) -> None:
+        """Shows the repeat count of the last message if it was repeated
+        """
+        if self.repeat_count and self.last_message is not None:
+            self.callback(f"(last message repeated {self.repeat_count} "
+                          "more times)", self.last_message[0])
+        self.repeat_count = 0
+
+    def start_job(self) -> None:
+        """Finishes the previous job and resets the rate limit for a new
+        download job
+        """
+        self.flush()
+        self.tokens = AppConst.YDL_LOG_BURST
+        self.tokens_time = time.monotonic()
+        self.retry_count = 0
+
+    def flush(self) -> None:
+        """Shows pending repeat and rate limit counts
+        """
+        self.flush_repeats()
+        self.last_message = None
+        self.shown_errors = set()
+        if self.suppressed_count:
+            self.callback(f"({self.suppressed_count} yt_dlp messages "
+                          "suppressed by the rate limit)", logging.INFO)
+            self.suppressed_count = 0